@@ -33,6 +33,11 @@ library ieee;
 use ieee.std_logic_1164.all;
 
 entity axi4_adapter is
+  generic(
+    -- clock cycles from a read access until regs_dataout is valid, i.e. the
+    -- <module>_REGS_READ_LATENCY constant of the register file package
+    READ_LATENCY : natural range 0 to 2 := 0
+    );
   port(
     -- AXI4 Lite interface
     axi_clk     : in  STD_LOGIC;
@@ -64,6 +69,7 @@ entity axi4_adapter is
     regs_cs      : out STD_LOGIC;
     regs_rnw     : out STD_LOGIC;
     regs_datain  : out STD_LOGIC_VECTOR(31 downto 0);
+    regs_be      : out STD_LOGIC_VECTOR(3 downto 0);  --for components generated with -vhdl_byte_enables
     regs_dataout : in  STD_LOGIC_VECTOR(31 downto 0)
     );
 end entity axi4_adapter;
@@ -72,12 +78,14 @@ architecture RTL of axi4_adapter is
   type WRITE_FSM_STATE is (IDLE, WRITE_RESPONSE);
   signal write_state, write_state_n : WRITE_FSM_STATE;
   
-  type READ_FSM_STATE is (IDLE, WAIT_FOR_RREADY);
+  type READ_FSM_STATE is (IDLE, WAIT_FOR_DATA, WAIT_FOR_RREADY);
   signal read_state, read_state_n : READ_FSM_STATE;
+  signal read_count, read_count_n : natural range 0 to 2;  --remaining cycles until regs_dataout is valid
   signal rdata                    : STD_LOGIC_VECTOR(axi_rdata'RANGE);
 
   signal rnw : STD_LOGIC;               --internal regs_rnw signal
   signal cs  : STD_LOGIC;               --internal regs_cs  signal
+  signal rvalid : STD_LOGIC;            --internal axi_rvalid signal
 begin
   regs_clk <= axi_clk;
   regs_rst <= not axi_rst_n;
@@ -87,13 +95,15 @@ begin
   regs_addr <= ("00" & axi_awaddr(axi_awaddr'HIGH downto 2)) when axi_awvalid = '1' else ("00" & axi_araddr(axi_araddr'HIGH downto 2));
   rnw       <= '0'        when axi_wvalid = '1'  else '1';
   regs_rnw  <= rnw;
-  cs        <= axi_awvalid or axi_arvalid;
+  --no new read is started while the previous one is pending
+  cs        <= axi_awvalid or axi_arvalid when read_state = IDLE else axi_awvalid;
   regs_cs   <= cs;
 
   --write channel
   axi_awready <= axi_awvalid and axi_wvalid;
   axi_wready  <= '1';
   regs_datain <= axi_wdata;
+  regs_be     <= axi_wstrb;
 
   --write response channel
   axi_bresp  <= "00";                   --OKAY
@@ -130,30 +140,48 @@ begin
   end process;
   
   --read channel
-  axi_arready <= '0' when axi_awvalid = '1' else '1';
+  axi_arready <= '0' when axi_awvalid = '1' or read_state /= IDLE else '1';
+  axi_rvalid  <= rvalid;
 
+  --the read data is valid READ_LATENCY cycles after the access, it is held
+  --in rdata until the master accepts it
   read_fsm_comb : process(all) is
   begin
     --default
     axi_rdata    <= regs_dataout;
-    axi_rvalid   <= '0';
+    rvalid       <= '0';
     read_state_n <= read_state;
+    read_count_n <= read_count;
     
     case read_state is
       when IDLE =>
-        if(axi_wvalid = '0') then       --write access has priority
-          axi_rvalid <= axi_arvalid;
+        if(axi_wvalid = '0' and axi_arvalid = '1') then  --write access has priority
+          if(READ_LATENCY = 0) then
+            rvalid <= '1';
+            if(axi_rready = '0') then
+              read_state_n <= WAIT_FOR_RREADY;
+            end if;
+          else
+            read_count_n <= READ_LATENCY;
+            read_state_n <= WAIT_FOR_DATA;
+          end if;
         end if;
 
-        if(axi_wvalid = '0' and axi_arvalid = '1') then
+      when WAIT_FOR_DATA =>
+        if(read_count = 1) then
+          rvalid <= '1';
           if(axi_rready = '0') then
             read_state_n <= WAIT_FOR_RREADY;
+          else
+            read_state_n <= IDLE;
           end if;
+        else
+          read_count_n <= read_count - 1;
         end if;
 
       when WAIT_FOR_RREADY =>
-        axi_rdata  <= rdata;
-        axi_rvalid <= '0';
+        axi_rdata <= rdata;
+        rvalid    <= '1';               --rvalid is held until rready
 
         if(axi_rready = '1') then
           read_state_n <= IDLE;
@@ -165,9 +193,11 @@ begin
   begin
     if(axi_rst_n = '0') then
       read_state <= IDLE;
+      read_count <= 0;
     elsif rising_edge(axi_clk) then
       read_state <= read_state_n;
-      if(cs = '1' and rnw = '1') then
+      read_count <= read_count_n;
+      if(rvalid = '1' and read_state /= WAIT_FOR_RREADY) then
         rdata <= regs_dataout;
       end if;
     end if;
@@ -39,7 +39,7 @@ entity ipif_adapter is
 		Bus2IP_Resetn : in  std_logic;
 		Bus2IP_Addr   : in  std_logic_vector(31 downto 0);
 		Bus2IP_RNW    : in  std_logic;
-		Bus2IP_BE     : in  std_logic_vector(3 downto 0); -- not implemented yet
+		Bus2IP_BE     : in  std_logic_vector(3 downto 0);
 		Bus2IP_CS     : in  std_logic;
 		Bus2IP_Data   : in  std_logic_vector(31 downto 0);
 		IP2Bus_Data   : out std_logic_vector(31 downto 0);
@@ -53,6 +53,7 @@ entity ipif_adapter is
 		regs_cs       : out std_logic;
 		regs_rnw      : out std_logic;
 		regs_datain   : out std_logic_vector(31 downto 0);
+		regs_be       : out std_logic_vector(3 downto 0); -- for components generated with -vhdl_byte_enables
 		regs_dataout  : in  std_logic_vector(31 downto 0)
 	);
 end entity ipif_adapter;
@@ -65,6 +66,7 @@ begin
 	regs_cs      <= Bus2IP_CS;
 	regs_rnw     <= Bus2IP_RNW;
 	regs_datain  <= Bus2IP_Data;
+	regs_be      <= Bus2IP_BE;
 	IP2Bus_Data  <= regs_dataout;
 	IP2Bus_WrAck <= Bus2IP_CS and not Bus2IP_RNW;
 	IP2Bus_RdAck <= Bus2IP_CS and Bus2IP_RNW;
@@ -0,0 +1,57 @@
+#!/usr/bin/python
+#
+# Scaling benchmark for the register address allocation in Module.elaborate()
+#
+# usage: python benchmarks/bench_allocator.py [num_registers ...]
+#
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_SIZES = (1000, 3000, 10000, 30000, 100000)
+REFERENCE_MAX_SIZE = 2000  # larger sizes take too long with the reference allocator
+
+#
+# The original allocator (restart at 0x0 and rescan all registers for every
+# candidate), used to check that the addresses are unchanged
+#
+def reference_addresses(json_module):
+    offsets = []
+    for json_reg in json_module["registers"]:
+        if "addressOffset" in json_reg:
+            offsets.append(int(json_reg["addressOffset"], 16))
+        else:
+            offsets.append(None)
+    for i in range(len(offsets)):
+        if offsets[i] == None:
+            candidate = 0x0
+            while candidate in offsets:
+                candidate += 4
+            offsets[i] = candidate
+    return offsets
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print "%10s %12s %12s %10s" % ("registers", "module [s]", "us/register", "reference")
+    for size in sizes:
+        json_module = synthesize_module(size)
+        start = time.time()
+        module = Module(json_module)
+        elapsed = time.time() - start
+        if size <= REFERENCE_MAX_SIZE:
+            addresses = [r.addressOffset for r in module.registers]
+            if addresses == reference_addresses(json_module):
+                reference = "match"
+            else:
+                reference = "MISMATCH"
+        else:
+            reference = "skipped"
+        print "%10d %12.3f %12.2f %10s" % (size, elapsed, 1e6 * elapsed / size, reference)
+        if reference == "MISMATCH":
+            sys.exit(-1)
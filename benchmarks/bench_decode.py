@@ -0,0 +1,52 @@
+#!/usr/bin/python
+#
+# Compares the address decoders of the generated VHDL component ('full',
+# 'slice' and 'case', see hdlregs.py -vhdl_decode) on synthetic modules
+#
+# For the bus read process, the script counts the address comparisons on the
+# dataout path: with the 'full' decoder, every register adds an if statement
+# comparing all 32 address bits, which overrides the previous ones (a priority
+# chain as long as the number of registers). The 'slice' decoder compares only
+# the bits which differ between the registers, and the 'case' decoder selects one
+# alternative of a parallel multiplexer with the decoded address bits only.
+#
+# usage: python benchmarks/bench_decode.py [num_registers ...]
+#
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from code_gen.vhdl import VhdlComponentGenerator
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+#
+# Returns the bus read process of a generated VHDL component
+def bus_read_process(code):
+    return code[code.index('bus_read : process'):code.index('end process bus_read;')]
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print "%10s %6s %14s %14s %16s" % ("registers", "decode", "decoded bits", "chain length", "compared bits")
+    for size in sizes:
+        module = Module(synthesize_module(size, access_mix={"read-write": 1}, fixed_ratio=0.0))
+        for decode in VhdlComponentGenerator.DECODERS:
+            process = bus_read_process(str(VhdlComponentGenerator(module, decode=decode)))
+            comparisons = len(re.findall(r'\bif addr[ (]', process))
+            match = re.search(r'addr\((\d+) downto (\d+)\)', process)
+            if match != None:
+                decoded_bits = int(match.group(1)) - int(match.group(2)) + 1
+            else:
+                decoded_bits = 32
+            if decode == 'case':
+                chain_length = 1
+                compared_bits = decoded_bits
+            else:
+                chain_length = comparisons
+                compared_bits = decoded_bits * comparisons
+            print "%10d %6s %14d %14d %16d" % (size, decode, decoded_bits, chain_length, compared_bits)
@@ -0,0 +1,75 @@
+#!/usr/bin/python
+#
+# Measures the decoding of register dumps (see hdlregs.py -decode) on a
+# synthetic module, in samples per second
+#
+# The vectorized decoder of dump_decoder.py is compared with a reference which
+# unpacks every sample with struct and extracts the fields one by one. The
+# reference only decodes the first samples, as it is orders of magnitude slower.
+#
+# usage: python benchmarks/bench_dump_decode.py [num_registers] [num_samples]
+#
+
+import os
+import sys
+import time
+import struct
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from dump_decoder import import_numpy, decode_dump, dump_columns, sample_words
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_REGISTERS = 256
+DEFAULT_SAMPLES = 100000
+REFERENCE_SAMPLES = 1000
+
+#
+# Decodes the first 'num_samples' samples field by field
+def reference_decode(module, dump_filename, num_samples):
+    columns = dump_columns(module)
+    words = sample_words(module)
+    sample_format = '<%dI' % words
+    values = [[] for column in columns]
+    with open(dump_filename, 'rb') as f:
+        for i in range(num_samples):
+            sample = struct.unpack(sample_format, f.read(4 * words))
+            for column, (name, index, offset, mask, dtype) in zip(values, columns):
+                column.append((sample[index] >> offset) & mask)
+    return values
+
+if __name__ == "__main__":
+    num_registers = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REGISTERS
+    num_samples = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAMPLES
+    numpy = import_numpy()
+    module = Module(synthesize_module(num_registers, fields_per_register=4, access_mix={"read-write": 1, "read-only": 1}))
+    words = sample_words(module)
+    directory = tempfile.mkdtemp()
+    try:
+        dump_filename = os.path.join(directory, 'dump.bin')
+        random = numpy.random.RandomState(0)
+        with open(dump_filename, 'wb') as f:
+            for start in range(0, num_samples, 1000):
+                count = min(1000, num_samples - start)
+                f.write(random.randint(0, 2 ** 32, size=(count, words), dtype=numpy.uint64).astype('<u4').tobytes())
+        print "%d samples of %d words, %d columns (%.1f MB)" % (num_samples, words, len(dump_columns(module)), os.path.getsize(dump_filename) / (1024.0 * 1024.0))
+        print "%-22s %12s %16s" % ("decoder", "time [s]", "samples/s")
+        reference_samples = min(REFERENCE_SAMPLES, num_samples)
+        start = time.time()
+        reference = reference_decode(module, dump_filename, reference_samples)
+        elapsed = time.time() - start
+        print "%-22s %12.3f %16.0f" % ("field by field", elapsed, reference_samples / elapsed)
+        for output_format in ('npz', 'csv'):
+            output_filename = os.path.join(directory, 'columns.' + output_format)
+            start = time.time()
+            decode_dump(module, dump_filename, output_filename)
+            elapsed = time.time() - start
+            print "%-22s %12.3f %16.0f" % ("vectorized, " + output_format, elapsed, num_samples / elapsed)
+        columns = numpy.load(os.path.join(directory, 'columns.npz'))
+        for values, column in zip(reference, dump_columns(module)):
+            assert list(columns[column[0]][:reference_samples]) == values, column[0]
+    finally:
+        shutil.rmtree(directory)
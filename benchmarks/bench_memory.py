@@ -0,0 +1,51 @@
+#!/usr/bin/python
+#
+# Memory footprint of the register model: every size is measured in a fresh
+# process, which reports the growth of its resident set size while the module
+# is constructed from the (already loaded) JSON description.
+#
+# usage: python benchmarks/bench_memory.py [num_registers ...]
+#
+
+import os
+import sys
+import gc
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+FIELDS_PER_REGISTER = 4
+
+#
+# Returns the current resident set size of this process in bytes (Linux only)
+def current_rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+#
+# Construct a module with 'size' registers and print its memory usage
+def measure(size):
+    json_module = synthesize_module(size, fields_per_register=FIELDS_PER_REGISTER,
+                                    access_mix={"read-write": 2, "read-only": 1, "write-only": 1})
+    gc.collect()
+    rss_before = current_rss()
+    module = Module(json_module)
+    gc.collect()
+    rss_after = current_rss()
+    num_fields = sum(len(r.fields) for r in module.registers)
+    print "%d %d" % (num_fields, rss_after - rss_before)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--measure':
+        measure(int(sys.argv[2]))
+        sys.exit(0)
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print "%10s %10s %12s %12s" % ("registers", "fields", "model [kB]", "bytes/field")
+    for size in sizes:
+        result = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--measure', str(size)])
+        num_fields, model_size = [int(value) for value in result.split()]
+        print "%10d %10d %12d %12d" % (size, num_fields, model_size // 1024, model_size // num_fields)
@@ -0,0 +1,95 @@
+#!/usr/bin/python
+#
+# Measures the bus transactions per second of the register file model
+# (register_model.py) on a synthetic module
+#
+# A random mix of reads and writes of the module's registers is executed once
+# transaction by transaction (cycle()) and once as a batch (run()); both must
+# give the same read data. Before, run() is checked against cycle() on random
+# batches, including empty ones, interleaved with idle cycles, user logic
+# writes and resets.
+#
+# usage: python benchmarks/bench_model.py [num_registers] [num_transactions]
+#
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from register_model import RegisterFileModel
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_REGISTERS = 1000
+DEFAULT_TRANSACTIONS = 1000000
+CHECK_STEPS = 2000
+
+#
+# Returns the state of a model which run() and cycle() must agree on
+def model_state(model):
+    return (list(model.values), model.strobe_slot, model.cycles, sorted(model.settle), list(model.user_writes))
+
+#
+# Checks that run() is equivalent to cycle() on random batches of transactions
+def check_run(module, addresses, rnd):
+    batch_model = RegisterFileModel(module)
+    cycle_model = RegisterFileModel(module)
+    user_fields = [(r.name, f.name, f.bitWidth, r.count if r.is_array() else None)
+                   for r in module.registers for f in r.fields if f.is_user_writable()]
+    for step in range(CHECK_STEPS):
+        action = rnd.random()
+        if action < 0.02:
+            batch_model.reset()
+            cycle_model.reset()
+        elif action < 0.1:
+            batch_model.idle()
+            cycle_model.idle()
+        elif action < 0.2 and len(user_fields) > 0:
+            register, field, width, count = rnd.choice(user_fields)
+            index = rnd.randrange(count) if count != None else None
+            value = rnd.randrange(2 ** width)
+            batch_model.user_write(register, field, value, index)
+            cycle_model.user_write(register, field, value, index)
+        else:
+            transactions = []
+            for i in range(rnd.choice((0, 0, 1, 2, 5, 20))):
+                if rnd.random() < 0.5:
+                    transactions.append((rnd.choice(addresses), None))
+                else:
+                    transactions.append((rnd.choice(addresses), rnd.randrange(2 ** 32)))
+            batch = batch_model.run(transactions)
+            single = [cycle_model.cycle(address, data) for address, data in transactions]
+            assert batch == [value for (address, data), value in zip(transactions, single) if data == None], step
+        assert model_state(batch_model) == model_state(cycle_model), step
+
+if __name__ == "__main__":
+    num_registers = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REGISTERS
+    num_transactions = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TRANSACTIONS
+    module = Module(synthesize_module(num_registers, fields_per_register=4, access_mix={"read-write": 2, "read-only": 1, "write-only": 1}))
+    rnd = random.Random(0)
+    addresses = [r.addressOffset for r in module.registers]
+    transactions = []
+    for i in xrange(num_transactions):
+        if rnd.random() < 0.5:
+            transactions.append((rnd.choice(addresses), None))
+        else:
+            transactions.append((rnd.choice(addresses), rnd.randrange(2 ** 32)))
+    check_run(module, addresses, rnd)
+    print "run() matches cycle() in %d random steps" % CHECK_STEPS
+    print "%d transactions on %d registers" % (num_transactions, num_registers)
+    print "%-14s %12s %16s" % ("API", "time [s]", "transactions/s")
+    model = RegisterFileModel(module)
+    start = time.time()
+    cycle = model.cycle
+    single = [cycle(address, data) for address, data in transactions]
+    elapsed = time.time() - start
+    print "%-14s %12.3f %16.0f" % ("cycle()", elapsed, num_transactions / elapsed)
+    model = RegisterFileModel(module)
+    start = time.time()
+    batch = model.run(transactions)
+    elapsed = time.time() - start
+    print "%-14s %12.3f %16.0f" % ("run()", elapsed, num_transactions / elapsed)
+    assert batch == [value for (address, data), value in zip(transactions, single) if data == None]
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+#
+# Measures field reads and writes per second through a generated Python
+# register access module (see hdlregs.py -python)
+#
+# The module is generated for a synthetic register file and mapped from a
+# temporary file. For comparison, the same accesses are timed with a generic
+# accessor which looks up the field's address, offset and width in a dict and
+# packs the register with struct, as register access scripts commonly do.
+#
+# usage: python benchmarks/bench_python_access.py [num_accesses]
+#
+
+import os
+import sys
+import time
+import struct
+import shutil
+import tempfile
+import importlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from code_gen.python import PythonGenerator
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_ACCESSES = 1000000
+REPEAT = 3
+
+#
+# Returns the best time of 'function(count)' over REPEAT runs
+def best_time(function, count):
+    best = None
+    for i in range(REPEAT):
+        start = time.time()
+        function(count)
+        elapsed = time.time() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+#
+# Generic accessor: dict lookup of the field, struct re-parsing of the register
+class DictAccessor(object):
+    def __init__(self, module, buffer):
+        self.buffer = buffer
+        self.fields = {}
+        for r in module.registers:
+            for f in r.fields:
+                self.fields[(r.name, f.name)] = (r.addressOffset, f.bitOffset, (1 << f.bitWidth) - 1)
+    #
+    def read(self, register, field):
+        address, offset, mask = self.fields[(register, field)]
+        return (struct.unpack_from('<I', self.buffer, address)[0] >> offset) & mask
+    #
+    def write(self, register, field, value):
+        address, offset, mask = self.fields[(register, field)]
+        word = struct.unpack_from('<I', self.buffer, address)[0]
+        word = (word & ~(mask << offset)) | ((value & mask) << offset)
+        struct.pack_into('<I', self.buffer, address, word & 0xFFFFFFFF)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ACCESSES
+    module = Module(synthesize_module(16, fields_per_register=4, access_mix={"read-write": 1}, fixed_ratio=0.0))
+    register = module.registers[7]
+    field = register.fields[2]
+    output_dir = tempfile.mkdtemp()
+    try:
+        PythonGenerator(module).save(os.path.join(output_dir, 'bench_regs.py'))
+        sys.path.insert(0, output_dir)
+        bench_regs = importlib.import_module('bench_regs')
+        data_file = os.path.join(output_dir, 'regs.bin')
+        with open(data_file, 'wb') as f:
+            f.write(b'\0' * bench_regs.SIZE)
+        with bench_regs.SyntheticRegs(data_file) as regs:
+            reg = getattr(regs, register.name)
+            name = field.name
+            #
+            def generated_read(n):
+                r = reg
+                for i in xrange(n):
+                    r.f2
+            #
+            def generated_write(n):
+                r = reg
+                for i in xrange(n):
+                    r.f2 = i
+            #
+            accessor = DictAccessor(module, regs._mmap)
+            #
+            def dict_read(n):
+                read = accessor.read
+                for i in xrange(n):
+                    read(register.name, name)
+            #
+            def dict_write(n):
+                write = accessor.write
+                for i in xrange(n):
+                    write(register.name, name, i)
+            #
+            print "%d accesses to field '%s.%s' of a file-backed mmap, best of %d" % (count, register.name, name, REPEAT)
+            print "%-22s %16s %16s" % ("accessor", "reads/s", "writes/s")
+            for label, read, write in (("generated module", generated_read, generated_write),
+                                       ("dict + struct", dict_read, dict_write)):
+                print "%-22s %16.0f %16.0f" % (label, count / best_time(read, count), count / best_time(write, count))
+    finally:
+        shutil.rmtree(output_dir)
@@ -0,0 +1,49 @@
+#!/usr/bin/python
+#
+# Startup benchmark: interpreter-to-exit time of hdlregs.py generating only the
+# C header of the example module, compared to a bare interpreter run. Fails if
+# the overhead of hdlregs.py exceeds the startup budget.
+#
+# usage: python benchmarks/bench_startup.py [num_runs]
+#
+
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import time
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STARTUP_BUDGET = 0.050  # seconds on top of the bare interpreter startup
+DEFAULT_NUM_RUNS = 20
+
+#
+# Returns the median wall-clock time of running a command 'num_runs' times
+def median_run_time(command, num_runs):
+    times = []
+    for i in range(num_runs):
+        start = time.time()
+        subprocess.check_call(command)
+        times.append(time.time() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+if __name__ == "__main__":
+    num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_RUNS
+    output_dir = tempfile.mkdtemp()
+    try:
+        hdlregs = [sys.executable, os.path.join(ROOT_DIR, 'hdlregs.py'),
+                   os.path.join(ROOT_DIR, 'example', 'example.json'),
+                   '-novhdl', '-nohtml', '-c_output_dir', output_dir]
+        bare_time = median_run_time([sys.executable, '-c', 'pass'], num_runs)
+        hdlregs_time = median_run_time(hdlregs, num_runs)
+    finally:
+        shutil.rmtree(output_dir)
+    overhead = hdlregs_time - bare_time
+    print "interpreter:         %6.1f ms" % (1000 * bare_time)
+    print "hdlregs.py (C only): %6.1f ms" % (1000 * hdlregs_time)
+    print "overhead:            %6.1f ms (budget: %.1f ms)" % (1000 * overhead, 1000 * STARTUP_BUDGET)
+    if overhead > STARTUP_BUDGET:
+        print "startup budget exceeded"
+        sys.exit(-1)
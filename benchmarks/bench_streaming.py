@@ -0,0 +1,63 @@
+#!/usr/bin/python
+#
+# Peak memory of the code generators: every size is measured in a fresh process,
+# which reports the growth of its peak resident set size while writing all
+# outputs (i.e. on top of the memory already taken by the elaborated module).
+#
+# usage: python benchmarks/bench_streaming.py [num_registers ...]
+#
+
+import os
+import sys
+import gc
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module
+from benchmarks.synthetic import synthesize_module
+import code_gen.vhdl
+import code_gen.html
+import code_gen.c
+
+DEFAULT_SIZES = (1000, 5000, 20000, 50000)
+
+#
+# Returns the peak resident set size of this process in kB
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+#
+# Generate all outputs for a module with 'size' registers and print the
+# peak memory before and after code generation
+def measure(size):
+    module = Module(synthesize_module(size))
+    gc.collect()
+    rss_before = peak_rss()
+    output_dir = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        code_gen.vhdl.VhdlPackageGenerator(module).save(os.path.join(output_dir, 'pkg.vhd'))
+        code_gen.vhdl.VhdlComponentGenerator(module).save(os.path.join(output_dir, 'regs.vhd'))
+        code_gen.c.CHeaderGenerator(module).save(os.path.join(output_dir, 'regs.h'))
+        code_gen.html.HtmlGenerator(module).save(os.path.join(output_dir, 'regs.html'))
+        elapsed = time.time() - start
+        output_size = sum(os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir))
+    finally:
+        shutil.rmtree(output_dir)
+    print "%d %d %d %f" % (rss_before, peak_rss(), output_size, elapsed)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--measure':
+        measure(int(sys.argv[2]))
+        sys.exit(0)
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print "%10s %12s %14s %16s %10s" % ("registers", "output [kB]", "model RSS [kB]", "generation [kB]", "time [s]")
+    for size in sizes:
+        result = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--measure', str(size)])
+        rss_before, rss_after, output_size, elapsed = result.split()
+        print "%10d %12d %14d %16d %10.2f" % (size, int(output_size) // 1024, int(rss_before), int(rss_after) - int(rss_before), float(elapsed))
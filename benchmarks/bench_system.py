@@ -0,0 +1,76 @@
+#!/usr/bin/python
+#
+# Measures the construction of systems (see structures.System) with many
+# instances of a few synthetic modules
+#
+# Every module file must be loaded once, however often it is instantiated. The
+# overlap check of the address map is compared with checking all pairs of
+# instances, which is only timed up to PAIRWISE_INSTANCES instances.
+#
+# usage: python benchmarks/bench_system.py [max_instances]
+#
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from structures import Module, System
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_INSTANCES = 64000
+NUM_MODULES = 4
+PAIRWISE_INSTANCES = 4000
+
+#
+# Returns the first pair of overlapping instances, checking all pairs
+def pairwise_overlap(instances):
+    for i in range(len(instances)):
+        for j in range(i + 1, len(instances)):
+            a = instances[i]
+            b = instances[j]
+            if a.low_address() <= b.high_address() and b.low_address() <= a.high_address():
+                return a, b
+    return None
+
+if __name__ == "__main__":
+    max_instances = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_INSTANCES
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(NUM_MODULES):
+            json_module = synthesize_module(64 * (i + 1), seed=i)
+            json_module["name"] = "module%d" % i
+            with open(os.path.join(directory, "module%d.json" % i), 'w') as f:
+                json.dump(json_module, f)
+        loaded = []
+        #
+        def load_module(path):
+            loaded.append(path)
+            with open(path) as f:
+                return Module(json.load(f))
+        #
+        print "%-12s %8s %14s %14s" % ("instances", "loads", "System [s]", "pairwise [s]")
+        num_instances = 1000
+        while num_instances <= max_instances:
+            json_system = {"name": "system", "description": "synthetic system",
+                           "instances": [{"name": "inst%d" % i, "module": "module%d.json" % (i % NUM_MODULES),
+                                          "baseAddress": "0x%X" % (i * 0x1000)} for i in range(num_instances)]}
+            del loaded[:]
+            start = time.time()
+            system = System(json_system, load_module, directory)
+            elapsed = time.time() - start
+            assert len(loaded) == NUM_MODULES
+            if num_instances <= PAIRWISE_INSTANCES:
+                start = time.time()
+                assert pairwise_overlap(system.instances) == None
+                pairwise = "%14.3f" % (time.time() - start)
+            else:
+                pairwise = "%14s" % "-"
+            print "%-12d %8d %14.3f %s" % (num_instances, len(loaded), elapsed, pairwise)
+            num_instances *= 4
+    finally:
+        shutil.rmtree(directory)
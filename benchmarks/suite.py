@@ -0,0 +1,164 @@
+#!/usr/bin/python
+#
+# Benchmark suite: per-stage timings and peak memory for synthetic modules
+#
+# Every case is run in a fresh process, which times the stages of hdlregs.py
+# separately (best of several repetitions) and reports its peak resident set
+# size. The results are printed as a table and can be written as JSON and
+# compared against a stored baseline.
+#
+# usage: python benchmarks/suite.py [-case NAME] [-repeat N] [-output FILE]
+#                                   [-baseline FILE] [-save_baseline FILE]
+#
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import importlib
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import structures
+import hdlregs
+from profiler import Profiler
+from benchmarks.synthetic import synthesize_module
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+TOLERANCE = 0.20  # relative slow-down reported as a regression
+
+#
+# Benchmark cases: name and synthesize_module() arguments
+#
+CASES = (
+    ("rw-1k",           dict(num_registers=1000, fields_per_register=1, access_mix={"read-write": 1}, fixed_ratio=0.0)),
+    ("mixed-1k",        dict(num_registers=1000, fields_per_register=4, access_mix={"read-write": 2, "read-only": 1, "write-only": 1}, fixed_ratio=0.25, fixed_field_ratio=0.5)),
+    ("mixed-10k",       dict(num_registers=10000, fields_per_register=4, access_mix={"read-write": 2, "read-only": 1, "write-only": 1}, fixed_ratio=0.25, fixed_field_ratio=0.5)),
+    ("fixed-10k",       dict(num_registers=10000, fields_per_register=2, access_mix={"read-write": 1, "read-only": 1}, fixed_ratio=1.0)),
+    ("auto-fields-10k", dict(num_registers=10000, fields_per_register=8, access_mix={"read-write": 1, "read-only": 1, "write-only": 1}, fixed_ratio=0.0, fixed_field_ratio=0.0)),
+)
+
+#
+# Generators timed by the suite, in the order used by hdlregs.py
+#
+GENERATORS = [(generator_class, generator_module) for output_option, output_dir_option, suffix, generator_module, generator_class, generator_options in hdlregs.GENERATORS]
+
+#
+# Returns the best time of 'repeat' calls of 'function' and its last result
+def best_time(function, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best, result
+
+#
+# Runs all stages of one benchmark case and returns its results
+def run_case(name, repeat):
+    kwargs = dict(CASES)[name]
+    json_module = synthesize_module(**kwargs)
+    output_dir = tempfile.mkdtemp()
+    stages = []
+    try:
+        spec_file = os.path.join(output_dir, 'spec.json')
+        with open(spec_file, 'w') as f:
+            json.dump(json_module, f, indent=4)
+        # Reading and ASCII scan, JSON parsing
+        def ascii_scan():
+            return hdlregs.find_non_ascii(hdlregs.read_spec(spec_file))
+        stages.append(("ascii_scan", best_time(ascii_scan, repeat)[0]))
+        def json_load():
+            with open(spec_file) as f:
+                return json.load(f)
+        elapsed, json_data = best_time(json_load, repeat)
+        stages.append(("json_load", elapsed))
+        # Module construction, elaboration and check
+        profiler = Profiler(name)
+        profiler.instrument(structures.Module, 'elaborate', 'elaborate')
+        profiler.instrument(structures.Module, 'check', 'check')
+        elapsed, module = best_time(lambda: structures.Module(json_data), 1)
+        elaborate = profiler.wall.get('elaborate', 0.0)
+        check = profiler.wall.get('check', 0.0)
+        stages.append(("module_construct", elapsed - elaborate - check))
+        stages.append(("module_elaborate", elaborate))
+        stages.append(("module_check", check))
+        # Code generators
+        for generator_class, generator_module in GENERATORS:
+            generator = getattr(importlib.import_module(generator_module), generator_class)
+            filename = os.path.join(output_dir, generator_class)
+            elapsed = best_time(lambda: generator(module).save(filename), repeat)[0]
+            stages.append((generator_class, elapsed))
+        num_fields = sum(len(r.fields) for r in module.registers)
+    finally:
+        shutil.rmtree(output_dir)
+    return dict(registers=len(module.registers),
+                fields=num_fields,
+                stages=dict(stages),
+                stage_order=[stage for stage, elapsed in stages],
+                peak_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+#
+# Prints the results of a case, compared to its baseline (if any). Returns the
+# list of regressions.
+def report(name, result, baseline):
+    regressions = []
+    print "%s: %d registers, %d fields, peak RSS %d kB" % (name, result["registers"], result["fields"], result["peak_rss_kb"])
+    for stage in result["stage_order"]:
+        elapsed = result["stages"][stage]
+        line = "    %-24s %10.4f s" % (stage, elapsed)
+        if baseline != None and stage in baseline["stages"]:
+            reference = baseline["stages"][stage]
+            line += "   baseline %10.4f s" % reference
+            if reference > 0 and elapsed > reference * (1 + TOLERANCE) and elapsed - reference > 0.001:
+                line += "   REGRESSION (+%.0f%%)" % (100 * (elapsed / reference - 1))
+                regressions.append("%s/%s" % (name, stage))
+        print line
+    if baseline != None and result["peak_rss_kb"] > baseline["peak_rss_kb"] * (1 + TOLERANCE):
+        print "    peak RSS %d kB, baseline %d kB   REGRESSION" % (result["peak_rss_kb"], baseline["peak_rss_kb"])
+        regressions.append("%s/peak_rss" % name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='HDLRegs benchmark suite')
+    parser.add_argument('-case', action='append',
+                        help='run only the given case (default: all cases)')
+    parser.add_argument('-repeat', type=int, default=3,
+                        help='repetitions per stage, the best time is reported')
+    parser.add_argument('-output', help='write the results to a JSON file')
+    parser.add_argument('-baseline', default=DEFAULT_BASELINE,
+                        help='compare against the results in a JSON file')
+    parser.add_argument('-save_baseline', help='store the results as new baseline')
+    parser.add_argument('-run_case', help=argparse.SUPPRESS)  # used for the case subprocesses
+    arguments = parser.parse_args()
+
+    if arguments.run_case != None:
+        print json.dumps(run_case(arguments.run_case, arguments.repeat))
+        sys.exit(0)
+
+    case_names = arguments.case or [name for name, kwargs in CASES]
+    baseline = {}
+    if os.path.isfile(arguments.baseline):
+        with open(arguments.baseline) as f:
+            baseline = json.load(f)["cases"]
+    results = {}
+    regressions = []
+    for name in case_names:
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '-run_case', name, '-repeat', str(arguments.repeat)])
+        results[name] = json.loads(output)
+        regressions += report(name, results[name], baseline.get(name))
+    document = dict(hdlregs_version=structures.constants.HDLREGS_VERSION, cases=results)
+    for filename in (arguments.output, arguments.save_baseline):
+        if filename != None:
+            with open(filename, 'w') as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+    if len(regressions) > 0:
+        print "%d regression(s): %s" % (len(regressions), ", ".join(regressions))
+        sys.exit(-1)
@@ -0,0 +1,72 @@
+#
+# Synthetic register specifications for benchmarking
+#
+
+import random
+
+ACCESS_MODES = ("read-write", "read-only", "write-only")
+
+#
+# Returns a JSON-like module description with 'num_registers' registers.
+#
+#   fields_per_register  number of fields per register; a single field spans
+#                        the whole register
+#   access_mix           relative weights of the field access modes, e.g.
+#                        {"read-write": 2, "read-only": 1}
+#   fixed_ratio          fraction of registers with a fixed address offset,
+#                        the others are allocated by the elaborator
+#   fixed_field_ratio    fraction of fields with a fixed bit offset
+#
+def synthesize_module(num_registers, fields_per_register=1, access_mix=None,
+                      fixed_ratio=0.25, fixed_field_ratio=1.0, seed=0):
+    rnd = random.Random(seed)
+    if access_mix == None:
+        access_mix = {"read-write": 1}
+    access_modes = []
+    for access in ACCESS_MODES:
+        access_modes += [access] * access_mix.get(access, 0)
+    registers = []
+    used_offsets = set()
+    for i in range(num_registers):
+        json_reg = {"name"        : "reg%d" % i,
+                    "description" : "synthetic register %d" % i,
+                    "fields"      : synthesize_fields(rnd, fields_per_register, access_modes, fixed_field_ratio)}
+        if rnd.random() < fixed_ratio:
+            offset = 4 * rnd.randrange(2 * num_registers)
+            if offset not in used_offsets:
+                used_offsets.add(offset)
+                json_reg["addressOffset"] = "0x%X" % offset
+        registers.append(json_reg)
+    return {"name"        : "synthetic",
+            "description" : "synthetic module with %d registers" % num_registers,
+            "width"       : 32,
+            "registers"   : registers}
+
+#
+# Returns the fields of a synthetic 32-bit register
+#
+def synthesize_fields(rnd, num_fields, access_modes, fixed_field_ratio):
+    if num_fields == 1:
+        return [{"name"        : "value",
+                 "description" : "register value",
+                 "bitOffset"   : 0,
+                 "bitWidth"    : 32,
+                 "access"      : rnd.choice(access_modes)}]
+    bit_width = 32 // num_fields
+    fields = []
+    for i in range(num_fields):
+        json_field = {"name"        : "f%d" % i,
+                      "description" : "synthetic field %d" % i,
+                      "bitWidth"    : bit_width,
+                      "access"      : rnd.choice(access_modes)}
+        if rnd.random() < fixed_field_ratio:
+            json_field["bitOffset"] = i * bit_width
+        if json_field["access"] == "read-only":
+            if rnd.random() < 0.5:
+                json_field["userWriteStrobe"] = "yes"
+        elif rnd.random() < 0.1:
+            json_field["selfClear/Set"] = 0
+        if rnd.random() < 0.5:
+            json_field["reset"] = rnd.randrange(2 ** bit_width)
+        fields.append(json_field)
+    return fields
@@ -0,0 +1,120 @@
+#
+# Content-addressed cache for generated output files
+#
+# Every cache entry is a directory named after the hash of a register
+# definition file's content, the HDLRegs version and the output options. It
+# holds a copy of the generated files plus a manifest telling into which output
+# directory each file goes. The manifest's modification time records the last
+# use of the entry, which drives the least-recently-used eviction.
+#
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import code_gen.constants as constants
+
+class OutputCache():
+    MANIFEST = "manifest.json"
+    #
+    # Cache constructor; 'max_size' is the size limit in bytes
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    #
+    # Returns the cache key for a register definition and the output options,
+    # i.e. all options that influence the content of the generated files
+    def key(self, content, output_options):
+        h = hashlib.sha1()
+        h.update(constants.HDLREGS_VERSION)
+        h.update('\0')
+        h.update(json.dumps(output_options, sort_keys=True))
+        h.update('\0')
+        h.update(content)
+        return h.hexdigest()
+    #
+    # Copies the cached files of an entry into their output directories, which
+    # are looked up by name in 'options'. Files that are already up-to-date are
+    # not rewritten, so that their timestamps do not change. Returns False if
+    # there is no entry for the key.
+    def restore(self, key, options):
+        entry_dir = os.path.join(self.directory, key)
+        manifest = os.path.join(entry_dir, self.MANIFEST)
+        try:
+            with open(manifest) as f:
+                outputs = json.load(f)
+        except (IOError, ValueError):
+            return False
+        for output_dir_option, name in outputs:
+            source = os.path.join(entry_dir, name)
+            destination = os.path.join(options[output_dir_option], name)
+            if not same_content(source, destination):
+                shutil.copyfile(source, destination)
+        os.utime(manifest, None)  # mark as recently used
+        return True
+    #
+    # Adds an entry for the given output files, a list of (output directory
+    # option, file path) tuples
+    def store(self, key, outputs):
+        entry_dir = os.path.join(self.directory, key)
+        if os.path.isdir(entry_dir):
+            return
+        # build the entry in a temporary directory and rename it, so that other
+        # processes never see incomplete entries
+        temp_dir = tempfile.mkdtemp(dir=self.directory, prefix='.tmp')
+        manifest = []
+        for output_dir_option, path in outputs:
+            name = os.path.basename(path)
+            shutil.copyfile(path, os.path.join(temp_dir, name))
+            manifest.append((output_dir_option, name))
+        with open(os.path.join(temp_dir, self.MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+        try:
+            os.rename(temp_dir, entry_dir)
+        except OSError:  # stored by another process in the meantime
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    #
+    # Returns a list of (last use, size in bytes, directory) tuples, one per entry
+    def entries(self):
+        result = []
+        for name in os.listdir(self.directory):
+            entry_dir = os.path.join(self.directory, name)
+            manifest = os.path.join(entry_dir, self.MANIFEST)
+            if name.startswith('.') or not os.path.isfile(manifest):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            result.append((os.path.getmtime(manifest), size, entry_dir))
+        return result
+    #
+    # Removes the least-recently-used entries until the cache fits into its
+    # size limit. Returns the number of removed entries.
+    def evict(self):
+        entries = sorted(self.entries(), reverse=True)
+        total_size = 0
+        num_evicted = 0
+        for last_use, size, entry_dir in entries:
+            total_size += size
+            if total_size > self.max_size:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                num_evicted += 1
+        return num_evicted
+    #
+    # Returns the number of entries and their total size in bytes
+    def usage(self):
+        entries = self.entries()
+        return len(entries), sum(size for last_use, size, entry_dir in entries)
+
+#
+# Returns True if both files exist and have the same content
+#
+def same_content(filename1, filename2):
+    if not os.path.isfile(filename2):
+        return False
+    if os.path.getsize(filename1) != os.path.getsize(filename2):
+        return False
+    with open(filename1, 'rb') as f1:
+        with open(filename2, 'rb') as f2:
+            return f1.read() == f2.read()
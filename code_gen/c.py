@@ -6,39 +6,180 @@ import os
 import datetime
 import constants
 from .shared import CodeGenerator
+from .shared import template_chunks
 import code_gen.templates.c as c_templates
 
+#
+# If 'accessors' is set, the header additionally defines static inline
+# functions per field, which extract a field from a register value (_get),
+# replace it in a register value (_insert) or in a register (_set, a
+# read-modify-write access), and a <REG>_PACK() macro per register which
+# combines the values of all its bus-writable fields, so that several fields
+# are written with a single store. With constant arguments, the macro is a
+# compile-time constant.
+#
+# If 'shadow' is set, the header defines a shadow register cache: a struct
+# holding a copy of every bus-writable register (array element), functions
+# updating fields in the copies and marking them dirty, writing the dirty
+# registers back (flush) and forgetting the copies (invalidate). Registers are
+# only read from the bus when a field is updated in a register which is not
+# cached yet; write-only fields are taken from the reset value then, and
+# self-clearing/setting fields from their settled value after a write back.
+#
 class CHeaderGenerator(CodeGenerator):
-    def __init__(self, module):
-        # Register address offsets
-        address_offsets = ""
+    def __init__(self, module, accessors=False, shadow=False):
+        self.module = module
+        self.accessors = accessors
+        self.shadow = shadow
+    #
+    # Returns the pieces of the generated C header
+    def chunks(self):
+        module = self.module
+        module_name = module.name.upper() + "_REGS"
+        d = dict(module_name = module_name,
+                 address_offsets = self.address_offsets(module),
+                 fields = self.fields(module),
+                 includes = "\n#include <stdint.h>\n" if self.accessors or self.shadow else "",
+                 accessors = self.field_accessors(module) if self.accessors else "",
+                 shadow = self.shadow_registers(module) if self.shadow else "",
+                 json_module_name = module.name,
+                 hdlregs_version = constants.HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return template_chunks(c_templates.C_HEADER_TEMPLATE, d)
+    #
+    # Register address offsets; register arrays get an index macro, memories
+    # their base address, size in bytes, depth in words and word width
+    def address_offsets(self, module):
         for r in module.registers:
-            address_offsets += '#define %s 0x%.8X\n' % (self.address_identifier(r), r.addressOffset)
-        # Field bit offsets
-        fields = ""
+            if r.is_array():
+                yield '#define %s(i) (0x%.8X + (i) * 0x%X)\n' % (self.address_identifier(r), r.addressOffset, r.stride)
+                yield '#define %s %d\n' % (self.count_identifier(r), r.count)
+                yield '#define %s 0x%X\n' % (self.stride_identifier(r), r.stride)
+            else:
+                yield '#define %s 0x%.8X\n' % (self.address_identifier(r), r.addressOffset)
+        for m in module.memories:
+            yield '#define %s 0x%.8X\n' % (self.address_identifier(m), m.addressOffset)
+            yield '#define %s 0x%X\n' % (self.size_identifier(m), m.address_span())
+            yield '#define %s %d\n' % (self.depth_identifier(m), m.depth)
+            yield '#define %s %d\n' % (self.data_width_identifier(m), m.width)
+    #
+    # Field bit offsets
+    def fields(self, module):
         for r in module.registers:
             register_name = r.name.upper()
-            fields += "//\n"
-            fields += "// Fields in register '%s'\n" % register_name
-            fields += "//\n"
+            yield "//\n"
+            yield "// Fields in register '%s'\n" % register_name
+            yield "//\n"
             for f in r.fields:
                 field_name = f.name.upper()
                 field_mask = (2 ** f.bitWidth - 1) << f.bitOffset
-                fields += "// Field '%s'\n" % f.name
-                fields += "#define %s %d\n" % (self.bitOffset_identifier(f), f.bitOffset)
-                fields += "#define %s %d\n" % (self.bitWidth_identifier(f), f.bitWidth)
-                fields += "#define %s 0x%.8X\n" % (self.bitMask_identifier(f), field_mask)
-                fields += "\n"
-            fields += "\n"
-        module_name = module.name.upper() + "_REGS"
-        d = dict(module_name = module_name,
-                 address_offsets = address_offsets,
-                 fields = fields,
-                 json_module_name = module.name,
-                 hdlregs_version = constants.HDLREGS_VERSION,
-                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
-        self._code = c_templates.C_HEADER_TEMPLATE.substitute(d)
-                
-    def save(self, filename):
-        with open(filename, 'w') as f:
-            f.write(self._code)
+                yield "// Field '%s'\n" % f.name
+                yield "#define %s %d\n" % (self.bitOffset_identifier(f), f.bitOffset)
+                yield "#define %s %d\n" % (self.bitWidth_identifier(f), f.bitWidth)
+                yield "#define %s 0x%.8X\n" % (self.bitMask_identifier(f), field_mask)
+                yield "\n"
+            yield "\n"
+    #
+    # Field accessor functions and register pack macros
+    def field_accessors(self, module):
+        yield "//\n"
+        yield "// Field accessors\n"
+        yield "//\n"
+        for r in module.registers:
+            register_name = r.name.upper()
+            yield "\n"
+            yield "// Register '%s'\n" % register_name
+            # read-modify-write accesses must not clobber write-only fields
+            read_modify_write = all(f.is_bus_readable() for f in r.bus_writable_fields())
+            for f in r.fields:
+                function = "%s_%s" % (r.name.lower(), f.name.lower())
+                mask = self.bitMask_identifier(f)
+                offset = self.bitOffset_identifier(f)
+                if f.is_bus_readable():
+                    yield "static inline uint32_t %s_get(uint32_t reg)\n" % function
+                    yield "{\n"
+                    yield "    return (reg & %s) >> %s;\n" % (mask, offset)
+                    yield "}\n"
+                if f.is_bus_writable():
+                    yield "static inline uint32_t %s_insert(uint32_t reg, uint32_t value)\n" % function
+                    yield "{\n"
+                    yield "    return (reg & ~(uint32_t)%s) | ((value << %s) & %s);\n" % (mask, offset, mask)
+                    yield "}\n"
+                    if read_modify_write:
+                        yield "static inline void %s_set(volatile uint32_t *reg, uint32_t value)\n" % function
+                        yield "{\n"
+                        yield "    *reg = %s_insert(*reg, value);\n" % function
+                        yield "}\n"
+            fields = r.bus_writable_fields()
+            if len(fields) > 0:
+                terms = ["(((uint32_t)(%s) << %s) & %s)" % (f.name.lower(), self.bitOffset_identifier(f), self.bitMask_identifier(f)) for f in fields]
+                yield "#define %s_PACK(%s) \\\n" % (register_name, ", ".join(f.name.lower() for f in fields))
+                yield "    (" + " | \\\n     ".join(terms) + ")\n"
+        yield "\n"
+    #
+    # Shadow register cache
+    def shadow_registers(self, module):
+        prefix = module.name.lower() + "_shadow"
+        count_identifier = module.name.upper() + "_SHADOW_COUNT"
+        registers = [r for r in module.registers if r.is_bus_writable()]
+        if len(registers) == 0:
+            # ISO C has no zero-size arrays
+            yield "//\n"
+            yield "// No shadow registers: the module has no bus-writable registers\n"
+            yield "//\n"
+            yield "\n"
+            return
+        count = 0
+        yield "//\n"
+        yield "// Shadow registers: indices of the cached registers\n"
+        yield "//\n"
+        for r in registers:
+            if r.is_array():
+                yield "#define SHADOW_%s(i) (%d + (i))\n" % (r.name.upper(), count)
+                count += r.count
+            else:
+                yield "#define SHADOW_%s %d\n" % (r.name.upper(), count)
+                count += 1
+        yield "#define %s %d\n" % (count_identifier, count)
+        yield "\n"
+        yield "typedef struct {\n"
+        yield "    uint32_t offset;    // address offset\n"
+        yield "    uint32_t writable;  // bits of the bus-writable fields\n"
+        yield "    uint32_t readback;  // bits of the bus-writable fields which can be read back\n"
+        yield "    uint32_t reset;     // reset value\n"
+        yield "    uint32_t transient; // bits of the self-clearing/setting fields\n"
+        yield "    uint32_t settled;   // value of the transient bits after the write\n"
+        yield "} %s_reg_t;\n" % prefix
+        yield "\n"
+        yield "static const %s_reg_t %s_regs[%s] = {\n" % (prefix, prefix, count_identifier)
+        for r in registers:
+            writable = 0
+            readback = 0
+            transient = 0
+            settled = 0
+            for f in r.bus_writable_fields():
+                mask = (2 ** f.bitWidth - 1) << f.bitOffset
+                writable |= mask
+                if f.is_bus_readable():
+                    readback |= mask
+                if f.selfClearSet != None:
+                    transient |= mask
+                    if f.selfClearSet == 1:
+                        settled |= mask
+            reset = r.reset() or 0
+            for i in xrange(r.count if r.is_array() else 1):
+                offset = r.addressOffset + i * (r.stride or 0)
+                yield "    { 0x%.8X, 0x%.8X, 0x%.8X, 0x%.8X, 0x%.8X, 0x%.8X }, // %s\n" % (offset, writable, readback, reset, transient, settled, "%s[%d]" % (r.name, i) if r.is_array() else r.name)
+        yield "};\n"
+        yield "\n"
+        yield c_templates.C_SHADOW_FUNCTIONS_TEMPLATE.substitute(prefix = prefix, count = count_identifier)
+        yield "// Field updates\n"
+        for r in registers:
+            index = "SHADOW_%s(i)" % r.name.upper() if r.is_array() else "SHADOW_%s" % r.name.upper()
+            index_argument = ", unsigned i" if r.is_array() else ""
+            for f in r.bus_writable_fields():
+                yield "static inline void %s_%s_update(%s_t *s%s, uint32_t value)\n" % (r.name.lower(), f.name.lower(), prefix, index_argument)
+                yield "{\n"
+                yield "    %s_update(s, %s, %s, value << %s);\n" % (prefix, index, self.bitMask_identifier(f), self.bitOffset_identifier(f))
+                yield "}\n"
+        yield "\n"
@@ -2,35 +2,106 @@
 # HTML code generator
 #
 
+import os
+import json
 import datetime
 import constants
 import structures
 import code_gen.templates.html as html_templates
+from .shared import CodeGenerator
 from .shared import indent
+from .shared import template_chunks
 
-class HtmlGenerator():
-    def __init__(self, module):       
-        # HTML overview list
-        
-        html_overview = indent(4) + '<table id="overview">\n'
+#
+# With 'split', the registers (and memories) are described on pages of 'split'
+# registers each, which the document loads on demand, together with a search
+# index. Every page is written to its own file as soon as it is generated.
+#
+class HtmlGenerator(CodeGenerator):
+    def __init__(self, module, split=0):       
+        self.module = module
+        self.split = split
+        self.prefix = module.name + '_regs'  # file name prefix of the pages
+    #
+    # Returns the pieces of the generated HTML document
+    def chunks(self):
+        module = self.module
+        if self.split > 0:
+            d = dict(module_name=module.name,
+                     date_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                     hdlregs_version=constants.HDLREGS_VERSION,
+                     prefix=self.prefix,
+                     pages=self.pages_html())
+            return template_chunks(html_templates.HTML_SPLIT_DOC_TEMPLATE, d)
+        d = dict(module_name=module.name,
+                 date_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                 hdlregs_version=constants.HDLREGS_VERSION,
+                 registers=self.registers_html(module),
+                 overview=self.overview_html(module))
+        return template_chunks(html_templates.HTML_DOC_TEMPLATE, d)
+    #
+    # HTML overview list
+    def overview_html(self, module):
+        yield indent(4) + '<table id="overview">\n'
         html_cell_class = 'even'
-        for r in module.registers:
-            html_overview += indent(5) + '<tr><td class="%s"><a class="overview" href="#%s">%s</d></td></tr>\n' % (html_cell_class, r.name, r.name)
+        for r in module.registers + module.memories:
+            yield indent(5) + '<tr><td class="%s"><a class="overview" href="#%s">%s</d></td></tr>\n' % (html_cell_class, r.name, r.name)
+            # cycle cell colors:
+            if html_cell_class == 'even': html_cell_class = 'odd'
+            elif html_cell_class == 'odd': html_cell_class = 'even'
+        yield indent(4) + '</table>\n'        
+    #
+    # Returns the registers and memories of the split document, page by page
+    def pages(self):
+        elements = self.module.registers + self.module.memories
+        return [elements[i:i + self.split] for i in range(0, len(elements), self.split)]
+    #
+    # HTML list of the pages of the split document
+    def pages_html(self):
+        yield indent(3) + '<table id="overview">\n'
+        html_cell_class = 'even'
+        for number, page in enumerate(self.pages(), 1):
+            yield indent(4) + '<tr><td class="%s"><a class="overview" href="#" onclick="hdlregs.openPage(%d); return false;">%s &hellip; %s</a></td></tr>\n' % (html_cell_class, number, page[0].name, page[-1].name)
             # cycle cell colors:
             if html_cell_class == 'even': html_cell_class = 'odd'
             elif html_cell_class == 'odd': html_cell_class = 'even'
-        html_overview += indent(4) + '</table>\n'        
-        # HTML detailed description
-        html_registers = ""
+        yield indent(3) + '</table>\n'
+    #
+    # Saves the document; with 'split', the pages and the search index are
+    # saved next to it. Returns the names of the written files.
+    def save(self, filename):
+        if self.split == 0:
+            return CodeGenerator.save(self, filename)
+        self.prefix = os.path.basename(os.path.splitext(filename)[0])
+        directory = os.path.dirname(filename)
+        written = CodeGenerator.save(self, filename)
+        index_filename = os.path.join(directory, self.prefix + '_index.js')
+        with open(index_filename, 'w') as index:
+            index.write('hdlregs.setIndex({"module":%s,"entries":[' % json.dumps(self.module.name))
+            separator = '\n'
+            for number, page in enumerate(self.pages(), 1):
+                page_filename = os.path.join(directory, '%s_p%04d.js' % (self.prefix, number))
+                with open(page_filename, 'w') as f:
+                    f.write('hdlregs.setPage(%d, %s,\n' % (number, json.dumps([e.name for e in page])))
+                    f.write(json.dumps(''.join(self.to_html(e) for e in page)))
+                    f.write(');\n')
+                written.append(page_filename)
+                for e in page:
+                    fields = getattr(e, 'fields', [])
+                    entry = [e.name, "0x%.8X" % e.addressOffset, number, " ".join(f.name for f in fields)]
+                    index.write(separator + json.dumps(entry, separators=(',', ':')))
+                    separator = ',\n'
+            index.write(']});\n')
+        written.append(index_filename)
+        return written
+    #
+    # HTML detailed description
+    def registers_html(self, module):
         for r in module.registers:
-            html_registers += self.to_html(r)
-        d = dict(module_name=module.name,
-                 date_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-                 hdlregs_version=constants.HDLREGS_VERSION,
-                 registers=html_registers,
-                 overview=html_overview)
-        self._code = html_templates.HTML_DOC_TEMPLATE.substitute(d)    
-        
+            yield self.to_html(r)
+        for m in module.memories:
+            yield self.to_html(m)
+    #
     def to_html(self, element):
         # Register -> HTML
         if isinstance(element, structures.Register):
@@ -40,11 +111,28 @@ class HtmlGenerator():
             for f in fields_sorted:
                 fields_html += self.to_html(f)
             str_addressOffset = "0x%.8X" % r.addressOffset
+            if r.is_array():
+                str_addressOffset += " + i &times; 0x%X<br>(i = 0..%d)" % (r.stride, r.count - 1)
             d = dict(register_name=r.name,
                      register_description=r.description,
                      register_addr_offset=str_addressOffset,
                      register_fields=fields_html)
             return html_templates.HTML_REGISTER_TEMPLATE.substitute(d)
+        # Memory -> HTML: a single row describes the words
+        elif isinstance(element, structures.Memory):
+            m = element
+            word_size = m.parent_module_.width // 8
+            d = dict(field_range="%d:0" % (m.width - 1) if m.width > 1 else 0,
+                     field_name="%s[i]" % m.name,
+                     field_access={"read-write": "RW", "read-only": "R", "write-only": "W"}[m.access],
+                     field_reset="none",
+                     field_description="%d words of %d bits (block RAM)" % (m.depth, m.width),
+                     field_selfClear="&nbsp;")
+            d = dict(register_name=m.name,
+                     register_description=m.description,
+                     register_addr_offset="0x%.8X + i &times; 0x%X<br>(i = 0..%d)" % (m.addressOffset, word_size, m.depth - 1),
+                     register_fields=html_templates.HTML_REGISTER_FIELD_TEMPLATE.substitute(d))
+            return html_templates.HTML_REGISTER_TEMPLATE.substitute(d)
         # Field -> HTML
         elif isinstance(element, structures.Field):
             if element.bitWidth == 1:
@@ -76,7 +164,3 @@ class HtmlGenerator():
                      field_description=element.description,
                      field_selfClear=field_selfClear)
             return html_templates.HTML_REGISTER_FIELD_TEMPLATE.substitute(d)            
-        
-    def save(self, filename):
-        with open(filename, 'w') as f:
-            f.write(self._code)
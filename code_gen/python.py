@@ -0,0 +1,137 @@
+#
+# Python module generator
+#
+
+import keyword
+import datetime
+import constants
+from .shared import CodeGenerator
+from .shared import template_chunks
+import code_gen.templates.python as python_templates
+
+#
+# The generated module maps the register file through mmap and views it as
+# 32-bit words without copying. Every register gets a class whose field
+# properties have their shifts and masks compiled in, so that a field access
+# is one word access plus a few integer operations.
+#
+class PythonGenerator(CodeGenerator):
+    FIELD_RESERVED_NAMES = ('raw', '_words', '_index')       # members of the register classes
+    REGISTER_RESERVED_NAMES = ('close', '_mmap', '_words')   # members of the register file class
+    #
+    def __init__(self, module):
+        self.module = module
+    #
+    # Returns the pieces of the generated Python module
+    def chunks(self):
+        module = self.module
+        example_register = module.registers[0]
+        example_field = example_register.fields[0]
+        for r in module.registers:
+            if len(self.writable_fields(r)) > 0 and not r.is_array():
+                example_register = r
+                example_field = self.writable_fields(r)[0]
+                break
+        d = dict(json_module_name = module.name,
+                 class_name = self.python_class_name(module.name) + "Regs",
+                 example_register = self.python_attribute(example_register.name, self.REGISTER_RESERVED_NAMES),
+                 example_field = self.python_attribute(example_field.name, self.FIELD_RESERVED_NAMES),
+                 size = "%X" % (module.high_address() + module.width // 8),
+                 address_offsets = self.address_offsets(module),
+                 fields = self.fields(module),
+                 register_classes = self.register_classes(module),
+                 register_attributes = self.register_attributes(module),
+                 hdlregs_version = constants.HDLREGS_VERSION,
+                 date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return template_chunks(python_templates.PYTHON_MODULE_TEMPLATE, d)
+    #
+    # Returns a CamelCase class name for a register or module name
+    def python_class_name(self, name):
+        return "".join(part[:1].upper() + part[1:] for part in name.split('_'))
+    #
+    # Returns the attribute name of a register or field, which is the name
+    # followed by an underscore if it is a Python keyword or one of the
+    # 'reserved' member names of the class it is an attribute of
+    def python_attribute(self, name, reserved):
+        if keyword.iskeyword(name) or name in reserved or name in ('print', 'exec', 'True', 'False', 'None', 'nonlocal', 'async', 'await'):
+            return name + "_"
+        return name
+    #
+    # Register address offsets, as in the C header
+    def address_offsets(self, module):
+        for r in module.registers:
+            yield '%s = 0x%.8X\n' % (self.address_identifier(r), r.addressOffset)
+            if r.is_array():
+                yield '%s = %d\n' % (self.count_identifier(r), r.count)
+                yield '%s = 0x%X\n' % (self.stride_identifier(r), r.stride)
+        for m in module.memories:
+            yield '%s = 0x%.8X\n' % (self.address_identifier(m), m.addressOffset)
+            yield '%s = 0x%X\n' % (self.size_identifier(m), m.address_span())
+            yield '%s = %d\n' % (self.depth_identifier(m), m.depth)
+            yield '%s = %d\n' % (self.data_width_identifier(m), m.width)
+    #
+    # Field bit offsets, widths and masks, as in the C header
+    def fields(self, module):
+        for r in module.registers:
+            for f in r.fields:
+                yield "%s = %d\n" % (self.bitOffset_identifier(f), f.bitOffset)
+                yield "%s = %d\n" % (self.bitWidth_identifier(f), f.bitWidth)
+                yield "%s = 0x%.8X\n" % (self.bitMask_identifier(f), (2 ** f.bitWidth - 1) << f.bitOffset)
+    #
+    # Returns the fields of a register which are written individually: fields
+    # are written by a read-modify-write access, unless they are the register's
+    # only bus-writable field. Write-only fields cannot be read back, hence the
+    # fields of registers with write-only fields are only written through 'raw'.
+    def writable_fields(self, register):
+        fields = register.bus_writable_fields()
+        if len(fields) == 1 or all(f.is_bus_readable() for f in fields):
+            return fields
+        return []
+    #
+    # One class per register, with a property per field
+    def register_classes(self, module):
+        for r in module.registers:
+            writable_mask = 0
+            for f in r.bus_writable_fields():
+                writable_mask |= (2 ** f.bitWidth - 1) << f.bitOffset
+            writable_fields = self.writable_fields(r)
+            yield "\n"
+            yield "# Register '%s': %s\n" % (r.name, " ".join(r.description.split()))
+            yield "class %sRegister(_Register):\n" % self.python_class_name(r.name)
+            yield "    __slots__ = ()\n"
+            for f in r.fields:
+                name = self.python_attribute(f.name, self.FIELD_RESERVED_NAMES)
+                mask = (2 ** f.bitWidth - 1) << f.bitOffset
+                getter = setter = None
+                if f.is_bus_readable():
+                    getter = "_get_%s" % name
+                    yield "    #\n"
+                    yield "    def %s(self):\n" % getter
+                    yield "        return (self._words[self._index] >> %d) & 0x%X\n" % (f.bitOffset, 2 ** f.bitWidth - 1)
+                if f in writable_fields:
+                    setter = "_set_%s" % name
+                    yield "    #\n"
+                    yield "    def %s(self, value):\n" % setter
+                    if mask == writable_mask:
+                        # no other field to preserve
+                        yield "        self._words[self._index] = (value << %d) & 0x%.8X\n" % (f.bitOffset, mask)
+                    else:
+                        yield "        words = self._words\n"
+                        yield "        index = self._index\n"
+                        yield "        words[index] = (words[index] & 0x%.8X) | ((value << %d) & 0x%.8X)\n" % (~mask & 0xFFFFFFFF, f.bitOffset, mask)
+                if getter != None or setter != None:
+                    yield "    #\n"
+                    yield "    %s = property(%s, %s)\n" % (name, getter, setter)
+    #
+    # Register, register array and memory attributes of the register file
+    def register_attributes(self, module):
+        word_size = module.width // 8
+        for r in module.registers:
+            name = self.python_attribute(r.name, self.REGISTER_RESERVED_NAMES)
+            register_class = "%sRegister" % self.python_class_name(r.name)
+            if r.is_array():
+                yield "        self.%s = _RegisterArray(%s, words, base + %d, %d, %d)\n" % (name, register_class, r.addressOffset // word_size, r.stride // word_size, r.count)
+            else:
+                yield "        self.%s = %s(words, base + %d)\n" % (name, register_class, r.addressOffset // word_size)
+        for m in module.memories:
+            yield "        self.%s = _Memory(words, base + %d, %d, %d)\n" % (self.python_attribute(m.name, self.REGISTER_RESERVED_NAMES), m.addressOffset // word_size, m.depth, m.width)
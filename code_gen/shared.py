@@ -5,11 +5,14 @@ class VhdlCodeBlock():
     def __init__(self):
         self.statements = []
     #
-    def to_str(self, level):
-        s = '\n'
+    def chunks(self, level):
+        yield '\n'
         for st in self.statements:
-            s += st.to_str(level)
-        return s    
+            for chunk in st.chunks(level):
+                yield chunk
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
     #
     def __str__(self):
         raise NotImplementedError
@@ -19,6 +22,9 @@ class VhdlStatement():
     def __init__(self, value):
         self._value = value
     #
+    def chunks(self, level):
+        yield self.to_str(level)
+    #
     def to_str(self, level):
         return indent(level) + self._value
     #
@@ -30,12 +36,37 @@ class VhdlDeclaration():
     def __init__(self, value):
         self._value = value
     #
+    def chunks(self, level):
+        yield self.to_str(level)
+    #
     def to_str(self, level):
         return indent(level) + self._value
     #
     def __str__(self):
         raise NotImplementedError
 
+#
+# A sequence of statements which is only produced while the code is written:
+# 'function(*args)' must return an iterable of statements. This keeps the
+# per-register statements of large modules from being held in memory at once.
+#
+class VhdlLazyStatements():
+    #
+    def __init__(self, function, *args):
+        self._function = function
+        self._args = args
+    #
+    def chunks(self, level):
+        for st in self._function(*self._args):
+            for chunk in st.chunks(level):
+                yield chunk
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
+    #
+    def __str__(self):
+        raise NotImplementedError
+
 # ------------------------------------------------------------------------------
 # Function definitions
 #
@@ -44,6 +75,31 @@ class VhdlDeclaration():
 def indent(level):
     return " " * constants.INDENTATION_WIDTH * level    
 
+#
+# Returns the text of a string.Template piece by piece. Placeholder values may
+# be strings or iterables of strings (e.g. generators), which are passed on
+# without being joined into one large string.
+#
+def template_chunks(template, mapping):
+    text = template.template
+    pos = 0
+    for match in template.pattern.finditer(text):
+        yield text[pos:match.start()]
+        pos = match.end()
+        name = match.group('named') or match.group('braced')
+        if name != None:
+            value = mapping[name]
+            if isinstance(value, basestring):
+                yield value
+            else:
+                for chunk in value:
+                    yield chunk
+        elif match.group('escaped') != None:
+            yield template.delimiter
+        else:
+            raise ValueError('Invalid placeholder in string: line %d' % (text.count('\n', 0, match.start()) + 1))
+    yield text[pos:]
+
 # ------------------------------------------------------------------------------
 # Code generators
 #
@@ -51,8 +107,32 @@ def indent(level):
 #
 # The mother of all code generators
 #
+# Subclasses implement chunks(), which yields the generated code piece by piece,
+# so that it can be written to a stream without building the whole file in
+# memory first.
+#
 class CodeGenerator():    
     #
+    # Returns an iterator over the pieces of generated code
+    def chunks(self):
+        raise NotImplementedError
+    #
+    # Write the generated code to a file-like object
+    def write_to(self, stream):
+        for chunk in self.chunks():
+            stream.write(chunk)
+    #
+    # Save the generated code to a file; returns the names of the written
+    # files
+    def save(self, filename):
+        with open(filename, 'w') as f:
+            self.write_to(f)
+        return [filename]
+    #
+    # Returns the generated code as a single string
+    def __str__(self):
+        return ''.join(self.chunks())
+    #
     # Returns a field's bit width identifier, e.g. 'WIDTH_CONTROL_RESET'
     def bitWidth_identifier(self, field):
         return 'WIDTH_' + field.parent_reg.name.upper() + '_' + field.name.upper()
@@ -77,6 +157,30 @@ class CodeGenerator():
     def address_identifier(self, register):
         return "ADDR_" + register.name.upper()
     #
+    # Return a register array's element count identifier, e.g. 'COUNT_CHANNEL'
+    def count_identifier(self, register):
+        return "COUNT_" + register.name.upper()
+    #
+    # Return a register array's stride identifier, e.g. 'STRIDE_CHANNEL'
+    def stride_identifier(self, register):
+        return "STRIDE_" + register.name.upper()
+    #
+    # Return a memory's depth identifier (number of words), e.g. 'DEPTH_LUT'
+    def depth_identifier(self, memory):
+        return "DEPTH_" + memory.name.upper()
+    #
+    # Return a memory's size identifier (bytes of address space), e.g. 'SIZE_LUT'
+    def size_identifier(self, memory):
+        return "SIZE_" + memory.name.upper()
+    #
+    # Return a memory's word width identifier, e.g. 'DATA_WIDTH_LUT'
+    def data_width_identifier(self, memory):
+        return "DATA_WIDTH_" + memory.name.upper()
+    #
+    # Return a memory's word index width identifier, e.g. 'INDEX_WIDTH_LUT'
+    def index_width_identifier(self, memory):
+        return "INDEX_WIDTH_" + memory.name.upper()
+    #
     # Get a registers's data signal name    
     def vhdl_data_signal(self, register):
         return 's_' + register.name.lower() + "_r"    
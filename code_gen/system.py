@@ -0,0 +1,266 @@
+#
+# Address maps of systems: C header, VHDL package and VHDL address decoder
+#
+
+import datetime
+
+from .shared import CodeGenerator
+from .shared import VhdlStatement
+from .shared import VhdlCodeBlock
+from .shared import VhdlLazyStatements
+from .shared import indent
+from .shared import template_chunks
+from .vhdl import VhdlAsyncProcess
+from .vhdl import VhdlClockedProcess
+from .vhdl import VhdlIfStatement
+from .vhdl import VhdlCaseStatement
+from .vhdl import VhdlCaseAlternative
+import code_gen.templates.system as system_templates
+import code_gen.constants as constants
+
+#
+# Code generator for the address map of a system; the instances are listed in
+# address order
+#
+class SystemGenerator(CodeGenerator):
+    #
+    def __init__(self, system):
+        self.system = system
+        self.instances = [instance for low, high, instance in system.address_map.intervals()]
+    #
+    # Returns an instance's index identifier, e.g. 'SOC_INST_UART0'
+    def index_identifier(self, instance):
+        return self.system.name.upper() + "_INST_" + instance.name.upper()
+    #
+    # Returns an instance's base address identifier, e.g. 'UART0_BASEADDR'
+    def base_identifier(self, instance):
+        return instance.name.upper() + "_BASEADDR"
+    #
+    # Returns an instance's highest register address identifier, e.g. 'UART0_HIGHADDR'
+    def high_identifier(self, instance):
+        return instance.name.upper() + "_HIGHADDR"
+    #
+    # Returns the template values shared by all outputs
+    def template_values(self, **values):
+        values.update(json_system_name = self.system.name,
+                      system_name = self.system.name.upper(),
+                      num_instances = str(len(self.instances)),
+                      hdlregs_version = constants.HDLREGS_VERSION,
+                      date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+        return values
+    #
+    # Returns the name of the system's VHDL package
+    def vhdl_package_name(self):
+        return self.system.name.lower() + '_map_pkg'
+    #
+    # Returns the name of the VHDL array type of per-instance words
+    def vhdl_word_array(self):
+        return 't_' + self.system.name.lower() + '_word_array'
+
+#
+# C header defining the base addresses of the instances and a lookup of the
+# instance containing an address
+#
+class CSystemMapGenerator(SystemGenerator):
+    #
+    def chunks(self):
+        d = self.template_values(system_prefix = self.system.name.lower(),
+                                 instances = self.instance_definitions(),
+                                 window_lows = ("    0x%.8X,\n" % i.low_address() for i in self.instances),
+                                 window_highs = ("    0x%.8X,\n" % i.high_address() for i in self.instances))
+        return template_chunks(system_templates.C_SYSTEM_MAP_TEMPLATE, d)
+    #
+    def instance_definitions(self):
+        for index, instance in enumerate(self.instances):
+            name = instance.name.upper()
+            yield "// Instance '%s' of module '%s'%s\n" % (instance.name, instance.module.name, self.description(instance))
+            yield "#define %s %d\n" % (self.index_identifier(instance), index)
+            yield "#define %s 0x%.8X\n" % (self.base_identifier(instance), instance.baseAddress)
+            yield "#define %s 0x%.8X\n" % (self.high_identifier(instance), instance.baseAddress + instance.module.high_address())
+            yield "#define %s_REG(offset) (*(volatile uint32_t *)(uintptr_t)(%s + (offset)))\n" % (name, self.base_identifier(instance))
+            yield "\n"
+    #
+    def description(self, instance):
+        if instance.description != "":
+            return ": " + instance.description
+        return ""
+
+#
+# VHDL package defining the index, base address, highest address and read
+# latency of every instance, and the read latency of the system decoder. The
+# read latency of an instance is the one of its register file component (see
+# VhdlComponentGenerator).
+#
+class VhdlSystemPackageGenerator(SystemGenerator):
+    #
+    def __init__(self, system, read_latency=0):
+        SystemGenerator.__init__(self, system)
+        self.read_latency = read_latency
+    #
+    def chunks(self):
+        d = self.template_values(package_name = self.vhdl_package_name(),
+                                 read_latency = str(system_read_latency(self.system, self.read_latency)),
+                                 word_array = self.vhdl_word_array(),
+                                 instances = self.instance_declarations())
+        return template_chunks(system_templates.VHDL_SYSTEM_PACKAGE_TEMPLATE, d)
+    #
+    def instance_declarations(self):
+        for index, instance in enumerate(self.instances):
+            name = instance.name.upper()
+            yield "\n"
+            yield indent(1) + "-- Instance '%s' of module '%s'\n" % (instance.name, instance.module.name)
+            yield indent(1) + "constant %s : natural := %d;\n" % (self.index_identifier(instance), index)
+            yield indent(1) + 'constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.base_identifier(instance), instance.baseAddress)
+            yield indent(1) + 'constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.high_identifier(instance), instance.baseAddress + instance.module.high_address())
+            yield indent(1) + "constant %s_READ_LATENCY : natural := %d;\n" % (name, instance_read_latency(instance, self.read_latency))
+
+#
+# VHDL address decoder of a system. The decoding is hierarchical: the address
+# space is divided into blocks of 2**block_bits bytes, the smallest power of
+# two holding the largest instance window, so that every instance touches at
+# most two blocks. A case statement on the upper address bits selects the
+# occupied block, and only the windows within the block are compared with the
+# lower bits. If an instance window spans more than half of the address space,
+# all windows are compared with the full address instead.
+#
+# The decoder has a single read latency, the highest one of the instances, as
+# bus adapters wait a fixed number of cycles for the read data: the read data
+# of instances with a lower latency is delayed by registers.
+#
+class VhdlSystemDecoderGenerator(SystemGenerator):
+    #
+    def __init__(self, system, read_latency=0):
+        SystemGenerator.__init__(self, system)
+        self.read_latency = system_read_latency(system, read_latency)
+        self.latencies = [instance_read_latency(instance, read_latency) for instance in self.instances]
+        self.block_bits = max((i.high_address() - i.low_address()).bit_length() for i in self.instances)
+    #
+    def chunks(self):
+        if self.block_bits < 32:
+            decoding = ": the upper address\n-- bits select a block of %d bytes, and the lower ones the instance within\n-- the block" % 2 ** self.block_bits
+        else:
+            decoding = ""
+        d = self.template_values(package_name = self.vhdl_package_name(),
+                                 entity_name = self.system.name.lower() + '_decoder',
+                                 word_array = self.vhdl_word_array(),
+                                 decoding = decoding,
+                                 signal_declarations = self.signal_declarations(),
+                                 processes = "\n".join(process.to_str(1) for process in self.processes()),
+                                 concurrent_signal_assignments = self.concurrent_signal_assignments().to_str(1))
+        return template_chunks(system_templates.VHDL_SYSTEM_DECODER_TEMPLATE, d)
+    #
+    def signal_declarations(self):
+        yield indent(1) + "signal s_sel : t_instance; -- instance selected by addr\n"
+        for latency in range(1, self.read_latency + 1):
+            yield indent(1) + "signal s_sel_r%d : t_instance; -- instance selected %d clock cycle(s) ago\n" % (latency, latency)
+        for delay in range(1, self.read_latency - min(self.latencies) + 1):
+            yield indent(1) + "signal s_dataout_r%d : %s; -- read data of the instances delayed by %d clock cycle(s)\n" % (delay, self.vhdl_word_array(), delay)
+    #
+    def processes(self):
+        decode = VhdlAsyncProcess("decode")
+        decode.sensitivity.append("addr")
+        decode.statements.append(VhdlStatement("s_sel <= NO_INSTANCE; -- default\n"))
+        if self.block_bits < 32:
+            case = VhdlCaseStatement("addr(31 downto %d)" % self.block_bits)
+            case.alternatives.append(VhdlLazyStatements(self.block_alternatives))
+            case.alternatives.append(VhdlCaseAlternative("others"))
+            decode.statements.append(case)
+        else:
+            decode.statements.append(VhdlLazyStatements(self.full_address_selects))
+        yield decode
+        if self.read_latency > 0:
+            delay = VhdlClockedProcess("read_delay", "clk", "rst")
+            for latency in range(1, self.read_latency + 1):
+                delay.reset_statements.append(VhdlStatement("s_sel_r%d <= NO_INSTANCE;\n" % latency))
+                delay.statements.append(VhdlStatement("s_sel_r%d <= %s;\n" % (latency, self.selected(latency - 1))))
+            for delay_cycles in range(1, self.read_latency - min(self.latencies) + 1):
+                delay.reset_statements.append(VhdlStatement("s_dataout_r%d <= (others => (others => '0'));\n" % delay_cycles))
+                delay.statements.append(VhdlStatement("s_dataout_r%d <= %s;\n" % (delay_cycles, self.delayed_data(delay_cycles - 1))))
+            yield delay
+        read_mux = VhdlAsyncProcess("read_mux")
+        read_mux.sensitivity.append(self.selected(self.read_latency))
+        read_mux.sensitivity += [self.delayed_data(self.read_latency - latency) for latency in sorted(set(self.latencies), reverse=True)]
+        read_mux.statements.append(VhdlStatement("dataout <= (others => '0'); -- unmapped address\n"))
+        for instance, latency in zip(self.instances, self.latencies):
+            select = VhdlIfStatement("%s = %s" % (self.selected(self.read_latency), self.index_identifier(instance)))
+            select.statements.append(VhdlStatement("dataout <= %s(%s);\n" % (self.delayed_data(self.read_latency - latency), self.index_identifier(instance))))
+            read_mux.statements.append(select)
+        yield read_mux
+    #
+    # Returns the signal holding the instance selected 'latency' clock cycles ago
+    def selected(self, latency):
+        if latency == 0:
+            return "s_sel"
+        return "s_sel_r%d" % latency
+    #
+    # Returns the signal holding the read data of the instances delayed by
+    # 'delay' clock cycles
+    def delayed_data(self, delay):
+        if delay == 0:
+            return "inst_dataout"
+        return "s_dataout_r%d" % delay
+    #
+    # Returns the occupied blocks in address order as (block number, [(instance,
+    # lowest offset in the block, highest offset in the block)]) tuples
+    def blocks(self):
+        blocks = []
+        block_size = 2 ** self.block_bits
+        for instance in self.instances:
+            low = instance.low_address()
+            high = instance.high_address()
+            for number in range(low >> self.block_bits, (high >> self.block_bits) + 1):
+                if len(blocks) == 0 or blocks[-1][0] != number:
+                    blocks.append((number, []))
+                start = number * block_size
+                blocks[-1][1].append((instance, max(low, start) - start, min(high, start + block_size - 1) - start))
+        return blocks
+    #
+    def block_alternatives(self):
+        width = 32 - self.block_bits
+        offset = "unsigned(addr(%d downto 0))" % (self.block_bits - 1)
+        for number, windows in self.blocks():
+            alternative = VhdlCaseAlternative('"%s"' % bin(number)[2:].zfill(width))
+            for instance, low, high in windows:
+                conditions = []
+                if low > 0:
+                    conditions.append("%s >= %d" % (offset, low))
+                if high < 2 ** self.block_bits - 1:
+                    conditions.append("%s <= %d" % (offset, high))
+                alternative.statements.append(self.select_statement(instance, conditions))
+            yield alternative
+    #
+    def full_address_selects(self):
+        for instance in self.instances:
+            conditions = ['unsigned(addr) >= unsigned\'(x"%.8X")' % instance.low_address(),
+                          'unsigned(addr) <= unsigned\'(x"%.8X")' % instance.high_address()]
+            yield self.select_statement(instance, conditions)
+    #
+    def select_statement(self, instance, conditions):
+        statement = VhdlStatement("s_sel <= %s;\n" % self.index_identifier(instance))
+        if len(conditions) == 0:
+            return statement
+        select = VhdlIfStatement(" and ".join(conditions))
+        select.statements.append(statement)
+        return select
+    #
+    def concurrent_signal_assignments(self):
+        block = VhdlCodeBlock()
+        for instance in self.instances:
+            index = self.index_identifier(instance)
+            block.statements.append(VhdlStatement("inst_cs(%s) <= cs when s_sel = %s else '0';\n" % (index, index)))
+            block.statements.append(VhdlStatement("inst_addr(%s) <= std_logic_vector(unsigned(addr) - unsigned(%s));\n" % (index, self.base_identifier(instance))))
+        return block
+
+#
+# Returns the read latency of an instance's register file component
+#
+def instance_read_latency(instance, read_latency):
+    if instance.module.has_memories() and read_latency == 0:
+        return 1  # block RAM is read synchronously
+    return read_latency
+
+#
+# Returns the read latency of a system's decoder, the highest one of its instances
+#
+def system_read_latency(system, read_latency):
+    return max(instance_read_latency(instance, read_latency) for instance in system.instances)
@@ -10,11 +10,100 @@ C_HEADER_TEMPLATE = Template("""
 
 #ifndef ${module_name}_H
 #define ${module_name}_H
-
+${includes}
 //
 // Register address offsets
 //
 $address_offsets
-$fields
+$fields${accessors}${shadow}
 #endif // ${module_name}_H
 """)
+
+# ------------------------------------------------------------------------------
+# Functions of the shadow register cache of a module; 'prefix' is the prefix of
+# the module's shadow identifiers and 'count' the number of cached registers
+#
+
+C_SHADOW_FUNCTIONS_TEMPLATE = Template("""typedef struct {
+    // register file
+    volatile uint32_t *base;
+    // cached register values
+    uint32_t value[$count];
+    // bit set: value holds the register's content
+    uint32_t valid[($count + 31) / 32];
+    // bit set: value must be written back
+    uint32_t dirty[($count + 31) / 32];
+} ${prefix}_t;
+
+// Forgets all cached values, e.g. after the hardware has been reset
+static inline void ${prefix}_invalidate(${prefix}_t *s)
+{
+    unsigned w;
+    for (w = 0; w < ($count + 31) / 32; w++) {
+        s->valid[w] = 0;
+        s->dirty[w] = 0;
+    }
+}
+
+// Initializes the cache for the register file at 'base'
+static inline void ${prefix}_init(${prefix}_t *s, volatile uint32_t *base)
+{
+    s->base = base;
+    ${prefix}_invalidate(s);
+}
+
+// Caches the reset values, which the registers hold after a reset, without bus reads
+static inline void ${prefix}_assume_reset(${prefix}_t *s)
+{
+    unsigned i;
+    for (i = 0; i < $count; i++) {
+        s->value[i] = ${prefix}_regs[i].reset;
+        s->valid[i / 32] |= 1u << (i % 32);
+    }
+}
+
+// Returns the cached value of a register, which is read from the bus if it is
+// not cached yet; write-only fields are assumed to hold their reset value then
+static inline uint32_t ${prefix}_read(${prefix}_t *s, unsigned i)
+{
+    if (!(s->valid[i / 32] & (1u << (i % 32)))) {
+        const ${prefix}_reg_t *reg = &${prefix}_regs[i];
+        uint32_t value = reg->readback ? s->base[reg->offset / 4] : 0;
+        s->value[i] = (value & reg->readback) | (reg->reset & ~reg->readback);
+        s->valid[i / 32] |= 1u << (i % 32);
+    }
+    return s->value[i];
+}
+
+// Replaces the bits 'mask' of a cached register by 'value' and marks it dirty.
+// The register is not read if all of its bus-writable bits are replaced.
+static inline void ${prefix}_update(${prefix}_t *s, unsigned i, uint32_t mask, uint32_t value)
+{
+    uint32_t current = 0;
+    if ((mask & ${prefix}_regs[i].writable) != ${prefix}_regs[i].writable)
+        current = ${prefix}_read(s, i);
+    s->value[i] = (current & ~mask) | (value & mask);
+    s->valid[i / 32] |= 1u << (i % 32);
+    s->dirty[i / 32] |= 1u << (i % 32);
+}
+
+// Writes the dirty registers back, in the order of their indices. Self-clearing
+// and self-setting fields take their settled value in the cache afterwards.
+static inline void ${prefix}_flush(${prefix}_t *s)
+{
+    unsigned w, i;
+    uint32_t bits;
+    for (w = 0; w < ($count + 31) / 32; w++) {
+        bits = s->dirty[w];
+        s->dirty[w] = 0;
+        for (i = w * 32; bits != 0; i++, bits >>= 1) {
+            if (bits & 1) {
+                const ${prefix}_reg_t *reg = &${prefix}_regs[i];
+                s->base[reg->offset / 4] = s->value[i];
+                s->value[i] = (s->value[i] & ~reg->transient) | reg->settled;
+            }
+        }
+    }
+}
+
+""")
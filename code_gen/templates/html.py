@@ -4,14 +4,8 @@
 
 from string import Template
 
-HTML_DOC_TEMPLATE = Template("""
-<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
-        "http://www.w3.org/TR/html4/strict.dtd">
-<html lang="en">
-<head>
-    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
-    <title>Registers in '$module_name' module</title>
-    <style type="text/css" media="screen,print">
+# Style sheet of the HTML documents
+HTML_STYLE = """    <style type="text/css" media="screen,print">
 
     body, html{
         margin:0;
@@ -149,7 +143,16 @@ HTML_DOC_TEMPLATE = Template("""
     }        
     
     </style>
-    
+"""
+
+HTML_DOC_TEMPLATE = Template("""
+<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
+        "http://www.w3.org/TR/html4/strict.dtd">
+<html lang="en">
+<head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <title>Registers in '$module_name' module</title>
+""" + HTML_STYLE + """    
 </head>
 <body>
 
@@ -177,6 +180,165 @@ $overview
 </body>
 </html>""")    
 
+# ------------------------------------------------------------------------------
+# Index page of the split documentation: the register details are loaded page
+# by page from <prefix>_pNNNN.js, and the search index from <prefix>_index.js,
+# through script elements, which also works for local files.
+
+HTML_SPLIT_DOC_TEMPLATE = Template("""
+<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01//EN"
+        "http://www.w3.org/TR/html4/strict.dtd">
+<html lang="en">
+<head>
+    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+    <title>Registers in '$module_name' module</title>
+""" + HTML_STYLE + """
+    <style type="text/css" media="screen,print">
+    input#search {
+        width: 180px;
+    }
+    ul#results li, ul#page li {
+        padding-left: 1em;
+    }
+    </style>
+    <script type="text/javascript">
+    var hdlregs = {
+        prefix: "$prefix",
+        index: null,            // search index, loaded on demand
+        indexRequested: false,
+        byName: {},             // register name -> index entry
+        pages: {},              // page number -> [register names, register details]
+        current: 0,             // page shown
+        target: null,           // register to show once the index or its page is loaded
+        query: null,            // search waiting for the index
+        //
+        load: function(src) {
+            var script = document.createElement("script");
+            script.src = src;
+            document.getElementsByTagName("head")[0].appendChild(script);
+        },
+        loadIndex: function() {
+            if (!hdlregs.indexRequested) {
+                hdlregs.indexRequested = true;
+                hdlregs.load(hdlregs.prefix + "_index.js");
+            }
+        },
+        // called by the search index: entries are [name, address, page, field names]
+        setIndex: function(index) {
+            hdlregs.index = index;
+            for (var i = 0; i < index.entries.length; i++) {
+                hdlregs.byName[index.entries[i][0]] = index.entries[i];
+            }
+            if (hdlregs.target !== null) {
+                hdlregs.show(hdlregs.target);
+            }
+            if (hdlregs.query !== null) {
+                hdlregs.search(hdlregs.query);
+            }
+        },
+        // called by the register pages
+        setPage: function(number, names, details) {
+            hdlregs.pages[number] = [names, details];
+            if (hdlregs.current === number) {
+                hdlregs.display();
+            }
+        },
+        openPage: function(number) {
+            hdlregs.current = number;
+            if (number in hdlregs.pages) {
+                hdlregs.display();
+            } else {
+                var name = String(number);
+                while (name.length < 4) {
+                    name = "0" + name;
+                }
+                hdlregs.load(hdlregs.prefix + "_p" + name + ".js");
+            }
+        },
+        display: function() {
+            var page = hdlregs.pages[hdlregs.current];
+            var items = [];
+            for (var i = 0; i < page[0].length; i++) {
+                items.push('<li><a class="overview" href="#' + page[0][i] + '">' + page[0][i] + '</a></li>');
+            }
+            document.getElementById("page").innerHTML = items.join("");
+            document.getElementById("details").innerHTML = page[1];
+            var anchor = hdlregs.target !== null ? document.getElementById(hdlregs.target) : null;
+            hdlregs.target = null;
+            if (anchor) {
+                anchor.scrollIntoView();
+            }
+        },
+        // shows a register, whose page is looked up in the search index
+        show: function(name) {
+            hdlregs.target = name;
+            if (hdlregs.index === null) {
+                hdlregs.loadIndex();
+            } else if (name in hdlregs.byName) {
+                hdlregs.openPage(hdlregs.byName[name][2]);
+            }
+        },
+        // lists the registers whose name or field names contain the query
+        search: function(query) {
+            query = query.toLowerCase();
+            if (hdlregs.index === null) {
+                hdlregs.query = query;
+                hdlregs.loadIndex();
+                return;
+            }
+            hdlregs.query = null;
+            var items = [];
+            var entries = hdlregs.index.entries;
+            for (var i = 0; i < entries.length && items.length < 100 && query.length > 0; i++) {
+                if (entries[i][0].toLowerCase().indexOf(query) >= 0 || entries[i][3].toLowerCase().indexOf(query) >= 0) {
+                    items.push('<li><a class="overview" href="#' + entries[i][0] + '">' + entries[i][0] + '</a> ' + entries[i][1] + '</li>');
+                }
+            }
+            document.getElementById("results").innerHTML = items.join("");
+        },
+        navigate: function() {
+            if (location.hash.length > 1) {
+                hdlregs.show(location.hash.substring(1));
+            } else if (hdlregs.current === 0) {
+                hdlregs.openPage(1);
+            }
+        }
+    };
+    window.onload = hdlregs.navigate;
+    window.onhashchange = hdlregs.navigate;
+    </script>
+</head>
+<body>
+
+    <div id="wrap">
+
+        <div id="header">
+            <h1>Registers in '$module_name' module</h1>
+        </div>
+
+        <div id="sidebar">
+            <h2>Search</h2>
+            <input id="search" type="text" onfocus="hdlregs.loadIndex()" oninput="hdlregs.search(this.value)">
+            <ul id="results"></ul>
+            <h2>Pages</h2>
+$pages
+            <h2>Overview</h2>
+            <ul id="page"></ul>
+        </div>
+        
+        <div id="main">
+            <h2>Detailed description</h2>
+            <div id="details"></div>
+        </div>
+        
+        <div id="footer">
+        <p>Generated: $date_time by <a href="https://github.com/noasic/hdlregs">HDLRegs</a> version $hdlregs_version</p>
+        </div>
+    </div>
+
+</body>
+</html>""")
+
 # ------------------------------------------------------------------------------
 
 HTML_REGISTER_TEMPLATE = Template("""    
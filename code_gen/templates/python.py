@@ -0,0 +1,158 @@
+# ------------------------------------------------------------------------------
+# String templates for Python modules
+#
+
+from string import Template
+
+PYTHON_MODULE_TEMPLATE = Template('''#
+# Python register access for module '${json_module_name}'
+# automatically generated by HDLRegs version $hdlregs_version on $date_time
+#
+# The register file is mapped through mmap, from byte 'offset' on of a device
+# node (e.g. /dev/uio0 or /dev/mem) or of any file of at least SIZE bytes:
+#
+#     with ${class_name}('/dev/uio0') as regs:
+#         regs.${example_register}.${example_field} = 1
+#
+# Registers are attributes of the register file, fields are attributes of the
+# registers, and 'raw' is the whole register value. Register arrays and
+# memories are indexed, e.g. regs.channel[3].gain. Writing a field reads the
+# register first, unless the field is the register's only bus-writable field.
+# As write-only fields cannot be read back, the other fields of a register
+# with write-only fields are not writable individually; such registers are
+# written through 'raw'. Names of registers, memories and fields which are
+# Python keywords or clash with members of the classes get a trailing '_'.
+# Accessing a register or memory after close() raises a ValueError.
+#
+
+import os
+import mmap
+import ctypes
+
+SIZE = 0x$size  # bytes mapped
+
+#
+# Register address offsets
+#
+$address_offsets
+#
+# Fields
+#
+$fields
+#
+# Returns a zero-copy view of a buffer as 32-bit words
+#
+def _word_view(buffer):
+    try:
+        return memoryview(buffer).cast('I')
+    except (TypeError, AttributeError):  # Python 2
+        return (ctypes.c_uint32 * (len(buffer) // 4)).from_buffer(buffer)
+
+#
+# Stands in for the word view of a closed register file: the Python 2 view
+# would still point at the unmapped memory
+#
+class _ClosedWords(object):
+    #
+    def __getitem__(self, index):
+        raise ValueError('I/O operation on closed register file')
+    #
+    def __setitem__(self, index, value):
+        raise ValueError('I/O operation on closed register file')
+
+class _Register(object):
+    __slots__ = ('_words', '_index')
+    #
+    def __init__(self, words, index):
+        self._words = words
+        self._index = index
+    #
+    def _get_raw(self):
+        return self._words[self._index]
+    #
+    def _set_raw(self, value):
+        self._words[self._index] = value & 0xFFFFFFFF
+    #
+    raw = property(_get_raw, _set_raw)
+
+class _RegisterArray(object):
+    __slots__ = ('_registers',)
+    #
+    def __init__(self, register_class, words, index, step, count):
+        self._registers = [register_class(words, index + i * step) for i in range(count)]
+    #
+    def __len__(self):
+        return len(self._registers)
+    #
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self._registers)
+        if i < 0 or i >= len(self._registers):
+            raise IndexError('register array index out of range')
+        return self._registers[i]
+
+class _Memory(object):
+    __slots__ = ('_words', '_index', '_depth', '_mask')
+    #
+    def __init__(self, words, index, depth, width):
+        self._words = words
+        self._index = index
+        self._depth = depth
+        self._mask = (1 << width) - 1
+    #
+    def __len__(self):
+        return self._depth
+    #
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._depth
+        if i < 0 or i >= self._depth:
+            raise IndexError('memory index out of range')
+        return self._words[self._index + i] & self._mask
+    #
+    def __setitem__(self, i, value):
+        if i < 0:
+            i += self._depth
+        if i < 0 or i >= self._depth:
+            raise IndexError('memory index out of range')
+        self._words[self._index + i] = value & self._mask
+$register_classes
+#
+# Register file '${json_module_name}'
+#
+class ${class_name}(object):
+    #
+    def __init__(self, path, offset=0):
+        if offset % 4 != 0:
+            raise ValueError('offset must be a multiple of 4')
+        # mmap offsets must be multiples of the allocation granularity
+        delta = offset % mmap.ALLOCATIONGRANULARITY
+        fd = os.open(path, os.O_RDWR | getattr(os, 'O_SYNC', 0))
+        try:
+            self._mmap = mmap.mmap(fd, delta + SIZE, offset=offset - delta)
+        finally:
+            os.close(fd)
+        self._words = words = _word_view(self._mmap)
+        base = delta // 4
+$register_attributes
+    #
+    def close(self):
+        closed = _ClosedWords()
+        for member in list(self.__dict__.values()):
+            if isinstance(member, _RegisterArray):
+                for register in member._registers:
+                    register._words = closed
+            elif isinstance(member, (_Register, _Memory)):
+                member._words = closed
+        if hasattr(self._words, 'release'):
+            self._words.release()
+        self._words = closed
+        self._mmap.close()
+    #
+    def __enter__(self):
+        return self
+    #
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+''')
@@ -0,0 +1,120 @@
+# ------------------------------------------------------------------------------
+# String templates for the address maps of systems
+#
+
+from string import Template
+
+C_SYSTEM_MAP_TEMPLATE = Template("""
+// Address map of system '${json_system_name}'
+// automatically generated by HDLRegs version $hdlregs_version on $date_time
+//
+// The register address offsets of an instance are defined by the header of
+// its module, e.g. <INSTANCE>_REG(ADDR_<REGISTER>).
+
+#ifndef ${system_name}_MAP_H
+#define ${system_name}_MAP_H
+
+#include <stdint.h>
+
+//
+// Module instances, in address order
+//
+$instances
+#define ${system_name}_NUM_INSTANCES $num_instances
+
+//
+// Address windows of the instances: lowest and highest byte address
+//
+static const uint32_t ${system_prefix}_window_low[${system_name}_NUM_INSTANCES] = {
+$window_lows};
+
+static const uint32_t ${system_prefix}_window_high[${system_name}_NUM_INSTANCES] = {
+$window_highs};
+
+//
+// Returns the index of the instance whose address window contains an address,
+// or -1 if the address is unmapped
+//
+static inline int ${system_prefix}_instance_at(uint32_t addr)
+{
+    int low = 0;
+    int high = ${system_name}_NUM_INSTANCES - 1;
+    while (low <= high) {
+        int middle = (low + high) / 2;
+        if (addr < ${system_prefix}_window_low[middle]) {
+            high = middle - 1;
+        } else if (addr > ${system_prefix}_window_high[middle]) {
+            low = middle + 1;
+        } else {
+            return middle;
+        }
+    }
+    return -1;
+}
+
+#endif // ${system_name}_MAP_H
+""")
+
+# ------------------------------------------------------------------------------
+
+VHDL_SYSTEM_PACKAGE_TEMPLATE = Template("""
+-- VHDL address map package for system '${json_system_name}'
+-- automatically generated by HDLRegs version $hdlregs_version on $date_time
+
+library ieee;
+use ieee.std_logic_1164.all;
+package $package_name is
+
+    constant ${system_name}_NUM_INSTANCES : natural := $num_instances;
+    constant ${system_name}_READ_LATENCY : natural := $read_latency; -- clock cycles from read access to valid dataout of the decoder
+$instances
+    -- Per-instance buses of the system decoder
+    type $word_array is array (0 to ${system_name}_NUM_INSTANCES - 1) of std_logic_vector(31 downto 0);
+
+end package $package_name;
+""")
+
+# ------------------------------------------------------------------------------
+
+VHDL_SYSTEM_DECODER_TEMPLATE = Template("""
+-- VHDL address decoder for system '${json_system_name}'
+-- automatically generated by HDLRegs version $hdlregs_version on $date_time
+--
+-- Selects the instance whose address window contains 'addr'${decoding}.
+-- The selected instance gets the chip select and the address relative to its
+-- base address. The read data is valid ${system_name}_READ_LATENCY clock cycles
+-- after the read access, the highest read latency of the instances; the read
+-- data of the other instances is delayed accordingly. Unmapped addresses read
+-- as 0.
+
+library ieee;
+
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+use work.$package_name.all;
+
+entity $entity_name is
+    port(
+        clk          : in  std_logic;                     -- system clock
+        rst          : in  std_logic;                     -- asynchronous, high-active
+        addr         : in  std_logic_vector(31 downto 0); -- read/write address
+        cs           : in  std_logic;                     -- chip select
+        dataout      : out std_logic_vector(31 downto 0); -- read data
+        --
+        inst_addr    : out $word_array; -- addresses relative to the instances' base addresses
+        inst_cs      : out std_logic_vector(${system_name}_NUM_INSTANCES - 1 downto 0); -- chip selects
+        inst_dataout : in  $word_array  -- read data of the instances
+    );
+end entity $entity_name;
+
+architecture RTL of $entity_name is
+
+    constant NO_INSTANCE : natural := ${system_name}_NUM_INSTANCES;
+    subtype t_instance is natural range 0 to NO_INSTANCE;
+$signal_declarations
+begin
+
+$processes$concurrent_signal_assignments
+end architecture RTL;
+
+""")
@@ -20,21 +20,21 @@ end package $package_name;
 VHDL_COMPONENT_TEMPLATE = Template("""
 -- VHDL component for module '${json_module_name}'
 -- automatically generated by HDLRegs version $hdlregs_version on $date_time
-
+${aliasing_report}
 library ieee;
 
-use ieee.std_logic_1164.all;
+use ieee.std_logic_1164.all;${use_numeric_std}
 use work.$package_name.all;
 
 entity $entity_name is
-    port(
+${generics}    port(
         clk     : in  std_logic;                     -- system clock
         rst     : in  std_logic;                     -- asynchronous, high-active
         addr    : in  std_logic_vector(31 downto 0); -- read/write address
         cs      : in  std_logic;                     -- chip select
         rnw     : in  std_logic;                     -- read (1) or write (0)
         datain  : in  std_logic_vector(31 downto 0); -- write data
-        dataout : out std_logic_vector(31 downto 0); -- read data
+${byte_enable_port}        dataout : out std_logic_vector(31 downto 0); -- read data
         --
         regs2user : out t_regs2user; -- register file -> user logic
         user2regs : in t_user2regs -- user logic -> register file
@@ -45,7 +45,7 @@ architecture RTL of $entity_name is
 $signal_declarations
 begin
 $register_write_proc
-$register_read_proc
+$register_read_proc${memory_ports}
 $concurrent_signal_assignments
 end architecture RTL;
 
@@ -9,7 +9,10 @@ from .shared import CodeGenerator
 from .shared import VhdlDeclaration
 from .shared import VhdlStatement
 from .shared import VhdlCodeBlock
+from .shared import VhdlLazyStatements
 from .shared import indent
+from .shared import template_chunks
+import structures
 import code_gen.templates.vhdl as vhdl_templates
 import code_gen.constants as constants
 
@@ -26,16 +29,18 @@ class VhdlRecord:
     def __str__(self):
         raise NotImplementedError
     #
-    def to_str(self, level):
-        str = '\n'
-        str += indent(level) + "-- %s\n" % self.description
-        str += indent(level) + "type %s is record\n" % self.name
+    def chunks(self, level):
+        yield '\n'
+        yield indent(level) + "-- %s\n" % self.description
+        yield indent(level) + "type %s is record\n" % self.name
         level += 1
         for e in self.elements_:
-            str += indent(level) + e + ";\n"
+            yield indent(level) + e + ";\n"
         level -= 1
-        str += indent(level) + "end record;\n"
-        return str
+        yield indent(level) + "end record;\n"
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
     #
     def name(self):
         return self.name
@@ -53,16 +58,21 @@ class VhdlPackage:
     def add_declaration(self, declaration):
         self.declarations_.append(declaration)
     #
-    def __str__(self):
-        str_declarations = ''
+    def declaration_chunks(self, level):
         for d in self.declarations_:
-            str_declarations += d.to_str(1)
+            for chunk in d.chunks(level):
+                yield chunk
+    #
+    def chunks(self):
         d = dict(package_name = self.name, 
-                 declarations = str_declarations,
+                 declarations = self.declaration_chunks(1),
                  json_module_name = self.name,
                  hdlregs_version = constants.HDLREGS_VERSION,
                  date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
-        return vhdl_templates.VHDL_PACKAGE_TEMPLATE.substitute(d)
+        return template_chunks(vhdl_templates.VHDL_PACKAGE_TEMPLATE, d)
+    #
+    def __str__(self):
+        return ''.join(self.chunks())
 
 class VhdlIfStatement:
     #
@@ -70,14 +80,110 @@ class VhdlIfStatement:
         self._condition = condition
         self.statements = []
     #
+    def chunks(self, level):
+        yield indent(level) + 'if %s then\n' % self._condition
+        level += 1
+        for s in self.statements:
+            for chunk in s.chunks(level):
+                yield chunk
+        level -= 1
+        yield indent(level) + 'end if;\n'
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
+    #   
+    def __str__(self):
+        raise NotImplementedError
+
+class VhdlCaseStatement:
+    #
+    def __init__(self, expression):
+        self._expression = expression
+        self.alternatives = []
+    #
+    def chunks(self, level):
+        yield indent(level) + 'case %s is\n' % self._expression
+        level += 1
+        for a in self.alternatives:
+            for chunk in a.chunks(level):
+                yield chunk
+        level -= 1
+        yield indent(level) + 'end case;\n'
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
+    #   
+    def __str__(self):
+        raise NotImplementedError
+
+class VhdlCaseAlternative:
+    #
+    def __init__(self, choice, comment=None):
+        self._choice = choice
+        self._comment = comment
+        self.statements = []
+    #
+    def chunks(self, level):
+        if self._comment != None:
+            yield indent(level) + 'when %s => -- %s\n' % (self._choice, self._comment)
+        else:
+            yield indent(level) + 'when %s =>\n' % self._choice
+        level += 1
+        empty = True
+        for s in self.statements:
+            for chunk in s.chunks(level):
+                empty = False
+                yield chunk
+        if empty:
+            yield indent(level) + 'null;\n'
+    #
     def to_str(self, level):
-        str = indent(level) + 'if %s then\n' % self._condition
+        return ''.join(self.chunks(level))
+    #   
+    def __str__(self):
+        raise NotImplementedError
+
+class VhdlForLoop:
+    #
+    def __init__(self, variable, range):
+        self._variable = variable
+        self._range = range
+        self.statements = []
+    #
+    def chunks(self, level):
+        yield indent(level) + 'for %s in %s loop\n' % (self._variable, self._range)
         level += 1
         for s in self.statements:
-            str += "%s" % s.to_str(level)
+            for chunk in s.chunks(level):
+                yield chunk
         level -= 1
-        str += indent(level) + 'end if;\n'
-        return str
+        yield indent(level) + 'end loop;\n'
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
+    #   
+    def __str__(self):
+        raise NotImplementedError
+
+class VhdlForGenerate:
+    #
+    def __init__(self, label, variable, range):
+        self._label = label
+        self._variable = variable
+        self._range = range
+        self.statements = []
+    #
+    def chunks(self, level):
+        yield indent(level) + '%s : for %s in %s generate\n' % (self._label, self._variable, self._range)
+        level += 1
+        for s in self.statements:
+            for chunk in s.chunks(level):
+                yield chunk
+        level -= 1
+        yield indent(level) + 'end generate %s;\n' % self._label
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
     #   
     def __str__(self):
         raise NotImplementedError
@@ -91,24 +197,28 @@ class VhdlClockedProcess:
         self.reset_statements = []
         self.statements = []
     #
-    def to_str(self, level):
-        s = indent(level) + '%s : process(%s, %s) is\n' % (self.name, self.clock, self.reset)
-        s += indent(level) + 'begin\n'
+    def chunks(self, level):
+        yield indent(level) + '%s : process(%s, %s) is\n' % (self.name, self.clock, self.reset)
+        yield indent(level) + 'begin\n'
         level += 1
-        s += indent(level) + "if %s = '1' then\n" % self.reset
+        yield indent(level) + "if %s = '1' then\n" % self.reset
         level += 1
         for st in self.reset_statements:
-            s += "%s" % st.to_str(level)
+            for chunk in st.chunks(level):
+                yield chunk
         level -= 1
-        s += indent(level) + "elsif rising_edge(%s) then\n" % self.clock
+        yield indent(level) + "elsif rising_edge(%s) then\n" % self.clock
         level += 1
         for st in self.statements:            
-            s += st.to_str(level)
+            for chunk in st.chunks(level):
+                yield chunk
         level -= 1
-        s += indent(level) + "end if;\n"
+        yield indent(level) + "end if;\n"
         level -= 1        
-        s += indent(level) + 'end process %s;\n' % self.name
-        return s
+        yield indent(level) + 'end process %s;\n' % self.name
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
     #   
     def __str__(self):
         raise NotImplementedError
@@ -120,19 +230,22 @@ class VhdlAsyncProcess():
         self.sensitivity = []
         self.statements = []        
     #
-    def to_str(self, level):
+    def chunks(self, level):
         if len(self.sensitivity) > 0:
              sensitivity = "(%s)" % (','.join(self.sensitivity))
         else:
              sensitivity = ''        
-        s = indent(level) + '%s : process %s is\n' % (self.name, sensitivity)
-        s += indent(level) + 'begin\n'
+        yield indent(level) + '%s : process %s is\n' % (self.name, sensitivity)
+        yield indent(level) + 'begin\n'
         level += 1
         for st in self.statements:            
-            s += st.to_str(level)
+            for chunk in st.chunks(level):
+                yield chunk
         level -= 1
-        s += indent(level) + 'end process %s;\n' % self.name
-        return s
+        yield indent(level) + 'end process %s;\n' % self.name
+    #
+    def to_str(self, level):
+        return ''.join(self.chunks(level))
     #
     def __str__(self):
         raise NotImplementedError
@@ -140,157 +253,573 @@ class VhdlAsyncProcess():
 #
 # VHDL component generator
 #
+#
+# 'decode' selects the address decoder of the register accesses: 'full'
+# compares all address bits in a chain of if statements. 'slice' compares only
+# the address bits that differ between the module's registers (see
+# Module.decoded_address_bits()), and 'case' multiplexes on them. Both leave
+# the other bits to the interconnect, unless 'upper_generic' is set: the entity
+# then gets an UPPER_ADDR_DECODED generic, and the bits above the slice are
+# compared once with the base address unless the generic is true.
+#
+# If 'byte_enables' is set, the entity gets a 'be' port and bus writes only
+# update the bits of the enabled byte lanes.
+#
+# 'read_latency' is the number of clock cycles from a read access until dataout
+# is valid: 0 drives dataout combinationally, 1 registers the read multiplexer
+# and 2 additionally registers the read address and strobe before decoding.
+# Block RAM is read synchronously, hence modules with memories have a read
+# latency of at least 1.
+#
+# Memories are inferred block RAMs with a bus port and a user port. They are
+# selected by the address bits above their word index, and their read data
+# bypasses the register read multiplexer.
+#
 class VhdlComponentGenerator(CodeGenerator):
-    def __init__(self, module):
+    DECODERS = ('full', 'slice', 'case')
+    READ_LATENCIES = (0, 1, 2)
+    #
+    def __init__(self, module, decode='full', read_latency=0, upper_generic=False, byte_enables=False):
+        self.module = module
+        self.byte_enables = byte_enables
+        self.decode = decode
+        self.chip_select = "cs"
+        self.upper_generic = False
+        if decode != 'full':
+            self.decode_high, self.decode_low = module.decoded_address_bits()
+            if upper_generic and self.decode_high < 31:
+                # accesses outside of the module's address window are masked
+                self.upper_generic = True
+                self.chip_select = "s_cs"
+        self.read_latency = read_latency
+        if module.has_memories() and read_latency == 0:
+            self.read_latency = 1
+        if self.read_latency == 2:
+            # reads are decoded from the registered address and strobe
+            self.read_address = "s_read_addr_r"
+            self.read_strobe = "s_read_r = '1'"
+        else:
+            self.read_address = "addr"
+            self.read_strobe = "%s = '1' and rnw = '1'" % self.chip_select
+        # memory read data is multiplexed with the registered register read data
+        self.read_data = "dataout"
+        if any(m.is_bus_readable() for m in module.memories):
+            self.read_data = "s_dataout_r"
+    #
+    # Returns the pieces of the generated VHDL component
+    def chunks(self):
+        module = self.module
         #
         # Signal declarations
         signal_declarations = VhdlCodeBlock()
-        for r in module.registers:
-            signal_declarations.statements.append(VhdlStatement('signal %s : std_logic_vector(31 downto 0);\n' % (self.vhdl_data_signal(r))))
-            if r.is_bus_writable():
-                signal_declarations.statements.append(VhdlStatement("signal %s : std_logic := '0';\n" % (self.vhdl_strobe_signal(r))))
+        signal_declarations.statements.append(VhdlLazyStatements(self.array_functions, module))
+        signal_declarations.statements.append(VhdlLazyStatements(self.signal_declarations, module))
         #
         # Register-write process
         register_write_proc = VhdlClockedProcess("register_write", "clk", "rst")
         # resets
-        for r in module.registers:
-            if r.reset() != None:
-                register_write_proc.reset_statements.append(VhdlStatement('%s <= x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset())))
-
+        register_write_proc.reset_statements.append(VhdlLazyStatements(self.reset_statements, module))
         # defaults
         register_write_proc.statements.append(VhdlStatement("-- defaults:\n"))
-        for r in module.registers:
-            if r.is_bus_writable():
-                register_write_proc.statements.append(VhdlStatement("%s <= '0';\n" % self.vhdl_strobe_signal(r)))
+        register_write_proc.statements.append(VhdlLazyStatements(self.strobe_default_statements, module))
         # self-clearing fields
         register_write_proc.statements.append(VhdlStatement("-- self-clearing/setting fields:\n"))
-        for r in module.registers:
-            reg_data_signal = self.vhdl_data_signal(r)
-            for f in r.fields:
-                if f.selfClearSet != None:
-                    index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                    index_low = self.bitOffset_identifier(f)
-                    if f.is_user_writable():
-                        read_only_clear_block = VhdlIfStatement("addr = %s and cs = '1' and rnw = '1'" % self.address_identifier(r))
-                        read_only_clear_block.statements.append(VhdlStatement("%s(%s downto %s) <= (others => '%0d');\n" % (reg_data_signal, index_high, index_low, f.selfClearSet)))
-                        register_write_proc.statements.append(read_only_clear_block)
-                    else:
-                        register_write_proc.statements.append(VhdlStatement("%s(%s downto %s) <= (others => '%0d');\n" % (reg_data_signal, index_high, index_low, f.selfClearSet)))
-                        
+        register_write_proc.statements.append(VhdlLazyStatements(self.self_clearing_statements, module))
         # bus-write
         register_write_proc.statements.append(VhdlStatement("-- bus write:\n"))
-        bus_write_block = VhdlIfStatement("cs = '1' and rnw = '0'")
-        for r in module.registers:
-            reg_data_signal = self.vhdl_data_signal(r)
-            reg_strobe_signal = self.vhdl_strobe_signal(r)
-            if r.is_bus_writable():
-                register_write_block = VhdlIfStatement("addr = %s" % self.address_identifier(r))
-                for f in r.fields:
-                    if f.is_bus_writable():
-                        index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                        index_low = self.bitOffset_identifier(f)
-                        register_write_block.statements.append(VhdlStatement("%s(%s downto %s) <= datain(%s downto %s);\n" % (reg_data_signal, index_high, index_low, index_high, index_low)))
-                        register_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
-                bus_write_block.statements.append(register_write_block)
+        bus_write_block = VhdlIfStatement("%s = '1' and rnw = '0'" % self.chip_select)
+        if self.decode == 'case':
+            bus_write_block.statements.append(self.address_case(self.bus_write_block, structures.Register.is_bus_writable, module))
+        else:
+            bus_write_block.statements.append(VhdlLazyStatements(self.bus_write_statements, module))
         register_write_proc.statements.append(bus_write_block)
         # user-logic write
         register_write_proc.statements.append(VhdlStatement("-- user-logic write:\n"))        
-        for r in module.registers:
-            for f in r.fields:
-                if f.is_user_writable():
-                    if f.has_userWriteStrobe():
-                        field_write_block = VhdlIfStatement("user2regs.%s.%s.strobe = '1'" % (r.name, f.name))
-                        field_write_block.statements.append(VhdlStatement("%s(%s + %s - 1 downto %s) <= user2regs.%s.%s.value;\n" % (self.vhdl_data_signal(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f), r.name, f.name)))
-                        register_write_proc.statements.append(field_write_block)
-                    else:
-                        register_write_proc.statements.append(VhdlStatement("%s(%s + %s - 1 downto %s) <= user2regs.%s.%s.value;\n" % (self.vhdl_data_signal(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f), r.name, f.name)))
-
+        register_write_proc.statements.append(VhdlLazyStatements(self.user_write_statements, module))
         #
         # Bus-read process
-        bus_read_proc = VhdlAsyncProcess("bus_read")
-        bus_read_proc.sensitivity.append('cs')
-        bus_read_proc.sensitivity.append('rnw')
-        bus_read_proc.sensitivity.append('addr')
-        bus_read_proc.statements.append(VhdlStatement("dataout <= (others => 'X'); -- default\n"))
-        cs_block = VhdlIfStatement("cs = '1' and rnw = '1'")
-        for r in module.registers:
-            if r.is_bus_readable():
-                bus_read_proc.sensitivity.append(self.vhdl_data_signal(r))
-                reg_read_block = VhdlIfStatement("addr = %s" % self.address_identifier(r))
-                for f in r.fields:
-                    if f.is_bus_readable():
-                        index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
-                        index_low = self.bitOffset_identifier(f)
-                        reg_read_block.statements.append(VhdlStatement("dataout(%s downto %s) <= %s(%s downto %s);\n" % (index_high, index_low, self.vhdl_data_signal(r), index_high, index_low)))
-                cs_block.statements.append(reg_read_block)                
+        if self.read_latency == 0:
+            bus_read_proc = VhdlAsyncProcess("bus_read")
+            bus_read_proc.sensitivity.append(self.chip_select)
+            bus_read_proc.sensitivity.append('rnw')
+            bus_read_proc.sensitivity.append('addr')
+            for r in module.registers:
+                if r.is_bus_readable():
+                    bus_read_proc.sensitivity.append(self.vhdl_data_signal(r))
+        else:
+            bus_read_proc = VhdlClockedProcess("bus_read", "clk", "rst")
+            bus_read_proc.reset_statements.append(VhdlStatement("%s <= (others => '0');\n" % self.read_data))
+            bus_read_proc.reset_statements.append(VhdlLazyStatements(self.memory_read_defaults, module))
+        if self.read_latency == 2:
+            bus_read_proc.reset_statements.append(VhdlStatement("s_read_r <= '0';\n"))
+            bus_read_proc.statements.append(VhdlStatement("-- address decoding stage:\n"))
+            bus_read_proc.statements.append(VhdlStatement("s_read_r <= %s and rnw;\n" % self.chip_select))
+            bus_read_proc.statements.append(VhdlStatement("s_read_addr_r <= addr;\n"))
+            bus_read_proc.statements.append(VhdlStatement("-- read multiplexer stage:\n"))
+        bus_read_proc.statements.append(VhdlStatement("%s <= (others => 'X'); -- default\n" % self.read_data))
+        bus_read_proc.statements.append(VhdlLazyStatements(self.memory_read_defaults, module))
+        cs_block = VhdlIfStatement(self.read_strobe)
+        if self.decode == 'case':
+            cs_block.statements.append(self.address_case(self.bus_read_block, structures.Register.is_bus_readable, module, self.read_address))
+        else:
+            cs_block.statements.append(VhdlLazyStatements(self.bus_read_statements, module))
+        cs_block.statements.append(VhdlLazyStatements(self.memory_read_selects, module))
         bus_read_proc.statements.append(cs_block)
         #
         # Concurrent signal assignments
         concurrent_signal_assignments = VhdlCodeBlock()
-        for r in module.registers:
-            for f in r.fields:
-                if f.is_bus_writable():
-                    concurrent_signal_assignments.statements.append(VhdlStatement("regs2user.%s.%s.value <= %s(%s + %s - 1 downto %s);\n" % (r.name, f.name, self.vhdl_data_signal(r), self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f))))
-                    concurrent_signal_assignments.statements.append(VhdlStatement("regs2user.%s.%s.strobe <= %s;\n" % (r.name, f.name, self.vhdl_strobe_signal(r))))                   
+        if self.upper_generic:
+            upper_bits = "addr(31 downto %d)" % (self.decode_high + 1)
+            base_bits = "%s_REGS_BASEADDR(31 downto %d)" % (module.name.upper(), self.decode_high + 1)
+            concurrent_signal_assignments.statements.append(VhdlStatement("s_cs <= cs when UPPER_ADDR_DECODED or %s = %s else '0';\n" % (upper_bits, base_bits)))
+        concurrent_signal_assignments.statements.append(VhdlLazyStatements(self.read_data_multiplexer, module))
+        concurrent_signal_assignments.statements.append(VhdlLazyStatements(self.concurrent_signal_assignments, module))
         d = dict(entity_name = self.vhdl_entity_name(module),
-                 signal_declarations = signal_declarations.to_str(1),
+                 aliasing_report = self.aliasing_report(module),
+                 generics = self.generics(),
+                 byte_enable_port = "        be      : in  std_logic_vector(3 downto 0);  -- write byte enables\n" if self.byte_enables else "",
+                 use_numeric_std = "\nuse ieee.numeric_std.all;" if module.has_arrays() or module.has_memories() else "",
+                 signal_declarations = signal_declarations.chunks(1),
                  package_name = self.vhdl_package_name(module),
-                 register_write_proc = register_write_proc.to_str(1),
-                 concurrent_signal_assignments = concurrent_signal_assignments.to_str(1),
-                 register_read_proc = bus_read_proc.to_str(1),
+                 register_write_proc = register_write_proc.chunks(1),
+                 concurrent_signal_assignments = concurrent_signal_assignments.chunks(1),
+                 register_read_proc = bus_read_proc.chunks(1),
+                 memory_ports = self.memory_port_chunks(module, 1),
                  json_module_name = module.name,
                  hdlregs_version = constants.HDLREGS_VERSION,
                  date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
-        self._code = vhdl_templates.VHDL_COMPONENT_TEMPLATE.substitute(d)        
+        return template_chunks(vhdl_templates.VHDL_COMPONENT_TEMPLATE, d)
+    #
+    # Comment describing the address aliasing of partially decoded components
+    def aliasing_report(self, module):
+        if self.decode == 'full':
+            return ""
+        return "".join("-- Address decoding: %s\n" % line for line in module.aliasing_report(self.upper_generic))
+    #
+    # Generic declarations of the entity
+    def generics(self):
+        if not self.upper_generic:
+            return ""
+        return ("    generic(\n"
+                "        UPPER_ADDR_DECODED : boolean := false -- true if the interconnect decodes address bits 31..%d\n"
+                "    );\n" % (self.decode_high + 1))
+    #
+    # Address decoding functions for register arrays
+    def array_functions(self, module):
+        if not module.has_arrays():
+            return
+        for line in ("-- Returns true if 'addr' is the address of an element of a register array\n",
+                     "function is_array_element(addr, base : std_logic_vector(31 downto 0); count, stride : natural) return boolean is\n",
+                     "    variable offset : unsigned(31 downto 0);\n",
+                     "begin\n",
+                     "    offset := unsigned(addr) - unsigned(base);\n",
+                     "    return offset < count * stride and offset mod stride = 0;\n",
+                     "end function is_array_element;\n"):
+            yield VhdlStatement(line)
+        array_index = VhdlCodeBlock()
+        for line in ("-- Returns the index of the register array element at address 'addr'\n",
+                     "function array_index(addr, base : std_logic_vector(31 downto 0); stride : natural) return natural is\n",
+                     "begin\n",
+                     "    return to_integer((unsigned(addr) - unsigned(base)) / stride);\n",
+                     "end function array_index;\n"):
+            array_index.statements.append(VhdlStatement(line))
+        yield array_index
+        yield VhdlCodeBlock()  # blank line before the signal declarations
+    #
+    # Returns a case statement on the decoded address bits, with one alternative
+    # per register for which 'selected(register)' is True. 'block(register)'
+    # returns the register's if statement, whose statements are placed in the
+    # alternative; register arrays are decoded in 'when others'.
+    def address_case(self, block, selected, module, address="addr"):
+        case = VhdlCaseStatement(self.decoded_address(address))
+        case.alternatives.append(VhdlLazyStatements(self.case_alternatives, block, selected, module))
+        others = VhdlCaseAlternative("others")
+        others.statements.append(VhdlLazyStatements(self.array_blocks, block, selected, module))
+        case.alternatives.append(others)
+        return case
+    #
+    def case_alternatives(self, block, selected, module):
+        for r in module.registers:
+            if selected(r) and not r.is_array():
+                alternative = VhdlCaseAlternative(self.decoded_address_value(r), self.address_identifier(r))
+                alternative.statements = block(r).statements
+                yield alternative
+    #
+    def array_blocks(self, block, selected, module):
+        for r in module.registers:
+            if selected(r) and r.is_array():
+                yield block(r)
+    #
+    # Returns the decoded bits of an address signal, e.g. 'addr(9 downto 2)'
+    def decoded_address(self, address="addr"):
+        return "%s(%d downto %d)" % (address, self.decode_high, self.decode_low)
+    #
+    # Returns the decoded address bits of a register as bit string literal
+    def decoded_address_value(self, register):
+        width = self.decode_high - self.decode_low + 1
+        value = (register.addressOffset >> self.decode_low) & ((1 << width) - 1)
+        return '"%s"' % bin(value)[2:].zfill(width)
+    #
+    # Returns the condition selecting a register (array) by an address signal
+    def address_match(self, register, address="addr"):
+        if register.is_array():
+            return "is_array_element(%s, %s, %s, %s)" % (address, self.address_identifier(register), self.count_identifier(register), self.stride_identifier(register))
+        if self.decode != 'full':
+            return "%s = %s" % (self.decoded_address(address), self.decoded_address_value(register))
+        return "%s = %s" % (address, self.address_identifier(register))
+    #
+    # Returns the register (array element) selected by an address signal
+    def addressed_element(self, signal, register, address="addr"):
+        if register.is_array():
+            return "%s(array_index(%s, %s, %s))" % (signal, address, self.address_identifier(register), self.stride_identifier(register))
+        return signal
+    #
+    # Returns the index range of a register array
+    def array_range(self, register):
+        return "0 to %s - 1" % self.count_identifier(register)
+    #
+    # Register data and strobe signal declarations
+    def signal_declarations(self, module):
+        for r in module.registers:
+            if r.is_array():
+                array_type = "t_%s_array" % r.name.lower()
+                yield VhdlStatement('type %s is array (%s) of std_logic_vector(31 downto 0);\n' % (array_type, self.array_range(r)))
+                yield VhdlStatement('signal %s : %s;\n' % (self.vhdl_data_signal(r), array_type))
+                if r.is_bus_writable():
+                    yield VhdlStatement("signal %s : std_logic_vector(%s - 1 downto 0) := (others => '0');\n" % (self.vhdl_strobe_signal(r), self.count_identifier(r)))
+                continue
+            yield VhdlStatement('signal %s : std_logic_vector(31 downto 0);\n' % (self.vhdl_data_signal(r)))
+            if r.is_bus_writable():
+                yield VhdlStatement("signal %s : std_logic := '0';\n" % (self.vhdl_strobe_signal(r)))
+        for m in module.memories:
+            name = m.name.lower()
+            yield VhdlStatement('type t_%s_ram is array (0 to %s - 1) of std_logic_vector(%s - 1 downto 0);\n' % (name, self.depth_identifier(m), self.data_width_identifier(m)))
+            yield VhdlStatement('signal %s : t_%s_ram;\n' % (self.memory_signal(m), name))
+            if m.is_bus_readable():
+                yield VhdlStatement('signal s_%s_q : std_logic_vector(%s - 1 downto 0); -- bus read port\n' % (name, self.data_width_identifier(m)))
+                if self.read_latency == 2:
+                    yield VhdlStatement('signal s_%s_q_r : std_logic_vector(%s - 1 downto 0); -- output register\n' % (name, self.data_width_identifier(m)))
+                yield VhdlStatement("signal s_%s_read_r : std_logic := '0'; -- dataout is read from the memory\n" % name)
+        if self.read_data != "dataout":
+            yield VhdlStatement("signal s_dataout_r : std_logic_vector(31 downto 0); -- register read data\n")
+        if self.upper_generic:
+            yield VhdlStatement("signal s_cs : std_logic; -- chip select within the module's address window\n")
+        if self.read_latency == 2:
+            yield VhdlStatement("signal s_read_r : std_logic := '0';\n")
+            yield VhdlStatement("signal s_read_addr_r : std_logic_vector(31 downto 0);\n")
+    #
+    # Register resets
+    def reset_statements(self, module):
+        for r in module.registers:
+            if r.reset() != None:
+                if r.is_array():
+                    yield VhdlStatement('%s <= (others => x"%.8X");\n' % (self.vhdl_data_signal(r), r.reset()))
+                else:
+                    yield VhdlStatement('%s <= x"%.8X";\n' % (self.vhdl_data_signal(r), r.reset()))
+    #
+    # Strobe defaults
+    def strobe_default_statements(self, module):
+        for r in module.registers:
+            if r.is_bus_writable():
+                if r.is_array():
+                    yield VhdlStatement("%s <= (others => '0');\n" % self.vhdl_strobe_signal(r))
+                else:
+                    yield VhdlStatement("%s <= '0';\n" % self.vhdl_strobe_signal(r))
+    #
+    # Self-clearing/setting fields
+    def self_clearing_statements(self, module):
+        for r in module.registers:
+            reg_data_signal = self.vhdl_data_signal(r)
+            clear_loop = None
+            for f in r.fields:
+                if f.selfClearSet != None:
+                    index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
+                    index_low = self.bitOffset_identifier(f)
+                    if f.is_user_writable():
+                        # cleared when the read multiplexer samples the register
+                        read_only_clear_block = VhdlIfStatement("%s and %s" % (self.address_match(r, self.read_address), self.read_strobe))
+                        read_only_clear_block.statements.append(VhdlStatement("%s(%s downto %s) <= (others => '%0d');\n" % (self.addressed_element(reg_data_signal, r, self.read_address), index_high, index_low, f.selfClearSet)))
+                        yield read_only_clear_block
+                    elif r.is_array():
+                        if clear_loop == None:
+                            clear_loop = VhdlForLoop("i", self.array_range(r))
+                        clear_loop.statements.append(VhdlStatement("%s(i)(%s downto %s) <= (others => '%0d');\n" % (reg_data_signal, index_high, index_low, f.selfClearSet)))
+                    else:
+                        yield VhdlStatement("%s(%s downto %s) <= (others => '%0d');\n" % (reg_data_signal, index_high, index_low, f.selfClearSet))
+            if clear_loop != None:
+                yield clear_loop
+    #
+    # Bus writes, one block per bus-writable register (array)
+    def bus_write_statements(self, module):
+        for r in module.registers:
+            if r.is_bus_writable():
+                yield self.bus_write_block(r)
+    #
+    # Bus write of one register (array element)
+    def bus_write_block(self, r):
+        reg_data_signal = self.addressed_element(self.vhdl_data_signal(r), r)
+        reg_strobe_signal = self.addressed_element(self.vhdl_strobe_signal(r), r)
+        register_write_block = VhdlIfStatement(self.address_match(r))
+        if self.byte_enables:
+            register_write_block.statements.extend(self.byte_lane_writes(r, reg_data_signal))
+            register_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
+            return register_write_block
+        for f in r.bus_writable_fields():
+            index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
+            index_low = self.bitOffset_identifier(f)
+            register_write_block.statements.append(VhdlStatement("%s(%s downto %s) <= datain(%s downto %s);\n" % (reg_data_signal, index_high, index_low, index_high, index_low)))
+            register_write_block.statements.append(VhdlStatement("%s <= '1';\n" % (reg_strobe_signal)))
+        return register_write_block
+    #
+    # Bus writes of a register's fields, gated by the byte enables: one block
+    # per byte lane, which writes the bits of the fields within the lane
+    def byte_lane_writes(self, r, reg_data_signal):
+        for lane in range(r.size() // 8):
+            lane_low = 8 * lane
+            lane_high = lane_low + 7
+            lane_block = VhdlIfStatement("be(%d) = '1'" % lane)
+            for f in r.bus_writable_fields():
+                field_low = f.bitOffset
+                field_high = f.bitOffset + f.bitWidth - 1
+                if field_high < lane_low or field_low > lane_high:
+                    continue
+                if field_low >= lane_low and field_high <= lane_high:
+                    # the field lies within the lane
+                    index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
+                    index_low = self.bitOffset_identifier(f)
+                    lane_block.statements.append(VhdlStatement("%s(%s downto %s) <= datain(%s downto %s);\n" % (reg_data_signal, index_high, index_low, index_high, index_low)))
+                else:
+                    index_high = min(field_high, lane_high)
+                    index_low = max(field_low, lane_low)
+                    lane_block.statements.append(VhdlStatement("%s(%d downto %d) <= datain(%d downto %d); -- field '%s'\n" % (reg_data_signal, index_high, index_low, index_high, index_low, f.name)))
+            if len(lane_block.statements) > 0:
+                yield lane_block
+    #
+    # User-logic writes; the elements of register arrays are written in a loop
+    def user_write_statements(self, module):
+        for r in module.registers:
+            if r.is_array():
+                if r.is_user_writable():
+                    array_loop = VhdlForLoop("i", self.array_range(r))
+                    array_loop.statements.extend(self.user_field_writes(r, "%s(i)" % self.vhdl_data_signal(r), "user2regs.%s(i)" % r.name))
+                    yield array_loop
+            else:
+                for st in self.user_field_writes(r, self.vhdl_data_signal(r), "user2regs.%s" % r.name):
+                    yield st
     #
-    # Save the generated VHDL component to a file
-    def save(self, filename):
-        with open(filename, 'w') as f:
-            f.write(self._code)    
+    # User-logic writes of the fields of one register (array element)
+    def user_field_writes(self, register, reg_data_signal, user2regs):
+        for f in register.user_writable_fields():
+            if f.has_userWriteStrobe():
+                field_write_block = VhdlIfStatement("%s.%s.strobe = '1'" % (user2regs, f.name))
+                field_write_block.statements.append(VhdlStatement("%s(%s + %s - 1 downto %s) <= %s.%s.value;\n" % (reg_data_signal, self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f), user2regs, f.name)))
+                yield field_write_block
+            else:
+                yield VhdlStatement("%s(%s + %s - 1 downto %s) <= %s.%s.value;\n" % (reg_data_signal, self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f), user2regs, f.name))
+    #
+    # Bus reads, one block per bus-readable register (array)
+    def bus_read_statements(self, module):
+        for r in module.registers:
+            if r.is_bus_readable():
+                yield self.bus_read_block(r)
+    #
+    # Bus read of one register (array element)
+    def bus_read_block(self, r):
+        reg_read_block = VhdlIfStatement(self.address_match(r, self.read_address))
+        reg_data_signal = self.addressed_element(self.vhdl_data_signal(r), r, self.read_address)
+        for f in r.bus_readable_fields():
+            index_high = "%s + %s - 1" % (self.bitOffset_identifier(f), self.bitWidth_identifier(f))
+            index_low = self.bitOffset_identifier(f)
+            reg_read_block.statements.append(VhdlStatement("%s(%s downto %s) <= %s(%s downto %s);\n" % (self.read_data, index_high, index_low, reg_data_signal, index_high, index_low)))
+        return reg_read_block
+    #
+    # Returns a memory's block RAM signal name
+    def memory_signal(self, memory):
+        return 's_' + memory.name.lower() + '_ram'
+    #
+    # Returns the index of the memory word selected by an address signal
+    def memory_index(self, memory, address="addr"):
+        return "to_integer(unsigned(%s(%s + 1 downto 2)))" % (address, self.index_width_identifier(memory))
+    #
+    # Returns the condition selecting a memory by an address signal, i.e.
+    # comparing the decoded address bits above the word index
+    def memory_match(self, memory, address="addr"):
+        high = 31 if self.decode == 'full' else self.decode_high
+        low = memory.index_width() + 2
+        return "%s(%d downto %d) = %s(%d downto %d)" % (address, high, low, self.address_identifier(memory), high, low)
+    #
+    # Returns 'statement' in an if statement checking the word index, unless
+    # every index value addresses a word of the memory
+    def memory_index_guard(self, memory, index, statement):
+        if memory.depth & (memory.depth - 1) == 0:
+            return statement
+        guard = VhdlIfStatement("%s < %s" % (index, self.depth_identifier(memory)))
+        guard.statements.append(statement)
+        return guard
+    #
+    # Memory read selects are cleared by default
+    def memory_read_defaults(self, module):
+        for m in module.memories:
+            if m.is_bus_readable():
+                yield VhdlStatement("s_%s_read_r <= '0';\n" % m.name.lower())
+    #
+    # Memory read selects, which pass the memory's read data on to dataout
+    def memory_read_selects(self, module):
+        for m in module.memories:
+            if m.is_bus_readable():
+                select_block = VhdlIfStatement(self.memory_match(m, self.read_address))
+                select_block.statements.append(VhdlStatement("s_%s_read_r <= '1';\n" % m.name.lower()))
+                yield select_block
+    #
+    # Multiplexer of the register and memory read data
+    def read_data_multiplexer(self, module):
+        if self.read_data == "dataout":
+            return
+        choices = []
+        for m in module.memories:
+            if m.is_bus_readable():
+                q = "s_%s_q_r" % m.name.lower() if self.read_latency == 2 else "s_%s_q" % m.name.lower()
+                if m.width < 32:
+                    q = "std_logic_vector(resize(unsigned(%s), 32))" % q
+                choices.append("%s when s_%s_read_r = '1' else\n" % (q, m.name.lower()))
+        continuation = " " * len(indent(1) + "dataout <= ")  # concurrent statements are at level 1
+        yield VhdlStatement("dataout <= " + continuation.join(choices) + continuation + "s_dataout_r;\n")
+    #
+    # Block RAM processes of the memories: one for the bus port and one for
+    # the user port of every memory, without reset so that they are inferred
+    # as block RAM
+    def memory_port_chunks(self, module, level):
+        for m in module.memories:
+            for port in (self.memory_bus_port(m), self.memory_user_port(m)):
+                yield '\n'
+                for chunk in port.chunks(level):
+                    yield chunk
+    #
+    # Bus port of a memory: writes of bus-writable memories, reads of
+    # bus-readable memories
+    def memory_bus_port(self, m):
+        name = m.name.lower()
+        ram = self.memory_signal(m)
+        index = self.memory_index(m)
+        port = VhdlAsyncProcess("%s_bus_port" % name)
+        port.sensitivity.append('clk')
+        clocked = VhdlIfStatement("rising_edge(clk)")
+        if m.is_bus_writable():
+            condition = "%s = '1' and rnw = '0' and %s" % (self.chip_select, self.memory_match(m))
+            if m.depth & (m.depth - 1) != 0:
+                condition += " and %s < %s" % (index, self.depth_identifier(m))
+            write_block = VhdlIfStatement(condition)
+            if self.byte_enables:
+                for lane in range((m.width + 7) // 8):
+                    lane_low = 8 * lane
+                    lane_high = min(lane_low + 7, m.width - 1)
+                    lane_block = VhdlIfStatement("be(%d) = '1'" % lane)
+                    lane_block.statements.append(VhdlStatement("%s(%s)(%d downto %d) <= datain(%d downto %d);\n" % (ram, index, lane_high, lane_low, lane_high, lane_low)))
+                    write_block.statements.append(lane_block)
+            else:
+                write_block.statements.append(VhdlStatement("%s(%s) <= datain(%s - 1 downto 0);\n" % (ram, index, self.data_width_identifier(m))))
+            clocked.statements.append(write_block)
+        if m.is_bus_readable():
+            clocked.statements.append(self.memory_index_guard(m, index, VhdlStatement("s_%s_q <= %s(%s);\n" % (name, ram, index))))
+            if self.read_latency == 2:
+                clocked.statements.append(VhdlStatement("s_%s_q_r <= s_%s_q;\n" % (name, name)))
+        port.statements.append(clocked)
+        return port
+    #
+    # User port of a memory: the user logic reads bus-writable memories and
+    # writes read-only ones
+    def memory_user_port(self, m):
+        name = m.name.lower()
+        ram = self.memory_signal(m)
+        index = "to_integer(unsigned(user2regs.%s.addr))" % m.name
+        port = VhdlAsyncProcess("%s_user_port" % name)
+        port.sensitivity.append('clk')
+        clocked = VhdlIfStatement("rising_edge(clk)")
+        if m.is_user_writable():
+            write_block = VhdlIfStatement("user2regs.%s.we = '1'" % m.name)
+            write_block.statements.append(VhdlStatement("%s(%s) <= user2regs.%s.data;\n" % (ram, index, m.name)))
+            clocked.statements.append(self.memory_index_guard(m, index, write_block))
+        else:
+            clocked.statements.append(self.memory_index_guard(m, index, VhdlStatement("regs2user.%s.data <= %s(%s);\n" % (m.name, ram, index))))
+        port.statements.append(clocked)
+        return port
+    #
+    # Register file -> user logic assignments; register arrays are connected
+    # by a generate loop
+    def concurrent_signal_assignments(self, module):
+        for r in module.registers:
+            if r.is_array():
+                if r.is_bus_writable():
+                    array_generate = VhdlForGenerate("gen_%s" % r.name.lower(), "i", self.array_range(r))
+                    array_generate.statements.extend(self.regs2user_assignments(r, "regs2user.%s(i)" % r.name, "%s(i)" % self.vhdl_data_signal(r), "%s(i)" % self.vhdl_strobe_signal(r)))
+                    yield array_generate
+            else:
+                for st in self.regs2user_assignments(r, "regs2user.%s" % r.name, self.vhdl_data_signal(r), self.vhdl_strobe_signal(r)):
+                    yield st
+    #
+    # Register file -> user logic assignments of one register (array element)
+    def regs2user_assignments(self, register, regs2user, reg_data_signal, reg_strobe_signal):
+        for f in register.bus_writable_fields():
+            yield VhdlStatement("%s.%s.value <= %s(%s + %s - 1 downto %s);\n" % (regs2user, f.name, reg_data_signal, self.bitOffset_identifier(f), self.bitWidth_identifier(f), self.bitOffset_identifier(f)))
+            yield VhdlStatement("%s.%s.strobe <= %s;\n" % (regs2user, f.name, reg_strobe_signal))
 
 #
 # VHDL package generator
 #
 class VhdlPackageGenerator(CodeGenerator):
-    def __init__(self, module):
+    def __init__(self, module, read_latency=0):
+        self.module = module
+        self.read_latency = read_latency
+        if module.has_memories() and read_latency == 0:
+            self.read_latency = 1  # block RAM is read synchronously
+    #
+    # Returns the pieces of the generated VHDL package
+    def chunks(self):
+        module = self.module
         vhdl_package = VhdlPackage(self.vhdl_package_name(module))
         # Interface record types     
         user2regs = VhdlRecord('t_user2regs', 'User-logic -> register file interface', [])
         regs2user = VhdlRecord('t_regs2user', 'Register file -> user-logic interface', [])
         # Register address offsets
-        for r in module.registers:
-            vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(r), r.addressOffset)))
+        vhdl_package.add_declaration(VhdlLazyStatements(self.address_declarations, module))
         # Lowest address in register file 
         identifier = module.name.upper() + "_REGS_BASEADDR"
         base_register_identifier = self.address_identifier(module.base_register())
+        if module.base_address() != module.base_register().addressOffset:
+            base_register_identifier = 'x"%.8X"' % module.base_address()
         vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- lowest register address\n' % (identifier, base_register_identifier)))        
         # Highest address in register file
         identifier = module.name.upper() + "_REGS_HIGHADDR"
-        high_register_identifier = self.address_identifier(module.high_register())
+        high_register = module.high_register()
+        if high_register.is_array() or module.high_address() != high_register.last_address():
+            high_register_identifier = 'x"%.8X"' % module.high_address()
+        else:
+            high_register_identifier = self.address_identifier(high_register)
         vhdl_package.add_declaration(VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := %s; -- highest register address\n' % (identifier, high_register_identifier)))
+        # Read latency of the component, for configuring the bus adapter
+        identifier = module.name.upper() + "_REGS_READ_LATENCY"
+        vhdl_package.add_declaration(VhdlDeclaration('constant %s : natural := %d; -- clock cycles from read access to valid dataout\n' % (identifier, self.read_latency)))
         # Field constants:
-        for r in module.registers:
-            for f in r.fields:
-                vhdl_package.add_declaration(self.to_vhdl_constants(f))
+        vhdl_package.add_declaration(VhdlLazyStatements(self.field_constant_declarations, module))
         # Field record types
-        field_types = ''
-        for r in module.registers:
-            for f in r.fields:
-                description = "Field '%s' of register '%s' (%s)" % (f.name, r.name, f.access())
-                elements = []
-                elements.append("value : std_logic_vector(%s - 1 downto 0)" % (self.bitWidth_identifier(f)))
-                elements.append("strobe : std_logic")
-                record = VhdlRecord(self.vhdl_record_name(f), description, elements)
-                vhdl_package.add_declaration(record)       
+        vhdl_package.add_declaration(VhdlLazyStatements(self.field_record_declarations, module))
         # Register record types (XXX_regs2user and/or XXX_user2regs)
+        vhdl_package.add_declaration(VhdlLazyStatements(self.register_record_declarations, module))
+        # Memory port record types
+        vhdl_package.add_declaration(VhdlLazyStatements(self.memory_record_declarations, module))
         for r in module.registers:
-            records = self.to_vhdl_records(r)
-            for record in records:
+            for record in self.to_vhdl_records(r):
+                record_type = record.name
+                if r.is_array():
+                    record_type += "_array"
                 if record.name.endswith('user2regs'):
-                    user2regs.add_element(r.name + ": " + record.name)
+                    user2regs.add_element(r.name + ": " + record_type)
                 if record.name.endswith('regs2user'):
-                    regs2user.add_element(r.name + ": " + record.name)
-                vhdl_package.add_declaration(record)
+                    regs2user.add_element(r.name + ": " + record_type)
+        for m in module.memories:
+            user2regs.add_element("%s: t_%s_user2regs" % (m.name, m.name))
+            if m.is_bus_writable():
+                regs2user.add_element("%s: t_%s_regs2user" % (m.name, m.name))
         # Add dummy signals in case of empty records, as these are not allowed in VHDL
         if 0 == user2regs.num_elements():
             user2regs.add_element("dummy : std_logic")
@@ -299,7 +828,58 @@ class VhdlPackageGenerator(CodeGenerator):
         #
         vhdl_package.add_declaration(user2regs)        
         vhdl_package.add_declaration(regs2user)
-        self._code = str(vhdl_package)
+        return vhdl_package.chunks()
+    #
+    # Register address offsets
+    def address_declarations(self, module):
+        for r in module.registers:
+            yield VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(r), r.addressOffset))
+            if r.is_array():
+                yield VhdlDeclaration('constant %s : natural := %d;\n' % (self.count_identifier(r), r.count))
+                yield VhdlDeclaration('constant %s : natural := %d;\n' % (self.stride_identifier(r), r.stride))
+        for m in module.memories:
+            yield VhdlDeclaration('constant %s : std_logic_vector(31 downto 0) := x"%.8X";\n' % (self.address_identifier(m), m.addressOffset))
+            yield VhdlDeclaration('constant %s : natural := %d; -- bytes\n' % (self.size_identifier(m), m.address_span()))
+            yield VhdlDeclaration('constant %s : natural := %d; -- words\n' % (self.depth_identifier(m), m.depth))
+            yield VhdlDeclaration('constant %s : natural := %d;\n' % (self.data_width_identifier(m), m.width))
+            yield VhdlDeclaration('constant %s : natural := %d;\n' % (self.index_width_identifier(m), m.index_width()))
+    #
+    # Field constants
+    def field_constant_declarations(self, module):
+        for r in module.registers:
+            for f in r.fields:
+                yield self.to_vhdl_constants(f)
+    #
+    # Field record types
+    def field_record_declarations(self, module):
+        for r in module.registers:
+            for f in r.fields:
+                description = "Field '%s' of register '%s' (%s)" % (f.name, r.name, f.access())
+                elements = []
+                elements.append("value : std_logic_vector(%s - 1 downto 0)" % (self.bitWidth_identifier(f)))
+                elements.append("strobe : std_logic")
+                yield VhdlRecord(self.vhdl_record_name(f), description, elements)
+    #
+    # Register record types, plus array types for register arrays
+    def register_record_declarations(self, module):
+        for r in module.registers:
+            for record in self.to_vhdl_records(r):
+                yield record
+                if r.is_array():
+                    yield VhdlDeclaration("type %s_array is array (0 to %s - 1) of %s;\n" % (record.name, self.count_identifier(r), record.name))
+    #
+    # Memory port record types: the user logic addresses the memory, and
+    # either reads (bus-writable memories) or writes it (read-only memories)
+    def memory_record_declarations(self, module):
+        for m in module.memories:
+            description = "Memory '%s' (%s)" % (m.name, m.access)
+            elements = ["addr : std_logic_vector(%s - 1 downto 0)" % self.index_width_identifier(m)]
+            if m.is_user_writable():
+                elements.append("data : std_logic_vector(%s - 1 downto 0)" % self.data_width_identifier(m))
+                elements.append("we : std_logic")
+            yield VhdlRecord("t_%s_user2regs" % m.name, description, elements)
+            if m.is_bus_writable():
+                yield VhdlRecord("t_%s_regs2user" % m.name, description, ["data : std_logic_vector(%s - 1 downto 0)" % self.data_width_identifier(m)])
     #
     # Generate VHDL constants for a field
     def to_vhdl_constants(self, field):
@@ -319,23 +899,17 @@ class VhdlPackageGenerator(CodeGenerator):
         name = "t_%s_user2regs" % (register.name)
         description = "Register '%s'" % register.name
         elements = []
-        for f in register.fields:
-            if f.access() == "read-only":
-                elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))
+        for f in register.user_writable_fields():
+            elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))
         if len(elements) > 0:
             records.append(VhdlRecord(name, description, elements))
         # bus-writable fields:
         name = "t_%s_regs2user" % (register.name)
         description = "Register '%s'" % register.name
         elements = []
-        for f in register.fields:
-            if f.access() == "read-write" or f.access() == "write-only":
-                elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))       
+        for f in register.bus_writable_fields():
+            elements.append('%s : %s' % (f.name, self.vhdl_record_name(f)))
         if len(elements) > 0:
             records.append(VhdlRecord(name, description, elements))        
         return records 
-    #
-    def save(self, filename):
-        with open(filename, 'w') as f:
-            f.write(self._code)
     
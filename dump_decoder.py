@@ -0,0 +1,171 @@
+#
+# Decoding of binary register dumps with NumPy
+#
+# A register dump is a sequence of samples, each a snapshot of the module's
+# address window from BASEADDR to HIGHADDR as little-endian 32-bit words. The
+# dump is memory-mapped and decoded a chunk of samples at a time: every
+# bus-readable field becomes one column, extracted from all samples of the
+# chunk by a vectorized shift and mask. Register arrays contribute one column
+# per element and field; memories are not decoded.
+#
+# NumPy is only imported when a dump is decoded.
+#
+
+import os
+import shutil
+import zipfile
+import tempfile
+
+CHUNK_SIZE = 32 * 1024 * 1024  # bytes of the dump decoded at a time
+FORMATS = ('npz', 'csv')
+
+class DumpError(Exception):
+    pass
+
+#
+# Returns the numpy module
+#
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise DumpError("decoding register dumps requires NumPy")
+    return numpy
+
+#
+# Returns the number of 32-bit words of a sample of the module's dumps
+#
+def sample_words(module):
+    return (module.high_address() - module.base_address()) // 4 + 1
+
+#
+# Returns the columns of the module's dumps as (name, word index in the sample,
+# bit offset, mask, dtype) tuples, in the order of the registers and fields
+#
+def dump_columns(module):
+    columns = []
+    base_address = module.base_address()
+    for r in module.registers:
+        fields = r.bus_readable_fields()
+        if r.is_array():
+            elements = [("%s[%d]" % (r.name, i), r.addressOffset + i * r.stride) for i in range(r.count)]
+        else:
+            elements = [(r.name, r.addressOffset)]
+        for prefix, address in elements:
+            for f in fields:
+                if f.bitWidth <= 8:
+                    dtype = 'u1'
+                elif f.bitWidth <= 16:
+                    dtype = 'u2'
+                else:
+                    dtype = 'u4'
+                columns.append(("%s.%s" % (prefix, f.name), (address - base_address) // 4, f.bitOffset, 2 ** f.bitWidth - 1, dtype))
+    return columns
+
+#
+# Returns the decoded columns of a chunk of samples (a 2D array of words)
+#
+def decode_chunk(numpy, chunk, columns):
+    values = []
+    word_index = None
+    for name, index, offset, mask, dtype in columns:
+        if index != word_index:
+            word_index = index
+            words = chunk[:, index]
+        if offset == 0 and mask == 0xFFFFFFFF:
+            values.append(words.astype(dtype))
+        else:
+            values.append(((words >> offset) & mask).astype(dtype))
+    return values
+
+#
+# Writes the columns into a NumPy .npz archive. Every column is appended to a
+# temporary .npy file chunk by chunk, and the files are stored into the archive
+# at the end, so that only one chunk is held in memory.
+#
+class NpzWriter():
+    #
+    def __init__(self, numpy, filename, columns, num_samples):
+        self.filename = filename
+        self.names = [column[0] for column in columns]
+        self.directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(filename)))
+        self.paths = [os.path.join(self.directory, "%d.npy" % i) for i in range(len(columns))]
+        for path, column in zip(self.paths, columns):
+            with open(path, 'wb') as f:
+                header = {'descr': numpy.dtype(column[4]).newbyteorder('<').str, 'fortran_order': False, 'shape': (num_samples,)}
+                numpy.lib.format.write_array_header_1_0(f, header)
+    #
+    def write(self, values):
+        for path, column in zip(self.paths, values):
+            with open(path, 'ab') as f:
+                f.write(column.astype(column.dtype.newbyteorder('<')).tobytes())
+    #
+    def close(self):
+        try:
+            with zipfile.ZipFile(self.filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for path, name in zip(self.paths, self.names):
+                    archive.write(path, name + '.npy')
+        finally:
+            shutil.rmtree(self.directory)
+    #
+    def abort(self):
+        shutil.rmtree(self.directory)
+
+#
+# Writes the columns into a CSV file with a header line of column names
+#
+class CsvWriter():
+    #
+    def __init__(self, numpy, filename, columns, num_samples):
+        self.numpy = numpy
+        self.file = open(filename, 'w')
+        self.file.write(",".join(column[0] for column in columns) + "\n")
+    #
+    def write(self, values):
+        rows = self.numpy.column_stack(values).tolist()
+        self.file.write("".join(",".join(map(str, row)) + "\n" for row in rows))
+    #
+    def close(self):
+        self.file.close()
+    #
+    def abort(self):
+        self.file.close()
+        os.remove(self.file.name)
+
+WRITERS = {'npz': NpzWriter, 'csv': CsvWriter}
+
+#
+# Decodes the dump file of an elaborated module into 'output_filename'; the
+# output format is 'npz' or 'csv', by default the extension of the output file.
+# Returns the number of decoded samples.
+#
+def decode_dump(module, dump_filename, output_filename, output_format=None, chunk_size=CHUNK_SIZE):
+    numpy = import_numpy()
+    if output_format == None:
+        output_format = os.path.splitext(output_filename)[1][1:].lower()
+        if output_format not in FORMATS:
+            output_format = 'npz'
+    if output_format not in FORMATS:
+        raise DumpError("unknown output format '%s'" % output_format)
+    columns = dump_columns(module)
+    if len(columns) == 0:
+        raise DumpError("module '%s' has no bus-readable fields" % module.name)
+    words = sample_words(module)
+    size = os.path.getsize(dump_filename)
+    if size % (4 * words) != 0:
+        raise DumpError("the size of '%s' (%d bytes) is not a multiple of the sample size of module '%s' (%d bytes)" % (dump_filename, size, module.name, 4 * words))
+    num_samples = size // (4 * words)
+    chunk_samples = max(1, chunk_size // (4 * words))
+    writer = WRITERS[output_format](numpy, output_filename, columns, num_samples)
+    try:
+        if num_samples > 0:
+            dump = numpy.memmap(dump_filename, dtype='<u4', mode='r', shape=(num_samples, words))
+            for start in range(0, num_samples, chunk_samples):
+                chunk = numpy.array(dump[start:start + chunk_samples])
+                writer.write(decode_chunk(numpy, chunk, columns))
+            del dump
+    except:
+        writer.abort()
+        raise
+    writer.close()
+    return num_samples
@@ -1,6 +1,6 @@
 
 // Header for module 'example'
-// automatically generated by HDLRegs version 0.6 on 2019-03-11 18:06
+// automatically generated by HDLRegs version 0.6 on 2026-10-18 05:08
 
 #ifndef EXAMPLE_REGS_H
 #define EXAMPLE_REGS_H
@@ -1,6 +1,6 @@
 
 -- VHDL package for module 'example_regs_pkg'
--- automatically generated by HDLRegs version 0.6 on 2019-03-11 18:06
+-- automatically generated by HDLRegs version 0.6 on 2026-10-18 05:08
 
 library ieee;
 use ieee.std_logic_1164.all;
@@ -9,6 +9,7 @@ package example_regs_pkg is
     constant ADDR_CONTROL : std_logic_vector(31 downto 0) := x"00000100";
     constant EXAMPLE_REGS_BASEADDR : std_logic_vector(31 downto 0) := ADDR_VERSION; -- lowest register address
     constant EXAMPLE_REGS_HIGHADDR : std_logic_vector(31 downto 0) := ADDR_CONTROL; -- highest register address
+    constant EXAMPLE_REGS_READ_LATENCY : natural := 0; -- clock cycles from read access to valid dataout
 
     -- Field 'high' of register 'version'
     constant OFFSET_VERSION_HIGH : natural := 0;
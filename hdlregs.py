@@ -28,35 +28,365 @@
 # of the authors and should not be interpreted as representing official policies, 
 # either expressed or implied, of the FreeBSD Project.
 
+import re
 import sys
 import json
 import os
-import datetime
 import argparse
+import importlib
+import traceback
 
 #import structures
-from structures import Module, ModuleError, RegisterError, FieldError
-import code_gen.vhdl
-import code_gen.html
-import code_gen.c
+from structures import Module, Register, System, ModuleError, RegisterError, FieldError, SystemSpecError
+from profiler import Profiler, format_profiles
 import code_gen.constants as constants
-            
+
+#
+# Matches the bytes which are not ASCII characters
+#
+NON_ASCII_PATTERN = re.compile(r'[\x80-\xff]')
+
+#
+# Output generators: (output option, output directory option, file name suffix,
+# generator module, generator class, generator options). Generator modules are
+# only imported when their output is requested. The generator options are
+# passed to the generator's constructor as keyword arguments.
+#
+GENERATORS = (
+    ('html', 'html_output_dir', '_regs.html', 'code_gen.html', 'HtmlGenerator', ('split',)),
+    ('c', 'c_output_dir', '_regs.h', 'code_gen.c', 'CHeaderGenerator', ('accessors', 'shadow')),
+    ('vhdl', 'vhdl_output_dir', '_regs_pkg.vhd', 'code_gen.vhdl', 'VhdlPackageGenerator', ('read_latency',)),
+    ('vhdl', 'vhdl_output_dir', '_regs.vhd', 'code_gen.vhdl', 'VhdlComponentGenerator', ('decode', 'read_latency', 'upper_generic', 'byte_enables')),
+    ('python', 'python_output_dir', '_regs.py', 'code_gen.python', 'PythonGenerator', ()),
+)
+
+#
+# Real paths of the register definition files of the batch; modules of systems
+# which are listed themselves are generated by their own job
+#
+batch_files = frozenset()
+
+#
+# Output generators of system definitions, which are written in addition to
+# the outputs of the instantiated modules
+#
+SYSTEM_GENERATORS = (
+    ('c', 'c_output_dir', '_map.h', 'code_gen.system', 'CSystemMapGenerator', ()),
+    ('vhdl', 'vhdl_output_dir', '_map_pkg.vhd', 'code_gen.system', 'VhdlSystemPackageGenerator', ('read_latency',)),
+    ('vhdl', 'vhdl_output_dir', '_decoder.vhd', 'code_gen.system', 'VhdlSystemDecoderGenerator', ('read_latency',)),
+)
+
 # ------------------------------------------------------------------------------
-# The main() function
+# Function definitions
 #
-if __name__ == "__main__":
 
-    class writable_dir(argparse.Action):
-        #Class checking if provided directory path is actually writable
-        def __call__(self, parser, namespace, values, option_string=None):
-            prospective_dir=values
-            if not os.path.isdir(prospective_dir):
-                raise argparse.ArgumentError(self, "writable_dir:{0} is not a valid path".format(prospective_dir))
-            if os.access(prospective_dir, os.W_OK):
-                setattr(namespace,self.dest,prospective_dir)
-            else:
-                raise argparse.ArgumentError(self, "writable_dir:{0} is not a writable dir".format(prospective_dir))
-    
+class writable_dir(argparse.Action):
+    #Class checking if provided directory path is actually writable
+    def __call__(self, parser, namespace, values, option_string=None):
+        prospective_dir=values
+        if not os.path.isdir(prospective_dir):
+            raise argparse.ArgumentError(self, "writable_dir:{0} is not a valid path".format(prospective_dir))
+        if os.access(prospective_dir, os.W_OK):
+            setattr(namespace,self.dest,prospective_dir)
+        else:
+            raise argparse.ArgumentError(self, "writable_dir:{0} is not a writable dir".format(prospective_dir))
+
+#
+# Expands the command line inputs into a list of register definition files:
+# directories contribute all their *.json files, manifests list one file per
+# line (relative to the manifest's directory, '#' starts a comment).
+#
+def collect_spec_files(inputs, manifests):
+    spec_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            spec_files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.json'))
+        else:
+            spec_files.append(path)
+    for manifest in manifests:
+        manifest_dir = os.path.dirname(manifest)
+        with open(manifest) as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if len(line) > 0:
+                    spec_files.append(os.path.join(manifest_dir, line))
+    return spec_files
+
+#
+# Returns one error message per non-ascii character in a file's content. The
+# content is scanned in bulk, line and column are only computed for bad bytes.
+#
+def find_non_ascii(content):
+    errors = []
+    for match in NON_ASCII_PATTERN.finditer(content):
+        position = match.start()
+        line_number = content.count('\n', 0, position) + 1
+        column = position - content.rfind('\n', 0, position)
+        errors.append("Error in line %d, column %d: detected non-ascii character '%c'" % (line_number, column, match.group()))
+    return errors
+
+#
+# Returns the content of a register definition file; '-' is standard input.
+# The file is read exactly once, so that pipes work as well.
+#
+def read_spec(filename):
+    if filename == '-':
+        return sys.stdin.read()
+    with open(filename, 'rb') as f:
+        return f.read()
+
+#
+# Returns the options which influence the content of the generated files
+#
+def output_options(options):
+    output_option_names = set(generator[0] for generator in GENERATORS)
+    for generator in GENERATORS:
+        output_option_names.update(generator[0] + '_' + name for name in generator[5])
+    return dict((key, value) for key, value in options.items() if key in output_option_names)
+
+#
+# Generates the requested outputs for one register definition file. Returns
+# the list of error messages, which is empty on success, whether the outputs
+# were restored from the cache and the profile of the run (if requested).
+#
+def process_spec(job):
+    filename, content, options = job
+    errors = []
+    profiler = Profiler(filename)
+    restore_methods = []
+    if options['profile']:
+        restore_methods.append(profiler.instrument(Module, 'elaborate', 'Module.elaborate'))
+        restore_methods.append(profiler.instrument(Module, 'check', 'Module.check'))
+        restore_methods.append(profiler.instrument(Register, 'elaborate', 'Register.elaborate'))
+    try:
+        with profiler.stage('read'):
+            if content == None:
+                content = read_spec(filename)
+
+        # Restore the outputs from the cache if the definition is unchanged
+        cache = None
+        if options['cache_dir'] != None:
+            from cache import OutputCache
+            with profiler.stage('cache lookup'):
+                cache = OutputCache(options['cache_dir'], options['cache_size'])
+                cache_key = cache.key(content, output_options(options))
+                cache_hit = cache.restore(cache_key, options)
+            if cache_hit:
+                return errors, True, profile_result(profiler, options)
+
+        # Check for non-ascii characters in JSON file, as these are not supported yet
+        with profiler.stage('parse'):
+            errors = find_non_ascii(content)
+        if len(errors) > 0:
+            return errors, False, profile_result(profiler, options)
+
+        try:
+            # Load JSON file
+            with profiler.stage('parse'):
+                json_data = json.loads(content)
+            if isinstance(json_data, dict) and 'instances' in json_data:
+                # The outputs of a system also depend on its module files,
+                # so they are not cached
+                process_system(filename, json_data, options, profiler)
+                return errors, False, profile_result(profiler, options)
+            with profiler.stage('Module'):
+                module = Module(json_data, verbose=options['verbose'])
+            report_module(module, options)
+               
+            # Write the requested outputs
+            outputs = write_outputs(module, GENERATORS, options, profiler)
+
+            if cache != None:
+                with profiler.stage('cache store'):
+                    cache.store(cache_key, outputs)
+
+            profiler.count('registers', len(module.registers))
+            profiler.count('fields', sum(len(r.fields) for r in module.registers))
+            profiler.count('allocated addresses', module.num_allocated_addresses)
+            profiler.count('allocated fields', module.num_allocated_fields)
+
+        except ValueError as ex:
+            errors.append("Error in JSON file: " + str(ex))
+
+        except RegisterError as ex:
+            errors.append("Error in register " + str(ex))
+        
+        except FieldError as ex:
+            errors.append("Error in field " + str(ex))
+        
+        except ModuleError as ex:
+            errors.append("Error in module " + str(ex))
+
+        except SystemSpecError as ex:
+            errors.append("Error in system " + str(ex))
+    finally:
+        for restore in restore_methods:
+            restore()
+    return errors, False, profile_result(profiler, options)
+
+#
+# Reports the address aliasing and read latency of a module's VHDL component
+# in verbose mode
+#
+def report_module(module, options):
+    if options['verbose'] and options['vhdl'] and options['vhdl_decode'] != 'full':
+        for line in module.aliasing_report(options['vhdl_upper_generic']):
+            print "%s: address decoding: %s" % (module.name, line)
+    if options['verbose'] and options['vhdl'] and module.has_memories() and options['vhdl_read_latency'] == 0:
+        print "%s: VHDL read latency 1, as memories are read synchronously" % module.name
+
+#
+# Writes the requested outputs of a module or system. Returns the (output
+# directory option, file name) tuples of the written files.
+#
+def write_outputs(element, generators, options, profiler):
+    outputs = []
+    for output_option, output_dir_option, suffix, generator_module, generator_class, generator_options in generators:
+        if options[output_option]:
+            with profiler.stage('import generators'):
+                generator_type = getattr(importlib.import_module(generator_module), generator_class)
+            output_filename = options[output_dir_option] + '/' + element.name + suffix
+            # the code is generated while it is written, hence one stage
+            # times the generation and the writing
+            with profiler.stage(generator_class):
+                kwargs = dict((name, options[output_option + '_' + name]) for name in generator_options)
+                generator = generator_type(element, **kwargs)
+                written = generator.save(output_filename)
+            outputs += [(output_dir_option, filename) for filename in written]
+            profiler.count('bytes ' + os.path.basename(output_filename), sum(os.path.getsize(filename) for filename in written))
+    return outputs
+
+#
+# Generates the outputs of a system definition: the outputs of every distinct
+# instantiated module, which is loaded only once, and the system's address map.
+# Module files are referenced relative to the system definition file. The
+# outputs of module files which are part of the batch themselves are left to
+# their own job, so that they are cached and not written twice at once.
+#
+def process_system(filename, json_system, options, profiler):
+    if filename == '-':
+        directory = '.'
+    else:
+        directory = os.path.dirname(filename)
+    module_files = []  # (path, module) of the loaded module files
+    #
+    def load_module(path):
+        with profiler.stage('read'):
+            content = read_spec(path)
+        with profiler.stage('parse'):
+            errors = find_non_ascii(content)
+            if len(errors) > 0:
+                raise ValueError(errors[0])
+            json_module = json.loads(content)
+        with profiler.stage('Module'):
+            module = Module(json_module, verbose=options['verbose'])
+        module_files.append((path, module))
+        return module
+    #
+    with profiler.stage('System'):
+        system = System(json_system, load_module, directory)
+    for path, module in module_files:
+        if path not in batch_files:
+            report_module(module, options)
+            write_outputs(module, GENERATORS, options, profiler)
+    write_outputs(system, SYSTEM_GENERATORS, options, profiler)
+    profiler.count('instances', len(system.instances))
+    profiler.count('modules', len(system.modules()))
+    profiler.count('registers', sum(len(module.registers) for module in system.modules()))
+
+#
+# Sets the register definition files of the batch (in every worker process)
+#
+def set_batch_files(files):
+    global batch_files
+    batch_files = files
+
+#
+# Runs process_spec() for one register definition file. Unexpected exceptions
+# are reported as errors of the file, so that they do not abort a batch.
+#
+def process_spec_safely(job):
+    try:
+        return process_spec(job)
+    except Exception as ex:
+        message = traceback.format_exception_only(type(ex), ex)[-1].strip()
+        return ["Error while processing the file: " + message], False, None
+
+#
+# Returns the profiler if profiling is enabled, None otherwise
+#
+def profile_result(profiler, options):
+    if options['profile']:
+        return profiler
+    return None
+
+# ------------------------------------------------------------------------------
+# The -decode mode: decodes a binary register dump into one column per
+# bus-readable field (see dump_decoder.py); 'argv' are the arguments following
+# -decode
+#
+def decode_main(argv):
+    parser = argparse.ArgumentParser(prog='hdlregs.py -decode', formatter_class=argparse.RawTextHelpFormatter,
+                                     description=
+'''
+Decodes a register dump, i.e. a sequence of snapshots of a module's address window from
+BASEADDR to HIGHADDR as little-endian 32-bit words, into one column per bus-readable field.
+The columns are written to a NumPy .npz archive or a CSV file. Requires NumPy.
+''')
+    parser.add_argument('register_definition_file',
+                        help='register definition file in JSON format; \'-\' reads from standard input')
+    parser.add_argument('dump_file',
+                        help='binary register dump')
+    parser.add_argument('-output', required=True,
+                        help='output file')
+    parser.add_argument('-format', choices=('npz', 'csv'),
+                        help='output format (default: the extension of the output file, or npz)')
+    parser.add_argument('-chunk_size', type=int, default=32,
+                        help='MB of the dump decoded at a time (default: 32)')
+    parser.add_argument('-verbose', action='store_true',
+                        help='reports the number of decoded samples and columns')
+    arguments = parser.parse_args(argv)
+    if arguments.chunk_size < 1:
+        parser.error('the chunk size must be at least 1 MB')
+    filename = arguments.register_definition_file
+    if filename != '-' and not os.path.exists(filename):
+        parser.error("can't open '%s'" % filename)
+    if not os.path.exists(arguments.dump_file):
+        parser.error("can't open '%s'" % arguments.dump_file)
+
+    from dump_decoder import DumpError, decode_dump, dump_columns
+    try:
+        content = read_spec(filename)
+    except (IOError, OSError) as ex:
+        parser.error("can't read '%s': %s" % (filename, ex))
+    errors = find_non_ascii(content)
+    if len(errors) == 0:
+        try:
+            module = Module(json.loads(content))
+            num_samples = decode_dump(module, arguments.dump_file, arguments.output, arguments.format, arguments.chunk_size * 1024 * 1024)
+            if arguments.verbose:
+                print "%s: decoded %d samples into %d columns" % (module.name, num_samples, len(dump_columns(module)))
+        except ValueError as ex:
+            errors.append("Error in JSON file: " + str(ex))
+        except RegisterError as ex:
+            errors.append("Error in register " + str(ex))
+        except FieldError as ex:
+            errors.append("Error in field " + str(ex))
+        except ModuleError as ex:
+            errors.append("Error in module " + str(ex))
+        except DumpError as ex:
+            errors.append("Error in register dump: " + str(ex))
+        except (IOError, OSError) as ex:
+            errors.append("Error while decoding the register dump: " + str(ex))
+    for error in errors:
+        print error
+    if len(errors) > 0:
+        sys.exit(-1)
+
+# ------------------------------------------------------------------------------
+# The main() function
+#
+def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
                                      description=
 '''
@@ -65,69 +395,169 @@ It takes a register specification in JSON format and generates the following out
  * VHDL package
  * Synthesizable VHDL component
  * C header
- * HTML documentation.
+ * HTML documentation
+ * Python register access module (optional).
+
+A system specification instantiates register specifications at base addresses; it additionally
+generates a C address map header, a VHDL address map package and a VHDL address decoder.
+
+Register dumps are decoded with: hdlregs.py -decode -h
 ''')
-    parser.add_argument('register_definition_file', type=file, 
-                        help='register definition file in JSON format')
+    parser.add_argument('register_definition_file', nargs='*',
+                        help='register definition file(s) in JSON format, or directories containing them;\n\'-\' reads from standard input')
+    parser.add_argument('-manifest', action='append', default=[],
+                        help='file listing register definition files, one per line')
+    parser.add_argument('-jobs', type=int,
+                        help='number of register definition files processed in parallel\n(default: number of CPUs)')
     parser.add_argument('-novhdl', action='store_false',
                         help='prevents VHDL output generation')
     parser.add_argument('-vhdl_output_dir', action=writable_dir, default='.',
                         help='path to the VHDL output directory')
+    parser.add_argument('-vhdl_decode', choices=('full', 'slice', 'case'), default='full',
+                        help='address decoder of the VHDL component: \'full\' compares all address bits\n(default), \'slice\' compares only the bits which differ between the registers,\n\'case\' multiplexes on these bits')
+    parser.add_argument('-vhdl_upper_generic', action='store_true',
+                        help='adds an UPPER_ADDR_DECODED generic to partially decoding VHDL components;\nunless it is true, the address bits above the decoded ones are compared as well')
+    parser.add_argument('-vhdl_read_latency', type=int, choices=(0, 1, 2), default=0,
+                        help='clock cycles from a read access until the VHDL component\'s dataout is valid:\n0 (default) is combinational, 1 registers the read multiplexer, 2 also the address')
+    parser.add_argument('-vhdl_byte_enables', action='store_true',
+                        help='adds a byte enable port to the VHDL component, which restricts bus writes\nto the enabled byte lanes')
     parser.add_argument('-noc', action='store_false',
                         help='prevents C output generation')
     parser.add_argument('-c_output_dir', action=writable_dir, default='.',
                         help='path to the C output directory')
+    parser.add_argument('-c_accessors', action='store_true',
+                        help='adds static inline get/set/insert functions per field and <REG>_PACK()\nmacros combining several fields to the C header')
+    parser.add_argument('-c_shadow', action='store_true',
+                        help='adds a shadow register cache to the C header, which writes back only\nthe registers whose fields were updated')
+    parser.add_argument('-python', action='store_true',
+                        help='generates a Python module accessing the registers through mmap')
+    parser.add_argument('-python_output_dir', action=writable_dir, default='.',
+                        help='path to the Python output directory')
     parser.add_argument('-nohtml', action='store_false',
                         help='prevents html output generation')
     parser.add_argument('-html_output_dir', action=writable_dir, default='.',
                         help='path to the HTML output directory')
+    parser.add_argument('-html_split', type=int, default=0, metavar='N',
+                        help='describes the registers on pages of N registers each, which the HTML document\nloads on demand, and adds a search index (default: 0, a single page)')
+    parser.add_argument('-verbose', action='store_true',
+                        help='reports automatically allocated register fields and the address aliasing\nof partially decoding VHDL components')
+    parser.add_argument('-cache_dir',
+                        help='directory caching the outputs of unchanged register definition files')
+    parser.add_argument('-cache_size', type=int, default=256,
+                        help='maximum size of the cache directory in MB (default: 256)')
+    parser.add_argument('-cache_stats', action='store_true',
+                        help='reports cache hits, misses and usage')
+    parser.add_argument('--profile', nargs='?', const='text', choices=('text', 'json'),
+                        help='reports per-stage timings and counters as text (default) or JSON;\nregister definition files are then processed one after the other')
+    parser.add_argument('-profile_output',
+                        help='file receiving the profile report (default: standard output)')
+    parser.add_argument('-cprofile_output',
+                        help='file receiving a cProfile dump of the run')
+    parser.add_argument('-decode', nargs=argparse.REMAINDER, metavar='ARGUMENT',
+                        help='decodes a register dump; all following arguments are passed on to the\ndecoder (see hdlregs.py -decode -h)')
     parser.add_argument('--version', action='version', version=constants.HDLREGS_VERSION)    
     arguments = parser.parse_args()
+    if arguments.decode != None:
+        decode_main(arguments.decode)
+        return
 
-    # Check for non-ascii characters in JSON file, as these are not supported yet
-    num_ascii_errors = 0
-    line_number = 1
-    for line in arguments.register_definition_file:
-        for char in line:
-            if ord(char) > 127:
-                print "Error in line %d: detected non-ascii character '%c'" % (line_number, char)
-                num_ascii_errors += 1
-        line_number += 1
-    if num_ascii_errors > 0:
-        sys.exit(-1)
-
-    arguments.register_definition_file.seek(0)
     try:
-        # Load JSON file
-        json_data = json.load(arguments.register_definition_file)
-        module = Module(json_data)
-           
-        # Write HTML output
-        if arguments.nohtml:
-            g = code_gen.html.HtmlGenerator(module)
-            g.save(arguments.html_output_dir + '/' + module.name + '_regs.html')
-
-        # Write C header
-        if arguments.noc:
-            g = code_gen.c.CHeaderGenerator(module)
-            g.save(arguments.c_output_dir + '/' + module.name + '_regs.h')
-
-        # Write VHDL output
-        if arguments.novhdl:
-            # Write VHDL package
-            g = code_gen.vhdl.VhdlPackageGenerator(module)
-            g.save(arguments.vhdl_output_dir + '/' + module.name + '_regs_pkg.vhd')
-
-            # Write VHDL component
-            g = code_gen.vhdl.VhdlComponentGenerator(module)
-            g.save(arguments.vhdl_output_dir + '/' + module.name + '_regs.vhd')
-                            
-    except RegisterError as ex:
-        print "Error in register " + str(ex)
-    
-    except FieldError as ex:
-        print "Error in field " + str(ex)
-    
-    except ModuleError as ex:
-        print "Error in module " + str(ex)        
+        spec_files = collect_spec_files(arguments.register_definition_file, arguments.manifest)
+    except IOError as ex:
+        parser.error(str(ex))
+    if len(spec_files) == 0:
+        parser.error('no register definition file given')
+    if arguments.jobs != None and arguments.jobs < 0:
+        parser.error('-jobs must not be negative')
+    if arguments.html_split < 0:
+        parser.error('-html_split must not be negative')
+    for filename in spec_files:
+        if filename != '-' and not os.path.exists(filename):
+            parser.error("can't open '%s'" % filename)
 
+    options = dict(vhdl=arguments.novhdl,
+                   vhdl_output_dir=arguments.vhdl_output_dir,
+                   vhdl_decode=arguments.vhdl_decode,
+                   vhdl_read_latency=arguments.vhdl_read_latency,
+                   vhdl_upper_generic=arguments.vhdl_upper_generic,
+                   vhdl_byte_enables=arguments.vhdl_byte_enables,
+                   c=arguments.noc,
+                   c_output_dir=arguments.c_output_dir,
+                   c_accessors=arguments.c_accessors,
+                   c_shadow=arguments.c_shadow,
+                   python=arguments.python,
+                   python_output_dir=arguments.python_output_dir,
+                   html=arguments.nohtml,
+                   html_output_dir=arguments.html_output_dir,
+                   html_split=arguments.html_split,
+                   verbose=arguments.verbose,
+                   cache_dir=arguments.cache_dir,
+                   cache_size=arguments.cache_size * 1024 * 1024,
+                   profile=arguments.profile != None)
+    # standard input is read here, as the worker processes cannot access it
+    jobs = []
+    for filename in spec_files:
+        if filename == '-':
+            jobs.append((filename, read_spec(filename), options))
+        else:
+            jobs.append((filename, None, options))
+    # profiles are collected in this process, hence the files are processed
+    # one after the other
+    profiling = arguments.profile != None or arguments.cprofile_output != None
+    if arguments.cprofile_output != None:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    files = frozenset(os.path.realpath(filename) for filename in spec_files if filename != '-')
+    if len(jobs) > 1 and arguments.jobs != 1 and not profiling:
+        import multiprocessing  # only needed in batch mode
+        pool = multiprocessing.Pool(min(arguments.jobs or multiprocessing.cpu_count(), len(jobs)), set_batch_files, (files,))
+        results = pool.imap(process_spec_safely, jobs)
+    else:
+        pool = None
+        set_batch_files(files)
+        results = (process_spec_safely(job) for job in jobs)
+
+    # Report errors in the order of the input files
+    num_failed = 0
+    num_cache_hits = 0
+    profiles = []
+    for filename, (errors, cache_hit, profile) in zip(spec_files, results):
+        if profile != None:
+            profiles.append(profile)
+        if len(errors) > 0:
+            num_failed += 1
+        if cache_hit:
+            num_cache_hits += 1
+        for error in errors:
+            if len(spec_files) > 1:
+                print "%s: %s" % (filename, error)
+            else:
+                print error
+    if pool != None:
+        pool.close()
+        pool.join()
+    if arguments.cprofile_output != None:
+        cprofiler.disable()
+        cprofiler.dump_stats(arguments.cprofile_output)
+    if arguments.profile != None:
+        report = format_profiles(profiles, arguments.profile)
+        if arguments.profile_output != None:
+            with open(arguments.profile_output, 'w') as f:
+                f.write(report)
+        else:
+            sys.stdout.write(report)
+    if len(spec_files) > 1:
+        print "%d of %d register definition files processed successfully" % (len(spec_files) - num_failed, len(spec_files))
+    if options['cache_dir'] != None:
+        from cache import OutputCache
+        cache = OutputCache(options['cache_dir'], options['cache_size'])
+        num_evicted = cache.evict()
+        if arguments.cache_stats:
+            num_entries, cache_size = cache.usage()
+            print "cache: %d hits, %d misses, %d evicted; %d entries using %.1f of %d MB" % (num_cache_hits, len(spec_files) - num_cache_hits, num_evicted, num_entries, cache_size / (1024.0 * 1024.0), arguments.cache_size)
+    if num_failed > 0:
+        sys.exit(-1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#
+# Stage timing and counters for profiling HDLRegs runs
+#
+
+import time
+import json
+
+#
+# Collects the wall-clock and CPU time of named stages plus arbitrary counters.
+# Stages may nest; the time of a stage always includes its nested stages.
+#
+class Profiler():
+    #
+    def __init__(self, name):
+        self.name = name
+        self.stages = []     # stage names in order of first use
+        self.wall = {}       # stage name -> accumulated wall-clock time
+        self.cpu = {}        # stage name -> accumulated CPU time
+        self.calls = {}      # stage name -> number of calls
+        self.counters = []   # (name, value) tuples
+    #
+    # Returns a context manager timing a stage
+    def stage(self, name):
+        return ProfilerStage(self, name)
+    #
+    # Adds a measurement for a stage
+    def add(self, name, wall, cpu):
+        if name not in self.calls:
+            self.stages.append(name)
+            self.wall[name] = 0.0
+            self.cpu[name] = 0.0
+            self.calls[name] = 0
+        self.wall[name] += wall
+        self.cpu[name] += cpu
+        self.calls[name] += 1
+    #
+    # Records a counter value
+    def count(self, name, value):
+        self.counters.append((name, value))
+    #
+    # Replaces the method 'method_name' of class 'cls' by a version timed as
+    # stage 'name'. Returns a function restoring the original method.
+    def instrument(self, cls, method_name, name):
+        method = cls.__dict__[method_name]
+        profiler = self
+        def timed(*args, **kwargs):
+            with profiler.stage(name):
+                return method(*args, **kwargs)
+        setattr(cls, method_name, timed)
+        def restore():
+            setattr(cls, method_name, method)
+        return restore
+    #
+    # Returns the profile as a JSON-serializable dictionary
+    def to_dict(self):
+        stages = [dict(name=name, calls=self.calls[name], wall=self.wall[name], cpu=self.cpu[name]) for name in self.stages]
+        return dict(name=self.name, stages=stages, counters=[dict(name=name, value=value) for name, value in self.counters])
+    #
+    # Returns the profile as text
+    def to_text(self):
+        lines = ["Profile of '%s'" % self.name,
+                 "    %-36s %8s %12s %12s" % ("stage", "calls", "wall [s]", "cpu [s]")]
+        for name in self.stages:
+            lines.append("    %-36s %8d %12.4f %12.4f" % (name, self.calls[name], self.wall[name], self.cpu[name]))
+        for name, value in self.counters:
+            lines.append("    %-36s %8d" % (name, value))
+        return "\n".join(lines) + "\n"
+
+#
+# Context manager timing one execution of a stage
+#
+class ProfilerStage():
+    #
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+    #
+    def __enter__(self):
+        self.wall = time.time()
+        self.cpu = time.clock()
+        return self
+    #
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.add(self.name, time.time() - self.wall, time.clock() - self.cpu)
+        return False
+
+#
+# Returns a list of profiles as text or JSON
+#
+def format_profiles(profiles, format):
+    if format == 'json':
+        return json.dumps([p.to_dict() for p in profiles], indent=2) + "\n"
+    return "".join(p.to_text() for p in profiles)
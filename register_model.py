@@ -0,0 +1,295 @@
+#
+# Cycle-based behavioural model of the generated VHDL register file
+#
+# The model is built from an elaborated Module and executes one bus access per
+# clock cycle with the semantics of the VHDL component (code_gen/vhdl.py):
+#
+#  * a bus write updates the bus-writable fields of the addressed register
+#    (within the enabled byte lanes) and asserts the register's strobe towards
+#    the user logic for one cycle
+#  * a bus read returns the bus-readable fields of the addressed register as
+#    they were in the access cycle, as with a read latency of 0 or 1; the other
+#    bits, and the data of unmapped addresses, read as 0
+#  * bus-writable self-clearing/setting fields take their settled value one
+#    cycle after they were written; read-only ones when they are read, unless
+#    the user logic writes them in the same cycle
+#  * read-only fields follow the user logic's value, or are written only
+#    in cycles in which the field's user write strobe is asserted
+#  * registers and fields take their reset values with reset(); registers
+#    without reset value are modelled as 0
+#
+# Addresses are fully decoded. Memories are modelled as lists of words, which
+# the user logic accesses directly through memory().
+#
+
+WORD_MASK = 0xFFFFFFFF
+
+class ModelError(Exception):
+    pass
+
+class RegisterFileModel():
+    #
+    def __init__(self, module):
+        self.module = module
+        self.registers = {}      # name -> (register, first slot)
+        self.slots = {}          # address -> slot of the register (array element)
+        self.values = []         # slot -> register value
+        self.read_masks = []     # slot -> bus-readable bits
+        self.write_masks = []    # slot -> bus-writable bits
+        self.settle_and = []     # slot -> bits kept when self-clearing/setting fields settle
+        self.settle_or = []      # slot -> bits set when self-clearing/setting fields settle
+        self.read_settle = {}    # slot -> (and, or) masks of read-only self-clearing/setting fields
+        self.user_masks = {}     # slot -> bits following the user logic's value
+        self.user_values = {}    # slot -> value of these bits
+        self.reset_values = []   # slot -> reset value
+        for r in module.registers:
+            self.registers[r.name] = (r, len(self.values))
+            read_mask = write_mask = 0
+            settle_and = WORD_MASK
+            settle_or = read_and = read_or = user_mask = 0
+            for f in r.fields:
+                mask = (2 ** f.bitWidth - 1) << f.bitOffset
+                if f.is_bus_readable():
+                    read_mask |= mask
+                if f.is_bus_writable():
+                    write_mask |= mask
+                if f.selfClearSet != None:
+                    if f.is_user_writable():
+                        read_and |= mask
+                        read_or |= mask * f.selfClearSet
+                    else:
+                        settle_and &= ~mask & WORD_MASK
+                        settle_or |= mask * f.selfClearSet
+                if f.is_user_writable() and not f.has_userWriteStrobe():
+                    user_mask |= mask
+            count = r.count if r.is_array() else 1
+            stride = r.stride if r.is_array() else 0
+            for i in range(count):
+                slot = len(self.values)
+                self.slots[r.addressOffset + i * stride] = slot
+                self.values.append(0)
+                self.read_masks.append(read_mask)
+                self.write_masks.append(write_mask)
+                self.settle_and.append(settle_and)
+                self.settle_or.append(settle_or)
+                self.reset_values.append(r.reset() or 0)
+                if read_and != 0:
+                    self.read_settle[slot] = (~read_and & WORD_MASK, read_or)
+                if user_mask != 0:
+                    self.user_masks[slot] = user_mask
+                    self.user_values[slot] = 0
+        self.memories = {}
+        for m in module.memories:
+            self.memories[m.name] = (m, [0] * m.depth)
+        self.reset()
+    #
+    # Resets the register file; memories keep their content
+    def reset(self):
+        self.values[:] = self.reset_values
+        self.strobe_slot = None     # register strobed in the current cycle
+        # self-clearing/setting fields settle in the first cycle after reset,
+        # and read-only fields take the user logic's value
+        self.settle = [slot for slot in range(len(self.values)) if self.settle_and[slot] != WORD_MASK]
+        self.user_writes = [(slot, ~mask & WORD_MASK, self.user_values[slot]) for slot, mask in self.user_masks.items()]
+        self.cycles = 0
+    #
+    # Returns the slot of a register (array element)
+    def slot(self, register, index=None):
+        if register not in self.registers:
+            raise ModelError("no register '%s'" % register)
+        r, slot = self.registers[register]
+        if r.is_array():
+            if index == None or index < 0 or index >= r.count:
+                raise ModelError("register '%s': element index out of range" % register)
+            return slot + index
+        if index != None:
+            raise ModelError("register '%s' is not an array" % register)
+        return slot
+    #
+    # Returns a field of a register (array element)
+    def field(self, register, field, index=None):
+        r, first_slot = self.registers.get(register, (None, None))
+        slot = self.slot(register, index)
+        for f in r.fields:
+            if f.name == field:
+                return f, slot
+        raise ModelError("register '%s' has no field '%s'" % (register, field))
+    #
+    # Returns the value of a register (array element), as seen by the user logic
+    def value(self, register, index=None):
+        return self.values[self.slot(register, index)]
+    #
+    # Returns the value and strobe of a bus-writable field, as in regs2user
+    def regs2user(self, register, field, index=None):
+        f, slot = self.field(register, field, index)
+        if not f.is_bus_writable():
+            raise ModelError("field '%s' of register '%s' is not bus-writable" % (field, register))
+        return (self.values[slot] >> f.bitOffset) & (2 ** f.bitWidth - 1), self.strobe_slot == slot
+    #
+    # Drives a read-only field from the user logic, as through user2regs: the
+    # field takes the value at the end of the next cycle. Fields with a user
+    # write strobe are written once, the others keep following the value.
+    def user_write(self, register, field, value, index=None):
+        f, slot = self.field(register, field, index)
+        if not f.is_user_writable():
+            raise ModelError("field '%s' of register '%s' is not written by the user logic" % (field, register))
+        mask = (2 ** f.bitWidth - 1) << f.bitOffset
+        bits = (value << f.bitOffset) & mask
+        if not f.has_userWriteStrobe():
+            self.user_values[slot] = (self.user_values[slot] & ~mask) | bits
+        self.user_writes.append((slot, ~mask & WORD_MASK, bits))
+    #
+    # Returns the words of a memory, which the user logic reads and writes
+    def memory(self, name):
+        if name not in self.memories:
+            raise ModelError("no memory '%s'" % name)
+        return self.memories[name][1]
+    #
+    # Executes one bus access cycle: a read if 'data' is None, a write otherwise.
+    # Returns the read data, or None for writes and idle cycles.
+    def cycle(self, address=None, data=None, be=0xF):
+        values = self.values
+        slot = self.slots.get(address)
+        read_data = None
+        if address != None and data == None:
+            # the read multiplexer samples the register before the clock edge
+            if slot != None:
+                read_data = values[slot] & self.read_masks[slot]
+            else:
+                read_data = self.memory_access(address, None, be)
+        # clock edge
+        self.cycles += 1
+        self.strobe_slot = None
+        if len(self.settle) > 0:
+            for s in self.settle:
+                values[s] = (values[s] & self.settle_and[s]) | self.settle_or[s]
+            self.settle = []
+        if slot != None:
+            if data == None:
+                if slot in self.read_settle:
+                    self.settle_on_read(slot)
+            elif self.write_masks[slot] != 0:
+                mask = self.write_masks[slot]
+                if be != 0xF:
+                    mask &= lane_mask(be)
+                values[slot] = (values[slot] & ~mask) | (data & mask)
+                self.strobe_slot = slot
+                if self.settle_and[slot] != WORD_MASK:
+                    self.settle.append(slot)
+        elif address != None and data != None:
+            self.memory_access(address, data, be)
+        if len(self.user_writes) > 0:
+            for s, keep, bits in self.user_writes:
+                values[s] = (values[s] & keep) | bits
+            self.user_writes = []
+        return read_data
+    #
+    # Read-only self-clearing/setting fields settle when they are read, except
+    # for the bits which follow the user logic's value
+    def settle_on_read(self, slot):
+        keep, bits = self.read_settle[slot]
+        value = (self.values[slot] & keep) | bits
+        if slot in self.user_masks:
+            value = (value & ~self.user_masks[slot]) | self.user_values[slot]
+        self.values[slot] = value
+    #
+    # Reads or writes a memory word; returns the read data (0 if the address
+    # is unmapped)
+    def memory_access(self, address, data, be):
+        for m, words in self.memories.values():
+            if m.addressOffset <= address < m.addressOffset + m.address_span():
+                index = (address - m.addressOffset) >> 2
+                if index >= m.depth:
+                    break
+                word_mask = 2 ** m.width - 1
+                if data == None:
+                    if m.is_bus_readable():
+                        return words[index]
+                elif m.is_bus_writable():
+                    mask = word_mask & lane_mask(be)
+                    words[index] = (words[index] & ~mask) | (data & mask)
+                break
+        return 0
+    #
+    # Bus write cycle
+    def write(self, address, data, be=0xF):
+        self.cycle(address, data & WORD_MASK, be)
+    #
+    # Bus read cycle
+    def read(self, address):
+        return self.cycle(address)
+    #
+    # Cycles without bus access
+    def idle(self, cycles=1):
+        for i in range(cycles):
+            self.cycle()
+    #
+    # Executes a batch of bus accesses, one per cycle: a sequence of (address,
+    # data) pairs, with data None for reads. Returns the list of read data, in
+    # the order of the reads. Equivalent to calling cycle() for each access,
+    # but the common case of register accesses is executed inline.
+    def run(self, transactions):
+        results = []
+        append = results.append
+        transactions = iter(transactions)
+        if len(self.user_writes) > 0 or len(self.settle) > 1:
+            # pending user writes and the settling after reset are applied
+            # by the first cycle
+            for address, data in transactions:
+                read_data = self.cycle(address, data)
+                if data == None:
+                    append(read_data)
+                break
+            if len(self.user_writes) > 0 or len(self.settle) > 1:
+                return results  # empty batch: the updates stay pending
+        values = self.values
+        slots = self.slots
+        read_masks = self.read_masks
+        write_masks = self.write_masks
+        settle_and = self.settle_and
+        settle_or = self.settle_or
+        read_settle = self.read_settle
+        settle = self.settle[0] if len(self.settle) > 0 else None
+        strobe_slot = self.strobe_slot
+        cycles = 0
+        try:
+            for address, data in transactions:
+                cycles += 1
+                slot = slots.get(address)
+                if data is None:
+                    if slot is not None:
+                        append(values[slot] & read_masks[slot])
+                    else:
+                        append(self.memory_access(address, None, 0xF))
+                strobe_slot = None
+                if settle is not None:
+                    values[settle] = (values[settle] & settle_and[settle]) | settle_or[settle]
+                    settle = None
+                if slot is None:
+                    if data is not None:
+                        self.memory_access(address, data, 0xF)
+                elif data is None:
+                    if slot in read_settle:
+                        self.settle_on_read(slot)
+                else:
+                    mask = write_masks[slot]
+                    if mask != 0:
+                        values[slot] = (values[slot] & ~mask) | (data & mask)
+                        strobe_slot = slot
+                        if settle_and[slot] != WORD_MASK:
+                            settle = slot
+        finally:
+            self.cycles += cycles
+            self.strobe_slot = strobe_slot
+            self.settle = [settle] if settle is not None else []
+        return results
+
+#
+# Returns the bit mask of the enabled byte lanes
+#
+def lane_mask(be):
+    mask = 0
+    for lane in range(4):
+        if be & (1 << lane):
+            mask |= 0xFF << (8 * lane)
+    return mask
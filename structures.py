@@ -1,10 +1,11 @@
 #
-# Register file elements: Module, Register and Field classes
+# Register file elements: System, Module, Register and Field classes
 #
 
 import re
 import os
 import json
+import bisect
 import code_gen.constants as constants
 
 # ------------------------------------------------------------------------------
@@ -25,6 +26,10 @@ class ModuleError(Exception):
     def __init__(self, module, message):
         Exception.__init__(self, "'%s': %s" % (module.name, message))
 
+class SystemSpecError(Exception):
+    def __init__(self, system, message):
+        Exception.__init__(self, "'%s': %s" % (system.name, message))
+
 # ------------------------------------------------------------------------------
 # Function definitions
 #
@@ -59,15 +64,136 @@ def is_valid_identifier(str):
     else:
         return False        
         
+#
+# Returns an integer with the 'width' lowest bits set
+#
+def bit_mask(width):
+    return (1 << width) - 1
+
+#
+# Returns the lowest bit position at which 'free' (a bit mask of available bits)
+# has 'width' consecutive set bits, or None if there is no such position.
+# After the loop, bit i of 'runs' is set iff bits i..i+width-1 of 'free' are
+# all set; the run length doubles in every iteration.
+#
+def lowest_free_run(free, width):
+    runs = free
+    run_length = 1
+    while run_length < width and runs != 0:
+        shift = min(run_length, width - run_length)
+        runs &= runs >> shift
+        run_length += shift
+    if runs == 0:
+        return None
+    return (runs & -runs).bit_length() - 1
+
+#
+# First-fit allocator for register address offsets: hands out the lowest free
+# block of multiples of 'step'. The occupied slots are kept as a sorted list of
+# disjoint intervals, so that a register array takes the same time and memory
+# as a single register, whatever its length. Addresses are never released and
+# adjacent intervals are merged, hence the slots below the lowest free one
+# always form the first interval and single slots are found immediately.
+#
+class AddressAllocator():
+    #
+    def __init__(self, step):
+        self.step = step
+        self._starts = []  # first slot of every occupied interval, in ascending order
+        self._ends = []    # slot after the last one of every occupied interval
+    #
+    # Marks 'size' bytes from an address offset on as used. Slots that are not
+    # candidates (i.e. negative or unaligned single offsets) never collide with
+    # an allocation and are ignored; blocks cover all slots they touch.
+    def reserve(self, offset, size=None):
+        if size == None:
+            if offset >= 0 and offset % self.step == 0:
+                self._reserve_slots(offset // self.step, offset // self.step + 1)
+        else:
+            self._reserve_slots(max(offset, 0) // self.step, -(-(offset + size) // self.step))
+    #
+    # Returns True if no slot touched by 'size' bytes from an address offset on is used
+    def is_free(self, offset, size):
+        first = offset // self.step
+        last = -(-(offset + size) // self.step)
+        i = bisect.bisect_right(self._ends, first)
+        return i == len(self._starts) or self._starts[i] >= last
+    #
+    # Returns the lowest address offset of 'size' free bytes and marks them as used.
+    # The offset is a multiple of 'align' bytes (a multiple of 'step'), if given.
+    def allocate(self, size=None, align=None):
+        num_slots = 1 if size == None else -(-size // self.step)
+        align_slots = 1 if align == None else align // self.step
+        candidate = 0
+        for i in xrange(len(self._starts)):
+            if self._starts[i] - candidate >= num_slots:
+                break
+            candidate = max(candidate, -(-self._ends[i] // align_slots) * align_slots)
+        self._reserve_slots(candidate, candidate + num_slots)
+        return candidate * self.step
+    #
+    # Marks the slots first..last-1 as used, merging touching intervals
+    def _reserve_slots(self, first, last):
+        i = bisect.bisect_left(self._ends, first)
+        j = bisect.bisect_right(self._starts, last)
+        if i < j:
+            first = min(first, self._starts[i])
+            last = max(last, self._ends[j - 1])
+        self._starts[i:j] = [first]
+        self._ends[i:j] = [last]
+
+#
+# Index of disjoint address intervals: the intervals are sorted by their lowest
+# address once, after which overlaps are found in a single sweep and the
+# interval containing an address by binary search.
+#
+class AddressMap():
+    #
+    # 'intervals' is a list of (low address, high address, item) tuples; the
+    # high address is the last address of the interval
+    def __init__(self, intervals):
+        intervals = sorted(intervals, key=lambda interval: interval[0])
+        self._lows = [interval[0] for interval in intervals]
+        self._highs = [interval[1] for interval in intervals]
+        self._items = [interval[2] for interval in intervals]
+    #
+    # Returns the first pair of items whose intervals overlap, or None
+    def first_overlap(self):
+        highest = None  # index of the interval reaching highest so far
+        for i in xrange(len(self._lows)):
+            if highest != None and self._lows[i] <= self._highs[highest]:
+                return self._items[highest], self._items[i]
+            if highest == None or self._highs[i] > self._highs[highest]:
+                highest = i
+        return None
+    #
+    # Returns the item whose interval contains an address, or None
+    def find(self, address):
+        i = bisect.bisect_right(self._lows, address) - 1
+        if i >= 0 and address <= self._highs[i]:
+            return self._items[i]
+        return None
+    #
+    # Returns the (low address, high address, item) tuples in address order
+    def intervals(self):
+        return zip(self._lows, self._highs, self._items)
+
 # A module definition
 class Module():
     SUPPORTED_WIDTHS = (32,)  # supported bus widths
     MANDATORY_ELEMENTS = ("name", "description", "width", "registers")
+    OPTIONAL_ELEMENTS = ("memories",)
     #
     # Module constructor    
-    def __init__(self, json_module):
+    def __init__(self, json_module, verbose=False):
         # default values:
         self.name = ""        
+        self.verbose = verbose  # report automatically allocated fields
+        self.num_allocated_addresses = 0  # number of automatically allocated register addresses
+        self.num_allocated_fields = 0     # number of automatically allocated field offsets
+        self._strings = {}  # table of interned strings, shared by all registers and fields
+        self.memories = []
+        json_memories = []
         for key in json_module.keys():
             if key == "name":
                 self.name = json_module[key]
@@ -79,6 +205,8 @@ class Module():
                 self.width = int(json_module[key])                
             elif key == "registers":
                 self.registers = [Register(json_reg, parent_module=self) for json_reg in json_module[key]]
+            elif key == "memories":
+                json_memories = json_module[key]
         # check for missing mandatory elements
         for e in self.MANDATORY_ELEMENTS:
             if not hasattr(self, e):
@@ -86,8 +214,10 @@ class Module():
                 raise ModuleError(self, "missing '%s' element" % e)            
         # check for unsupported elements
         for key in json_module.keys():
-            if key not in self.MANDATORY_ELEMENTS:
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
                 raise ModuleError(self, "unsupported element '%s'" % key)
+        # memories report their errors with the module name, hence they are created last
+        self.memories = [Memory(json_mem, parent_module=self) for json_mem in json_memories]
         # check for unsupported width
         if self.width not in self.SUPPORTED_WIDTHS:
             str_supported_widths = ["'%s'" % str(w) for w in SUPPORTED_WIDTHS]
@@ -96,9 +226,37 @@ class Module():
         # elaborate & check
         self.elaborate()   
         self.check()                 #
+    # Returns True if the module has at least one register array
+    def has_arrays(self):
+        for r in self.registers:
+            if r.is_array():
+                return True
+        return False
+    #
+    # Returns True if the module has at least one memory
+    def has_memories(self):
+        return len(self.memories) > 0
+    #
     # Check a module
     def check(self):
-        pass
+        for r in self.registers:
+            if r.is_array() and r.addressOffset + r.address_span() > 2 ** self.width:
+                raise ModuleError(self, "register array '%s' exceeds the address space" % r.name)
+        names = set(r.name for r in self.registers)
+        for m in self.memories:
+            m.check()
+            if m.name in names:
+                raise ModuleError(self, "memory '%s' has the same name as another register or memory" % m.name)
+            names.add(m.name)
+            if m.addressOffset % m.address_span() != 0:
+                raise ModuleError(self, "memory '%s' must be aligned to its size (0x%X bytes)" % (m.name, m.address_span()))
+            if m.addressOffset + m.address_span() > 2 ** self.width:
+                raise ModuleError(self, "memory '%s' exceeds the address space" % m.name)
+    #
+    # Returns a shared copy of a string, so that names, descriptions and access
+    # modes repeated across registers and fields are only stored once
+    def intern(self, string):
+        return self._strings.setdefault(string, string)
     #
     # Elaborate a module, i.e. compute values for all undefined parameters such
     # as register addresses, bit field offsets etc.
@@ -121,23 +279,74 @@ class Module():
                 raise(ModuleError(self, "registers [%s] have the same addressOffset" % conflicting_regs))
         #
         # Allocate register addresses
+        allocator = AddressAllocator(4)
+        for reg in self.registers:
+            if reg.addressOffset != None and not reg.is_array():
+                allocator.reserve(reg.addressOffset)
+        # register arrays occupy the whole address range of their elements
+        for reg in self.registers:
+            if reg.addressOffset != None and reg.is_array():
+                if not allocator.is_free(reg.addressOffset, reg.address_span()):
+                    raise ModuleError(self, "register array '%s' overlaps another register" % reg.name)
+                allocator.reserve(reg.addressOffset, reg.address_span())
+        for m in self.memories:
+            if m.addressOffset != None:
+                if not allocator.is_free(m.addressOffset, m.address_span()):
+                    raise ModuleError(self, "memory '%s' overlaps another register or memory" % m.name)
+                allocator.reserve(m.addressOffset, m.address_span())
         for r1 in self.registers:
             if r1.addressOffset == None:
-                # Register has not been assigned an address offset -> compute the 
-                # next available one
-                candidate_addressOffset = 0x0
-                while(True):
-                    success = True
-                    for r2 in self.registers:
-                        if r2.addressOffset == candidate_addressOffset:
-                            candidate_addressOffset += 4
-                            success = False
-                            break
-                    if success:
-                        break
-                # print "elaboration: allocated address 0x%.8X for register %s" % (candidate_addressOffset, r1.name)
-                r1.addressOffset = candidate_addressOffset
+                # Register has not been assigned an address offset -> take the 
+                # lowest available one
+                if r1.is_array():
+                    r1.addressOffset = allocator.allocate(r1.address_span())
+                else:
+                    r1.addressOffset = allocator.allocate()
+                self.num_allocated_addresses += 1
+                # print "elaboration: allocated address 0x%.8X for register %s" % (r1.addressOffset, r1.name)
             r1.elaborate()
+        # memories are aligned to their size, so that the word index is a slice of the address
+        for m in self.memories:
+            m.elaborate()
+            if m.addressOffset == None:
+                m.addressOffset = allocator.allocate(m.address_span(), m.address_span())
+                self.num_allocated_addresses += 1
+    #
+    # Returns the highest and the lowest address bit which differ between the
+    # module's registers. The other address bits are the same for all registers
+    # (array elements and memory words included), hence the bits in between
+    # tell them apart.
+    def decoded_address_bits(self):
+        first = self.registers[0].addressOffset
+        differing = 0
+        for r in self.registers:
+            differing |= r.addressOffset ^ first
+            if r.is_array() and r.count > 1:
+                span = r.addressOffset ^ r.last_address()
+                differing |= (1 << span.bit_length()) - r.stride
+        for m in self.memories:
+            differing |= m.addressOffset ^ first
+            differing |= m.address_span() - self.width // 8
+        if differing == 0:
+            return 2, 2
+        return differing.bit_length() - 1, (differing & -differing).bit_length() - 1
+    #
+    # Returns a description of the address aliasing of a register file which
+    # only decodes the bits returned by decoded_address_bits(), as a list of
+    # lines. 'upper_decoded' tells whether the bits above are compared as well.
+    def aliasing_report(self, upper_decoded=False):
+        high, low = self.decoded_address_bits()
+        lines = ["address bits %d..%d tell the registers apart" % (high, low)]
+        if high < self.width - 1:
+            if upper_decoded:
+                lines.append("address bits %d..%d are compared with the base address 0x%.8X, unless the interconnect decodes them" % (self.width - 1, high + 1, self.base_address()))
+            else:
+                window = 1 << (high + 1)
+                base = self.base_address() & ~(window - 1)
+                lines.append("address bits %d..%d are not decoded: the registers are aliased every 0x%X bytes unless chip select is restricted to 0x%.8X..0x%.8X" % (self.width - 1, high + 1, window, base, base + window - 1))
+        if low > 0:
+            lines.append("address bits %d..0 are not decoded: each register is aliased at the %d addresses above its offset" % (low - 1, (1 << low) - 1))
+        return lines
     # 
     # Returns the module's register with the lowest address
     def base_register(self):
@@ -146,19 +355,31 @@ class Module():
             if r.addressOffset < base_addr_reg.addressOffset:
                 base_addr_reg = r            
         return base_addr_reg
+    #
+    # Returns the lowest address of the module's registers and memories
+    def base_address(self):
+        return min([self.base_register().addressOffset] + [m.addressOffset for m in self.memories])
     # 
-    # Returns the module's register with the highest address
+    # Returns the module's register with the highest address (for register
+    # arrays, the address of the last element counts)
     def high_register(self):
         base_addr_reg = self.registers[0]
         for r in self.registers[1:]:
-            if r.addressOffset > base_addr_reg.addressOffset:
+            if r.last_address() > base_addr_reg.last_address():
                 base_addr_reg = r            
         return base_addr_reg
+    #
+    # Returns the highest address of the module's registers (array elements
+    # included) and memory words
+    def high_address(self):
+        return max([self.high_register().last_address()] + [m.last_address() for m in self.memories])
 
 # A register definition 
-class Register:
+class Register(object):
+    __slots__ = ("parent_module_", "name", "description", "access", "addressOffset", "_reset", "fields", "count", "stride",
+                 "_bus_writable_fields", "_bus_readable_fields", "_user_writable_fields", "_reset_value")
     MANDATORY_ELEMENTS = ("name", "description")
-    OPTIONAL_ELEMENTS = ("access", "addressOffset", "reset", "fields")
+    OPTIONAL_ELEMENTS = ("access", "addressOffset", "reset", "fields", "count", "stride")
     ACCESS = ("read-write", "read-only", "write-only")  # supported access-types
     #
     # Register constructor
@@ -172,21 +393,27 @@ class Register:
         self.addressOffset = None
         self._reset = None                                
         self.fields = []        
+        self.count = None   # number of elements of a register array
+        self.stride = None  # address distance of the elements of a register array
         #
         # initialize fields from JSON    
         for key in json_reg.keys():
             if key == "name":
-                self.name = json_reg[key]
+                self.name = parent_module.intern(json_reg[key])
             elif key == "description":
-                self.description = json_reg[key]
+                self.description = parent_module.intern(json_reg[key])
             elif key == "access":
-                self.access = json_reg[key]
+                self.access = parent_module.intern(json_reg[key])
             elif key == "addressOffset":
                 self.addressOffset = int_from_json(json_reg[key])
             elif key == "reset":
                 self._reset = int_from_json(json_reg[key])                                
             elif key == "fields":
                 self.fields = [Field(json_field, self) for json_field in json_reg[key]]
+            elif key == "count":
+                self.count = int_from_json(json_reg[key])
+            elif key == "stride":
+                self.stride = int_from_json(json_reg[key])
         #
         # check for missing mandatory elements
         for e in self.MANDATORY_ELEMENTS:
@@ -203,36 +430,53 @@ class Register:
         self.elaborate()   
         self.check()     
     #
-    # Returns only the register's bus-writable fields
+    # Returns True if the register is an array of 'count' identical registers.
+    # An array is kept as a single register; its elements share the fields.
+    def is_array(self):
+        return self.count != None
+    #
+    # Returns the number of bytes covered by the register (array)
+    def address_span(self):
+        if self.count == None:
+            return self.size() // 8
+        return self.count * self.stride
+    #
+    # Returns the address of the register, or of the last element of an array
+    def last_address(self):
+        if self.count == None:
+            return self.addressOffset
+        return self.addressOffset + (self.count - 1) * self.stride
+    #
+    # Returns only the register's bus-writable fields (computed during elaboration)
     def bus_writable_fields(self):
-        result = []
-        for f in self.fields:
-            if f.access() == "write-only" or f.access() == "read-write":
-                result += f
-        return f
+        return self._bus_writable_fields
+    #
+    # Returns only the register's bus-readable fields (computed during elaboration)
+    def bus_readable_fields(self):
+        return self._bus_readable_fields
+    #
+    # Returns only the register's user-writable fields (computed during elaboration)
+    def user_writable_fields(self):
+        return self._user_writable_fields
     #
     # Returns True if the register is bus-writable, i.e. if it has at least one bus-writable field
     def is_bus_writable(self):
-        for f in self.fields:
-            if f.access() == "write-only" or f.access() == "read-write":
-                return True        
-        return False
+        return len(self._bus_writable_fields) > 0
     #
     # Returns True if the register is bus-readable, i.e. if it has at least one bus-readable field
     def is_bus_readable(self):
-        for f in self.fields:
-            if f.access() == "read-only" or f.access() == "read-write":
-                return True        
-        return False        #
+        return len(self._bus_readable_fields) > 0
+    #
     # Returns True if the register is user-writable, i.e. if it has at least one user-writable field
     def is_user_writable(self):
-        for f in self.fields:
-            if f.access() == "read-only":
-                return True
-        return False 
+        return len(self._user_writable_fields) > 0
     #
-    # Get a registers's reset value        
+    # Get a registers's reset value (computed during elaboration)
     def reset(self):
+        return self._reset_value
+    #
+    # Compute a registers's reset value from its own and its fields' reset values
+    def combined_reset(self):
         reset = self._reset  # this is the default reset value, which may be overridden on a field basis
 
         # if any field has a reset, then all other fields of the register are reset as well (to 0).
@@ -275,53 +519,147 @@ class Register:
             bit_field_total_length += field.bitWidth
         if bit_field_total_length > self.size():
             raise(RegisterError(self, "not enough bits for all fields"))
+        #
+        # check array dimensions
+        if self.count != None:
+            if self.count < 1:
+                raise RegisterError(self, "count must be at least 1")
+            if self.stride < self.size() // 8 or self.stride & (self.stride - 1) != 0:
+                raise RegisterError(self, "stride must be a power of two of at least %d bytes" % (self.size() // 8))
+        elif self.stride != None:
+            raise RegisterError(self, "stride without count")
     #     
     # Elaborate the register
     def elaborate(self):
+        # Array elements are one register width apart by default
+        if self.count != None and self.stride == None:
+            self.stride = self.size() // 8
         # If the register has no fields, allocate one artificial field spanning the whole register
         if len(self.fields) == 0:
             d = dict(name=self.name, description=self.description, bitWidth=self.size())
             field = Field(d, self) 
             self.fields.append(field)            
         # Try to allocate the missing bit fields
-        bits = [None] * self.size()  # list of allocated bits
+        register_mask = bit_mask(self.size())
+        occupied = 0  # bit mask of allocated bits
         for field in self.fields:
             if field.bitOffset != None:
-                for i in range(field.bitOffset, field.bitOffset + field.bitWidth):
-                    if(i < 0 or i >= self.size()):
-                        error("Field '%s' has bits outside of register '%s'" % (field.name, self.name))
-                    # print "bit %d of register %s fixed to field %s" % (i, self.name, field.name)
-                    bits[i] = field
-
-        # print ["%d: %d" % (i, bits[i] != None) for i in range(len(bits))]
+                if field.bitOffset < 0 or field.bitOffset + field.bitWidth > self.size():
+                    raise RegisterError(self, "field '%s' has bits outside of the register" % field.name)
+                occupied |= bit_mask(field.bitWidth) << field.bitOffset
 
         for field in self.fields:
             if field.bitOffset == None:  # unfixed field
-                success = False
-                for start_pos in range(self.size()):
-                    if bits[start_pos] != None:
-                        continue
-                    num_bits_available = 1
-                    for bitOffset in range(1, self.size() - start_pos):
-                        if bits[start_pos + bitOffset] != None:
-                            break;
-                        num_bits_available += 1
-                    # print "start position %d: %d bits available" % (start_pos, num_bits_available)
-                    if num_bits_available >= field.bitWidth:
-                        field.bitOffset = start_pos
-                        print "elaboration: allocated field %s of register %s to bit offset %d" % (field.name, self.name, start_pos)
-                        for i in range(start_pos, start_pos + field.bitWidth):
-                            bits[i] = field
-                        # print ["%d: %d" % (i, bits[i] != None) for i in range(len(bits))]
-                        success = True
-                        break
-                if not success:
-                    error("could not allocate field %s in register %s" % (field.name, self.name))
+                start_pos = lowest_free_run(~occupied & register_mask, field.bitWidth)
+                if start_pos == None:
+                    raise RegisterError(self, "could not allocate field '%s'" % field.name)
+                field.bitOffset = start_pos
+                self.parent_module_.num_allocated_fields += 1
+                if self.parent_module_.verbose:
+                    print "elaboration: allocated field %s of register %s to bit offset %d" % (field.name, self.name, start_pos)
+                occupied |= bit_mask(field.bitWidth) << start_pos
         for field in self.fields:
             field.elaborate()    
+        # Classify the fields and compute the reset value once, as the code 
+        # generators query them for every register
+        self._bus_writable_fields = tuple(f for f in self.fields if f.is_bus_writable())
+        self._bus_readable_fields = tuple(f for f in self.fields if f.is_bus_readable())
+        self._user_writable_fields = tuple(f for f in self.fields if f.is_user_writable())
+        self._reset_value = self.combined_reset()
     
+# A memory definition: 'depth' words of 'width' bits, which the VHDL component
+# implements as block RAM instead of registers. Every word takes one register
+# address; the memory is aligned to its size rounded up to a power of two.
+class Memory(object):
+    __slots__ = ("parent_module_", "name", "description", "depth", "width", "access", "addressOffset")
+    MANDATORY_ELEMENTS = ("name", "description", "depth")
+    OPTIONAL_ELEMENTS = ("width", "access", "addressOffset")
+    ACCESS = ("read-write", "read-only", "write-only")  # bus access; the user logic reads written memories and writes read-only ones
+    #
+    # Memory constructor
+    def __init__(self, json_mem, parent_module):
+        #
+        # default values:
+        self.parent_module_ = parent_module
+        self.name = ""
+        self.description = None
+        self.depth = None
+        self.width = None  # the module width by default
+        self.access = "read-write"
+        self.addressOffset = None
+        #
+        # initialize fields from JSON
+        for key in json_mem.keys():
+            if key == "name":
+                self.name = parent_module.intern(json_mem[key])
+            elif key == "description":
+                self.description = parent_module.intern(json_mem[key])
+            elif key == "depth":
+                self.depth = int_from_json(json_mem[key])
+            elif key == "width":
+                self.width = int_from_json(json_mem[key])
+            elif key == "access":
+                self.access = parent_module.intern(json_mem[key])
+            elif key == "addressOffset":
+                self.addressOffset = int_from_json(json_mem[key])
+        #
+        # check for missing mandatory elements
+        for e in self.MANDATORY_ELEMENTS:
+            if getattr(self, e) == None:
+                if(e == 'name'): self.name = '<unnamed>'
+                raise ModuleError(parent_module, "memory '%s': missing '%s' element" % (self.name, e))
+        #
+        # check for unsupported elements
+        for key in json_mem.keys():
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
+                raise ModuleError(parent_module, "memory '%s': unsupported element '%s'" % (self.name, key))
+    #
+    # Returns the number of address bits which select a word of the memory
+    def index_width(self):
+        return (self.depth - 1).bit_length()
+    #
+    # Returns the number of bytes covered by the memory, a power of two
+    def address_span(self):
+        return (self.parent_module_.width // 8) << self.index_width()
+    #
+    # Returns the address of the last word of the memory
+    def last_address(self):
+        return self.addressOffset + (self.depth - 1) * (self.parent_module_.width // 8)
+    #
+    # Returns True if the memory is bus-writable (and read by the user logic)
+    def is_bus_writable(self):
+        return self.access in ("write-only", "read-write")
+    #
+    # Returns True if the memory is bus-readable
+    def is_bus_readable(self):
+        return self.access in ("read-only", "read-write")
+    #
+    # Returns True if the memory is written by the user logic
+    def is_user_writable(self):
+        return self.access == "read-only"
+    #
+    # Elaborate the memory
+    def elaborate(self):
+        if self.width == None:
+            self.width = self.parent_module_.width
+    #
+    # Check the memory
+    def check(self):
+        module = self.parent_module_
+        if not is_valid_identifier(self.name):
+            raise ModuleError(module, "memory '%s': not a valid identifier (it may be a reserved C or VHDL keyword)" % self.name)
+        if self.access not in self.ACCESS:
+            raise ModuleError(module, "memory '%s': '%s' is not a valid access mode" % (self.name, self.access))
+        if self.depth < 2:
+            raise ModuleError(module, "memory '%s': depth must be at least 2" % self.name)
+        if self.width < 1 or self.width > module.width:
+            raise ModuleError(module, "memory '%s': width is out of range" % self.name)
+
 # A register field        
-class Field:
+class Field(object):
+    __slots__ = ("parent_reg", "name", "description", "bitWidth", "bitOffset", "_reset", "_access",
+                 "selfClearSet", "userWriteStrobe", "_effective_access", "_bus_writable", "_bus_readable",
+                 "_user_writable")
     MANDATORY_ELEMENTS = ("name", "description", "bitWidth")
     OPTIONAL_ELEMENTS = ("bitOffset", "reset", "access", "selfClear/Set", "userWriteStrobe")
     #
@@ -340,11 +678,12 @@ class Field:
         self.userWriteStrobe = "no"
         #
         # initialize fields from JSON    
+        module = parent_reg.parent_module_
         for key in json_field.keys():
             if key == "name":
-                self.name = json_field[key]
+                self.name = module.intern(json_field[key])
             elif key == "description":
-                self.description = json_field[key]
+                self.description = module.intern(json_field[key])
             elif key == "bitWidth":
                 self.bitWidth = json_field[key]
             elif key == "bitOffset":
@@ -352,11 +691,11 @@ class Field:
             elif key == "reset":
                 self._reset = int_from_json(json_field[key])
             elif key == "access":
-                self._access = json_field[key]
+                self._access = module.intern(json_field[key])
             elif key == "selfClear/Set":
                 self.selfClearSet = int_from_json(json_field[key])
             elif key == "userWriteStrobe":
-                self.userWriteStrobe = json_field[key]
+                self.userWriteStrobe = module.intern(json_field[key])
             else:
                 raise FieldError(self, "unsupported element '%s'" % key)                 
         #
@@ -426,32 +765,30 @@ class Field:
     #
     # Returns the access mode of a field, which may be inherited from the parent register
     def access(self):
-        if self._access == None:
-            return self.parent_reg.access
-        else:
-            return self._access            
+        return self._effective_access
     #
     # Elaborate a field, i.e. compute values for all undefined parameters
     def elaborate(self):
-        pass
+        # resolve the access mode inherited from the parent register
+        if self._access == None:
+            self._effective_access = self.parent_reg.access
+        else:
+            self._effective_access = self._access
+        self._bus_writable = self._effective_access in ("write-only", "read-write")
+        self._bus_readable = self._effective_access in ("read-only", "read-write")
+        self._user_writable = self._effective_access == "read-only"
     #
     # Returns True if the field is bus-writable
     def is_bus_writable(self):
-        if self.access() == "write-only" or self.access() == "read-write":
-            return True   
-        return False
+        return self._bus_writable
     #
     # Returns True if the field is bus-readable
     def is_bus_readable(self):
-        if self.access() == "read-only" or self.access() == "read-write":
-            return True   
-        return False
+        return self._bus_readable
     #
     # Returns True if the field is user-writable
     def is_user_writable(self):
-        if self.access() == "read-only":
-            return True   
-        return False
+        return self._user_writable
 
     #
     # Returns True if update of the field (in read-only mode) should be conditioned by a user strobe signal.
@@ -461,3 +798,156 @@ class Field:
             return True
         return False
         
+
+# ------------------------------------------------------------------------------
+# A system definition: instances of modules at base addresses
+#
+# Every distinct module file is loaded (parsed and elaborated) only once, by
+# 'load_module(path)', however often it is instantiated. Module files are
+# referenced relative to 'directory'.
+#
+class System():
+    MANDATORY_ELEMENTS = ("name", "description", "instances")
+    OPTIONAL_ELEMENTS = ()
+    #
+    def __init__(self, json_system, load_module, directory='.'):
+        self.name = ""
+        for key in json_system.keys():
+            if key == "name":
+                self.name = json_system[key]
+            elif key == "description":
+                self.description = json_system[key]
+            elif key == "instances":
+                json_instances = json_system[key]
+        # check for missing mandatory elements
+        for e in self.MANDATORY_ELEMENTS:
+            if e not in json_system:
+                if(e == 'name'): self.name = '<unnamed>'
+                raise SystemSpecError(self, "missing '%s' element" % e)
+        # check for unsupported elements
+        for key in json_system.keys():
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
+                raise SystemSpecError(self, "unsupported element '%s'" % key)
+        if not is_valid_identifier(self.name):
+            raise SystemSpecError(self, "'%s' is not a valid identifier (it may be a reserved C or VHDL keyword)" % self.name)
+        self._modules = {}  # module file path -> Module
+        self._paths = {}    # module file reference -> module file path
+        self.instances = [Instance(json_instance, self) for json_instance in json_instances]
+        windows = {}  # id of a module -> offsets of its lowest and highest address
+        for instance in self.instances:
+            instance.module = self.module(instance.module_file, instance, load_module, directory)
+            if id(instance.module) not in windows:
+                windows[id(instance.module)] = (instance.module.base_address(), instance.module.high_address() + instance.module.width // 8 - 1)
+            instance.window = windows[id(instance.module)]
+        self.check()
+        self.address_map = AddressMap([(i.low_address(), i.high_address(), i) for i in self.instances])
+        overlap = self.address_map.first_overlap()
+        if overlap != None:
+            first, second = overlap
+            raise SystemSpecError(self, "instance '%s' (0x%.8X..0x%.8X) overlaps instance '%s' (0x%.8X..0x%.8X)" % (second.name, second.low_address(), second.high_address(), first.name, first.low_address(), first.high_address()))
+    #
+    # Returns the module of a module file, which is loaded on first use
+    def module(self, module_file, instance, load_module, directory):
+        if module_file not in self._paths:
+            self._paths[module_file] = os.path.realpath(os.path.join(directory, module_file))
+        path = self._paths[module_file]
+        if path not in self._modules:
+            try:
+                self._modules[path] = load_module(path)
+            except (IOError, ValueError) as ex:
+                raise SystemSpecError(self, "instance '%s': module '%s': %s" % (instance.name, module_file, ex))
+            except RegisterError as ex:
+                raise SystemSpecError(self, "instance '%s': module '%s': error in register %s" % (instance.name, module_file, ex))
+            except FieldError as ex:
+                raise SystemSpecError(self, "instance '%s': module '%s': error in field %s" % (instance.name, module_file, ex))
+            except ModuleError as ex:
+                raise SystemSpecError(self, "instance '%s': module '%s': error in module %s" % (instance.name, module_file, ex))
+        return self._modules[path]
+    #
+    # Returns the distinct modules of the system, in the order of their first instance
+    def modules(self):
+        modules = []
+        seen = set()
+        for instance in self.instances:
+            if id(instance.module) not in seen:
+                seen.add(id(instance.module))
+                modules.append(instance.module)
+        return modules
+    #
+    # Checks the system
+    def check(self):
+        names = set()
+        for instance in self.instances:
+            instance.check()
+            if instance.name in names:
+                raise SystemSpecError(self, "instance '%s' is defined more than once" % instance.name)
+            names.add(instance.name)
+        # the module names become file names and identifiers of the outputs
+        module_names = set()
+        for module in self.modules():
+            if module.name in module_names:
+                raise SystemSpecError(self, "different module files define the module '%s'" % module.name)
+            module_names.add(module.name)
+    #
+    # Returns the instance whose address window contains an address, or None
+    def instance_at(self, address):
+        return self.address_map.find(address)
+    #
+    # Returns the lowest and the highest address of the instances
+    def base_address(self):
+        return min(i.low_address() for i in self.instances)
+    #
+    def high_address(self):
+        return max(i.high_address() for i in self.instances)
+
+# An instance of a module in a system
+class Instance(object):
+    __slots__ = ("parent_system", "name", "description", "module_file", "module", "baseAddress", "window")
+    MANDATORY_ELEMENTS = ("name", "module", "baseAddress")
+    OPTIONAL_ELEMENTS = ("description",)
+    #
+    def __init__(self, json_instance, parent_system):
+        self.parent_system = parent_system
+        self.name = ""
+        self.description = ""
+        self.module_file = None
+        self.module = None
+        self.window = None  # offsets of the module's lowest and highest address
+        self.baseAddress = None
+        for key in json_instance.keys():
+            if key == "name":
+                self.name = json_instance[key]
+            elif key == "description":
+                self.description = json_instance[key]
+            elif key == "module":
+                self.module_file = json_instance[key]
+            elif key == "baseAddress":
+                self.baseAddress = int_from_json(json_instance[key])
+        # check for missing mandatory elements
+        for e in self.MANDATORY_ELEMENTS:
+            if e not in json_instance:
+                if(e == 'name'): self.name = '<unnamed>'
+                raise SystemSpecError(parent_system, "instance '%s': missing '%s' element" % (self.name, e))
+        # check for unsupported elements
+        for key in json_instance.keys():
+            if key not in self.MANDATORY_ELEMENTS + self.OPTIONAL_ELEMENTS:
+                raise SystemSpecError(parent_system, "instance '%s': unsupported element '%s'" % (self.name, key))
+    #
+    # Checks the instance (once its module is loaded)
+    def check(self):
+        system = self.parent_system
+        if not is_valid_identifier(self.name):
+            raise SystemSpecError(system, "instance '%s': not a valid identifier (it may be a reserved C or VHDL keyword)" % self.name)
+        if self.baseAddress < 0 or self.baseAddress % (self.module.width // 8) != 0:
+            raise SystemSpecError(system, "instance '%s': the base address must be a non-negative multiple of %d" % (self.name, self.module.width // 8))
+        if self.high_address() >= 2 ** self.module.width:
+            raise SystemSpecError(system, "instance '%s' exceeds the address space" % self.name)
+    #
+    # Returns the first address of the instance's registers and memories
+    def low_address(self):
+        return self.baseAddress + self.window[0]
+    #
+    # Returns the last address of the instance's address window, i.e. the last
+    # byte of its highest register or memory word
+    def high_address(self):
+        return self.baseAddress + self.window[1]